@@ -0,0 +1,257 @@
+# Benchmarks of the simulator, every run uses fixed seeds
+#   python benchmark.py run                                  micro and end-to-end benchmarks, saved to benchmark.json
+#   python benchmark.py run --quick --output current.json    fewer configs and games
+#   python benchmark.py compare benchmark.json current.json  flags the benchmarks that got slower
+#
+# Micro benchmarks time the hot functions of the object engine on a freshly dealt game (calls/sec).
+# End-to-end benchmarks play whole games (games/sec and turns/sec) for every engine, player count, deck count
+# and logging on/off. The game modules copy config.py when they are imported, so every end-to-end config
+# runs in its own process (python benchmark.py game ...)
+
+import os
+import sys
+import json
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import timeit
+import time
+
+import config
+
+
+SEED = 1234
+TOLERANCE = 0.10 # slower than the baseline by more than 10% = regression
+
+ENGINES = ["object", "fast"]
+PLAYERS = [2, 4, 6, 8, 10]
+DECKS = [1, 2, 3]
+GAMES = 100
+
+
+def timeCall(function, repeat=5):
+    # Best time of a single call, in seconds
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def microBenchmarks():
+    from game_utility import Table, TurnLog, DatasetWriter, seedShuffler, shuffleDeck, newDeck, drawCards, spawnPlayers, dealCards, get_game_data
+    from game_logic import skipTurn, canPlayerPlay, playCard, update_trueskill
+
+    random.seed(SEED)
+    seedShuffler(SEED)
+
+    # a freshly dealt game
+    table = spawnPlayers(Table([]))
+    table.deck = newDeck()
+    table.cards.append(table.deck.pop())
+    table.cards[0].used = 1
+    table = dealCards(table)
+    hand = table.alive[0].cards
+
+    deck = newDeck()
+    game_log = TurnLog()
+
+    # a logged game of 300 turns
+    game = TurnLog()
+    for turn in range(300):
+        get_game_data(game, table, turn, len(table.alive), hand, 0)
+
+    def draw():
+        # the cards go back on the draw pile, the pile keeps the same size
+        table.deck.extend(drawCards(table, 2, 0))
+
+    def log():
+        game_log.clear()
+        get_game_data(game_log, table, 1, len(table.alive), hand, 0)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        writer = DatasetWriter(0, directory=directory)
+
+        benchmarks = {
+            "skipTurn": lambda: skipTurn(table, table.turn),
+            "canPlayerPlay": lambda: canPlayerPlay(hand, table),
+            "playCard": lambda: playCard(hand, table),
+            "drawCards": draw,
+            "shuffleDeck": lambda: shuffleDeck(deck),
+            "get_game_data": log,
+            "DatasetWriter.write": lambda: writer.write(game, 0), # replaces logData, one game of 300 rows
+            "update_trueskill": lambda: update_trueskill(table, 0),
+        }
+
+        for name, function in benchmarks.items():
+            seconds = timeCall(function)
+            results[name] = {"ops_per_sec": 1 / seconds, "ns_per_call": seconds * 1e9}
+            print("  %-22s %12.0f calls/s %10.0f ns" % (name, 1 / seconds, seconds * 1e9))
+
+        writer.close()
+
+    return results
+
+
+def playGames(args):
+    # Child process of an end-to-end benchmark, prints one json line
+    config.configure(NUMBER_OF_PLAYERS=args.players, NUMBER_OF_DECKS=args.decks, ENABLE_LOGGING=args.logging,
+                     TOTAL_SIMULATIONS=args.games, FAST_ENGINE=args.engine == "fast")
+
+    if not args.ratings:
+        # the wins are kept for the ratings but never rated
+        import ratings
+        ratings.deferRatings()
+
+    if args.engine == "fast":
+        from fast_engine import startFastGame as startGame
+    else:
+        from uno import startGame
+
+    # the dataset is written to a temporary directory
+    # the working directory is restored before the directory is removed, even if the games fail
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            start_time = time.perf_counter()
+            players = startGame(args.games, args.seed)
+            seconds = time.perf_counter() - start_time
+        finally:
+            os.chdir(working_directory)
+
+    turns = sum(players[i].turns for i in players)
+    print(json.dumps({"games": args.games, "turns": turns, "seconds": seconds}))
+
+
+def endToEndBenchmarks(engines, players, decks, games):
+    results = {}
+
+    for engine in engines:
+        for player_count in players:
+            for deck_count in decks:
+                for logging in (False, True):
+                    name = "%s/players=%d/decks=%d/logging=%s" % (engine, player_count, deck_count, "on" if logging else "off")
+                    command = [sys.executable, os.path.abspath(__file__), "game", "--engine", engine,
+                               "--players", str(player_count), "--decks", str(deck_count), "--games", str(games),
+                               "--seed", str(SEED), "--logging" if logging else "--no-logging"]
+
+                    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+                    run = json.loads(output.strip().splitlines()[-1])
+
+                    run["games_per_sec"] = run["games"] / run["seconds"]
+                    run["turns_per_sec"] = run["turns"] / run["seconds"]
+                    results[name] = run
+                    print("  %-40s %10.1f games/s %12.0f turns/s" % (name, run["games_per_sec"], run["turns_per_sec"]))
+
+    return results
+
+
+def runBenchmarks(args):
+    if args.quick:
+        players, decks, games = [2, 4], [1], 30
+    else:
+        players, decks, games = PLAYERS, DECKS, GAMES
+
+    results = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "seed": SEED,
+        },
+    }
+
+    print("Micro benchmarks")
+    results["micro"] = microBenchmarks()
+
+    print("End-to-end benchmarks")
+    results["e2e"] = endToEndBenchmarks(args.engines or ENGINES, args.players or players, args.decks or decks, args.games or games)
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print("Saved", args.output)
+
+    if args.baseline:
+        return compareResults(args.baseline, args.output, args.tolerance)
+    return 0
+
+
+def compareResults(baseline_file, current_file, tolerance=TOLERANCE):
+    # Prints current / baseline of every throughput, returns 1 if a benchmark is slower than the tolerance
+    with open(baseline_file) as file:
+        baseline = json.load(file)
+    with open(current_file) as file:
+        current = json.load(file)
+
+    regressions = 0
+    for section, metrics in (("micro", ["ops_per_sec"]), ("e2e", ["games_per_sec", "turns_per_sec"])):
+        for name in baseline.get(section, {}):
+            if name not in current.get(section, {}):
+                continue
+
+            for metric in metrics:
+                before = baseline[section][name][metric]
+                after = current[section][name][metric]
+                ratio = after / before
+
+                flag = ""
+                if ratio < 1 - tolerance:
+                    flag = "REGRESSION"
+                    regressions += 1
+                elif ratio > 1 + tolerance:
+                    flag = "faster"
+
+                print("  %-40s %-14s %12.1f -> %12.1f  x%.2f  %s" % (name, metric, before, after, ratio, flag))
+
+    print(regressions, "regressions (tolerance:", str(int(tolerance * 100)) + "%)")
+    return 1 if regressions > 0 else 0
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the uno simulator")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and save the results")
+    run.add_argument("--output", default="benchmark.json")
+    run.add_argument("--quick", action="store_true", help="2 and 4 players, 1 deck, 30 games")
+    run.add_argument("--engines", nargs="+", choices=["object", "fast"])
+    run.add_argument("--players", nargs="+", type=int)
+    run.add_argument("--decks", nargs="+", type=int)
+    run.add_argument("--games", type=int)
+    run.add_argument("--baseline", help="compare the results with this file")
+    run.add_argument("--tolerance", type=float, default=TOLERANCE)
+
+    compare = commands.add_parser("compare", help="compare two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=TOLERANCE)
+
+    game = commands.add_parser("game", help="one end-to-end benchmark (used by run)")
+    game.add_argument("--engine", default="object", choices=["object", "fast"])
+    game.add_argument("--players", type=int, default=4)
+    game.add_argument("--decks", type=int, default=1)
+    game.add_argument("--games", type=int, default=GAMES)
+    game.add_argument("--seed", type=int, default=SEED)
+    game.add_argument("--logging", action=argparse.BooleanOptionalAction, default=False)
+    game.add_argument("--ratings", action=argparse.BooleanOptionalAction, default=True, help="TrueSkill ratings")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArguments(argv)
+
+    if args.command == "run":
+        return runBenchmarks(args)
+    if args.command == "compare":
+        return compareResults(args.baseline, args.current, args.tolerance)
+
+    playGames(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# Checkpoints of long runs (endless runs with TOTAL_SIMULATIONS = 0 on preemptible machines)
+# Every CHECKPOINT_EVERY games the object and fast engines rate the pending wins, close the current dataset and
+# records files and save the state of the run to CHECKPOINT_FILE (CHECKPOINTN.json for worker N of the pool):
+#   run seed, next game id, games played, players (wins, score, performance, turns, TrueSkill mu and sigma),
+#   part of the next dataset / records file
+# A worker of the process pool with EXACT_POOL_RATINGS doesn't rate its wins (ratings.deferRatings), they are
+# saved next to the checkpoint (CHECKPOINTN.wins.npy, the first 'deferred_wins' of them belong to the checkpoint).
+# Every game is seeded from the run seed and its id, the next game id is all the random state there is.
+# The file is replaced atomically, a crash leaves the previous checkpoint.
+#
+# With RESUME the run starts from the checkpoint: the files written after it are removed and their games
+# are played again, the output has no duplicate or missing games. The settings must be the same (config hash).
+#   python cli.py -n 0 --engine fast --checkpoint run.json
+#   python cli.py -n 0 --engine fast --checkpoint run.json --resume
+
+import os
+import json
+
+import numpy as np
+
+import config
+
+from instrumentation import INSTRUMENTATION, stats, clock
+
+
+CHECKPOINT_FILE = config.CHECKPOINT_FILE
+CHECKPOINT_EVERY = config.CHECKPOINT_EVERY
+RESUME = config.RESUME
+
+
+def checkpointFile(shard=None):
+    # every worker of the process pool has its own checkpoint
+    if CHECKPOINT_FILE is None or shard is None:
+        return CHECKPOINT_FILE
+    name, extension = os.path.splitext(CHECKPOINT_FILE)
+    return name + str(shard) + extension
+
+
+def saveCheckpoint(file_name, state):
+    # written next to the checkpoint, then renamed over it
+    temporary = file_name + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(state, file, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, file_name)
+
+
+def loadCheckpoint(file_name):
+    with open(file_name) as file:
+        state = json.load(file)
+
+    # json keys are strings
+    state['players'] = {int(player_id): player for player_id, player in state['players'].items()}
+    return state
+
+
+def startingPoint(shard, seed, first_game_id, players):
+    # Where a run starts: the checkpoint with RESUME, otherwise a new run
+    # dataset_part / records_part are the first_part of DatasetWriter / GameRecorder, None without checkpoints
+    run = {'run_seed': seed, 'next_game_id': first_game_id, 'simulation': 0, 'dataset_part': None, 'records_part': None}
+
+    file_name = checkpointFile(shard)
+    if file_name is None:
+        return run
+
+    run['dataset_part'] = 0
+    run['records_part'] = 0
+    if RESUME:
+        state = resumeRun(file_name, players)
+        if state is not None:
+            run.update(state)
+    return run
+
+
+def winsFile(file_name):
+    return os.path.splitext(file_name)[0] + ".wins.npy"
+
+
+def checkpointRun(file_name, seed, game_id, simulation, rating_log, writer, recorder):
+    # Saves the state of the run between two games, game_id is the id of the next game
+    from replay import configHash
+    import ratings
+
+    if INSTRUMENTATION:
+        checkpoint_start = clock()
+
+    rating_log.update()
+
+    state = {
+        'config_hash': configHash(),
+        'run_seed': seed,
+        'next_game_id': game_id,
+        'simulation': simulation,
+        'dataset_part': writer.checkpoint() if writer is not None else 0,
+        'records_part': recorder.checkpoint() if recorder is not None else 0,
+        'players': {},
+    }
+
+    if ratings.deferred_alive is not None:
+        # written before the checkpoint, a crash in between leaves a file with more wins than the checkpoint
+        wins = np.array([ratings.deferred_alive, ratings.deferred_winners], dtype=np.int64).reshape(2, -1)
+        temporary = winsFile(file_name) + ".tmp.npy"
+        np.save(temporary, wins)
+        os.replace(temporary, winsFile(file_name))
+        state['deferred_wins'] = wins.shape[1]
+
+    players = rating_log.players
+    for player_id in players:
+        player = players[player_id]
+        state['players'][player_id] = {
+            'wins': player.wins,
+            'score': player.score,
+            'performance': player.performance,
+            'turns': player.turns,
+            'mu': player.trueskill.mu,
+            'sigma': player.trueskill.sigma,
+        }
+
+    saveCheckpoint(file_name, state)
+
+    if INSTRUMENTATION:
+        stats.time("checkpoint", checkpoint_start)
+        stats.count("checkpoints")
+
+
+def resumeRun(file_name, players):
+    # Restores the players of the checkpoint, returns its state, None when there is nothing to resume
+    import ratings
+    from ratings import environment
+    from replay import configHash
+
+    if not os.path.exists(file_name):
+        print("[WARNING] No checkpoint in", file_name, ", starting a new run")
+        return None
+
+    state = loadCheckpoint(file_name)
+    if state['config_hash'] != configHash():
+        raise ValueError("The checkpoint " + file_name + " was saved with other settings, resume with the same flags as the run")
+
+    for player_id, saved in state['players'].items():
+        player = players[player_id]
+        player.wins = saved['wins']
+        player.score = saved['score']
+        player.performance = saved['performance']
+        player.turns = saved['turns']
+        player.trueskill = environment.create_rating(saved['mu'], saved['sigma'])
+
+    if ratings.deferred_alive is not None and state.get('deferred_wins', 0) > 0:
+        alive, winners = np.load(winsFile(file_name))[:, :state['deferred_wins']].tolist()
+        ratings.deferRatings(alive, winners)
+
+    print("Resuming from", file_name, "at game", state['next_game_id'], "(seed:", state['run_seed'], ")")
+    return state
@@ -0,0 +1,167 @@
+# Command line entry point
+#   python cli.py -n 10000 --engine fast --no-logging
+#   python cli.py -n 100000 --engine fast --subdivide --processes 8 --seed 42
+#   python cli.py -n 10000 --policy 0=linear --concurrent-games 512
+# Every flag overrides the matching setting of config.py, flags that are not given keep the config.py value.
+# The game modules copy the settings when they are imported, so they are only imported after the flags are applied.
+# tensorflow is never imported, pyarrow only when something is logged
+
+import argparse
+import timeit
+
+import config
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Uno cards game simulator")
+
+    parser.add_argument("-n", "--simulations", type=int, help="games to play, 0 = endless (TOTAL_SIMULATIONS)")
+    parser.add_argument("--players", type=int, help="NUMBER_OF_PLAYERS")
+    parser.add_argument("--decks", type=int, help="NUMBER_OF_DECKS")
+    parser.add_argument("--initial-cards", type=int, help="NUMBER_OF_INITIAL_CARDS")
+    parser.add_argument("--engine", choices=["object", "fast", "policy"], help="object (uno.py), fast (fast_engine.py) or policy (policy_engine.py)")
+    parser.add_argument("--policy", action="append", metavar="SEAT=NAME", help="policy of a seat (PLAYER_POLICIES), implies --engine policy, can be repeated")
+    parser.add_argument("--concurrent-games", type=int, help="CONCURRENT_GAMES of the policy engine")
+    parser.add_argument("--model", help="MODEL_FILE of the keras policy")
+    parser.add_argument("--mcts-rollouts", type=int, help="MCTS_ROLLOUTS per move of the mcts policy")
+    parser.add_argument("--mcts-ms", type=float, help="MCTS_MILLISECONDS per move of the mcts policy, replaces --mcts-rollouts")
+    parser.add_argument("--mcts-workers", type=int, help="MCTS_WORKERS, processes searching the moves of the mcts policy")
+    parser.add_argument("--subdivide", action=argparse.BooleanOptionalAction, help="run on a process pool (SUBDIVIDE_SIMULATIONS)")
+    parser.add_argument("--processes", type=int, help="NUMBER_OF_PROCESSES, 0 = every core")
+    parser.add_argument("--exact-ratings", action=argparse.BooleanOptionalAction, help="the parent rates every win of the process pool in game order, on one core (EXACT_POOL_RATINGS)")
+    parser.add_argument("--seed", type=int, help="SIMULATION_SEED")
+    parser.add_argument("--one-winner", action=argparse.BooleanOptionalAction, help="ONLY_ONE_PLAYER_CAN_WIN")
+    parser.add_argument("--max-turns", type=int, help="MAX_TURNS, 0 = no limit (ENABLE_MAX_TURNS)")
+    parser.add_argument("--logging", action=argparse.BooleanOptionalAction, help="ENABLE_LOGGING")
+    parser.add_argument("--format", choices=["parquet", "arrow"], help="DATASET_FORMAT, arrow files can be memory-mapped (mapped_dataset.py)")
+    parser.add_argument("--writer-queue", type=int, help="WRITER_QUEUE_SIZE, games waiting for the dataset writer thread, 0 = write in the simulation thread")
+    parser.add_argument("--only-winning-games", action=argparse.BooleanOptionalAction, help="ONLY_LOG_WINNING_GAMES")
+    parser.add_argument("--record", action=argparse.BooleanOptionalAction, help="save a record of every game for replay.py (RECORD_GAMES)")
+    parser.add_argument("--checkpoint", help="save the state of the run to this file every --checkpoint-every games (CHECKPOINT_FILE)")
+    parser.add_argument("--checkpoint-every", type=int, help="CHECKPOINT_EVERY")
+    parser.add_argument("--resume", action=argparse.BooleanOptionalAction, help="continue the run saved in the checkpoint file (RESUME)")
+    parser.add_argument("--stats", nargs="?", const="statistics.json", metavar="FILE", help="keep aggregate statistics of the games and save them to FILE (ENABLE_STATISTICS, STATISTICS_FILE)")
+    parser.add_argument("--instrument", action=argparse.BooleanOptionalAction, help="time the phases of the run and print a report (ENABLE_INSTRUMENTATION)")
+    parser.add_argument("--report", help="save the instrumentation report to this json file (INSTRUMENTATION_REPORT)")
+    parser.add_argument("--profile", help="run under cProfile and save the stats to this file (PROFILE_OUTPUT)")
+
+    return parser.parse_args(argv)
+
+
+def settingsFromArguments(args):
+    settings = {}
+
+    names = {
+        "simulations": "TOTAL_SIMULATIONS",
+        "players": "NUMBER_OF_PLAYERS",
+        "decks": "NUMBER_OF_DECKS",
+        "initial_cards": "NUMBER_OF_INITIAL_CARDS",
+        "concurrent_games": "CONCURRENT_GAMES",
+        "model": "MODEL_FILE",
+        "mcts_rollouts": "MCTS_ROLLOUTS",
+        "mcts_ms": "MCTS_MILLISECONDS",
+        "mcts_workers": "MCTS_WORKERS",
+        "subdivide": "SUBDIVIDE_SIMULATIONS",
+        "processes": "NUMBER_OF_PROCESSES",
+        "exact_ratings": "EXACT_POOL_RATINGS",
+        "seed": "SIMULATION_SEED",
+        "one_winner": "ONLY_ONE_PLAYER_CAN_WIN",
+        "logging": "ENABLE_LOGGING",
+        "only_winning_games": "ONLY_LOG_WINNING_GAMES",
+        "format": "DATASET_FORMAT",
+        "writer_queue": "WRITER_QUEUE_SIZE",
+        "record": "RECORD_GAMES",
+        "checkpoint": "CHECKPOINT_FILE",
+        "checkpoint_every": "CHECKPOINT_EVERY",
+        "resume": "RESUME",
+        "instrument": "ENABLE_INSTRUMENTATION",
+        "report": "INSTRUMENTATION_REPORT",
+        "profile": "PROFILE_OUTPUT",
+    }
+    for argument, name in names.items():
+        value = getattr(args, argument)
+        if value is not None:
+            settings[name] = value
+
+    if args.engine is not None:
+        settings["FAST_ENGINE"] = args.engine == "fast"
+        settings["POLICY_ENGINE"] = args.engine == "policy"
+
+    if args.policy is not None:
+        policies = {}
+        for policy in args.policy:
+            seat, name = policy.split("=")
+            policies[int(seat)] = name
+        settings["PLAYER_POLICIES"] = policies
+        settings["POLICY_ENGINE"] = True
+        settings["FAST_ENGINE"] = False
+
+    if args.max_turns is not None:
+        settings["ENABLE_MAX_TURNS"] = args.max_turns > 0
+        settings["MAX_TURNS"] = args.max_turns
+
+    if args.stats is not None:
+        settings["ENABLE_STATISTICS"] = True
+        settings["STATISTICS_FILE"] = args.stats
+
+    # a report file is useless without the timers
+    if args.report is not None:
+        settings["ENABLE_INSTRUMENTATION"] = True
+
+    return settings
+
+
+def runSimulations():
+    # Plays the games with the current settings and prints the summary
+    start_time = timeit.default_timer()
+
+    if config.CHECKPOINT_FILE is not None and config.POLICY_ENGINE:
+        print("[WARNING] The policy engine doesn't save checkpoints")
+
+    if config.SUBDIVIDE_SIMULATIONS and config.TOTAL_SIMULATIONS > 0:
+        from simulation_pool import runSubdividedSimulations
+        players = runSubdividedSimulations()
+    else:
+        if config.SUBDIVIDE_SIMULATIONS:
+            print("[WARNING] SUBDIVIDE_SIMULATIONS needs a finite TOTAL_SIMULATIONS, running on a single core")
+
+        if config.POLICY_ENGINE:
+            from policy_engine import startPolicyGame
+            players = startPolicyGame(seed=config.SIMULATION_SEED)
+        elif config.FAST_ENGINE:
+            from fast_engine import startFastGame
+            players = startFastGame(seed=config.SIMULATION_SEED)
+        else:
+            from uno import startGame
+            players = startGame(seed=config.SIMULATION_SEED)
+
+    from uno import printSummary
+    printSummary(players)
+
+    execution_time = timeit.default_timer() - start_time
+    print("Execution time:", execution_time, "seconds")
+
+    if config.ENABLE_STATISTICS:
+        from game_statistics import run_stats
+        run_stats.report(config.STATISTICS_FILE)
+
+    if config.ENABLE_INSTRUMENTATION:
+        from instrumentation import stats
+        stats.report(config.INSTRUMENTATION_REPORT)
+
+    return players
+
+
+def main(argv=None):
+    config.configure(**settingsFromArguments(parseArguments(argv)))
+
+    if config.PROFILE_OUTPUT:
+        # with --subdivide only the main process is profiled
+        from instrumentation import profileRun
+        return profileRun(runSimulations, config.PROFILE_OUTPUT)
+
+    return runSimulations()
+
+
+if __name__ == "__main__":
+    main()
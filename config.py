@@ -1,12 +1,52 @@
 
+import sys
+
 # Game settings, may affect simulation time
 NUMBER_OF_DECKS = 1
 NUMBER_OF_PLAYERS = 4
 NUMBER_OF_INITIAL_CARDS = 7
 
-SUBDIVIDE_SIMULATIONS = False # to be implemented
 TOTAL_SIMULATIONS = 500  # type 0 to make it endless
 
+# Split TOTAL_SIMULATIONS across a process pool, results are merged at the end
+SUBDIVIDE_SIMULATIONS = False
+NUMBER_OF_PROCESSES = 0 # 0 = use every available core
+SIMULATION_SEED = None # None = random seed, every game is seeded from it and its game id
+# False = every worker rates the wins of its shard and the ratings of the shards are merged (an approximation,
+# see simulation_pool.mergeRatings), True = the parent rates the wins of all the shards in game order once the
+# workers are done: the ratings of a single process run, but rated on a single core
+EXACT_POOL_RATINGS = False
+
+# Use the integer encoded engine (fast_engine.py), same rules and same games for a given seed
+FAST_ENGINE = False
+
+# Play CONCURRENT_GAMES games of the fast engine at once with a policy for every seat (policy_engine.py),
+# the moves of all the games are decided together, one model call per policy
+POLICY_ENGINE = False
+PLAYER_POLICIES = {} # seat: policy of policies.py ("random", "linear", "keras"), other seats play random moves
+CONCURRENT_GAMES = 256
+MODEL_FILE = None # keras model of the "keras" policy
+
+# "mcts" policy (mcts.py): every move is searched with MCTS_ROLLOUTS random rollouts, or for MCTS_MILLISECONDS
+MCTS_ROLLOUTS = 200
+MCTS_MILLISECONDS = 0 # time budget of a move, 0 = use MCTS_ROLLOUTS
+MCTS_EXPLORATION = 0.7 # UCB1 exploration constant
+MCTS_ROLLOUT_TURNS = 1000 # a rollout nobody finished after this many turns counts as lost
+MCTS_CACHE_SIZE = 100000 # positions kept in the transposition cache, 0 = no cache
+MCTS_CACHE_VISITS = 100 # visits a search inherits from the cache at most, older statistics are scaled down
+MCTS_KEY_HAND_SIZE = 3 # cards of the next seat told apart in the cache key, bigger hands share the key
+MCTS_WORKERS = 0 # processes searching the moves of the waiting games, 0 = search in the simulation process
+
+# Tournaments of policies (tournament.py): a matchup stops as soon as the confidence interval of the win rate
+# difference excludes 0 (or is narrower than TOURNAMENT_MARGIN), checked every TOURNAMENT_CHECK_EVERY games
+TOURNAMENT_ALPHA = 0.05 # chance of a wrong decision over all the checks of a matchup
+TOURNAMENT_CHECK_EVERY = 1000
+TOURNAMENT_MAX_GAMES = 1000000
+TOURNAMENT_MARGIN = 0.005 # win rates closer than this are a draw, 0 = play until decided or TOURNAMENT_MAX_GAMES
+
+# TrueSkill ratings are computed in bulk every RATING_BATCH wins (see ratings.py), 0 = once at the end of the run
+RATING_BATCH = 4096
+
 # This can speed up the simulation by a lot !  1.5 to 2.5 faster if set to True
 # It will affect the quality of the data
 ONLY_ONE_PLAYER_CAN_WIN = False
@@ -16,6 +56,19 @@ ONLY_ONE_PLAYER_CAN_WIN = False
 ## This section will mostly have an impact on the generation/saving of logs
 ENABLE_LOGGING = True
 
+# Every game of the run goes into one parquet file (dataset/data.parquet, dataset/dataN.parquet for worker N),
+# turns are buffered and written in row groups of at least ROWS_PER_ROW_GROUP rows
+ROWS_PER_ROW_GROUP = 65536
+ROWS_PER_FILE = 0 # 0 = one file, otherwise start a new file (data_0.parquet, data_1.parquet, ...) after this many rows
+
+# "parquet" (compressed) or "arrow": uncompressed Arrow IPC files (data.arrow) with an index of their games,
+# memory-mapped without copies by mapped_dataset.py for training
+DATASET_FORMAT = "parquet"
+
+# The dataset is written by a thread, finished games wait for it in a queue of WRITER_QUEUE_SIZE games and the
+# simulation only waits when the queue is full, 0 = write in the simulation thread at the end of every game
+WRITER_QUEUE_SIZE = 256
+
 # Limit the amount of turns per simulation. May increase simulation speed, but lowers the amount of data that can be logged
 ENABLE_MAX_TURNS = False
 MAX_TURNS = 100
@@ -23,6 +76,53 @@ MAX_TURNS = 100
 # Automatically filter out games that have no winners
 ONLY_LOG_WINNING_GAMES = True
 
+# Save a small record of every game (seed, config hash, winner order, turns) to dataset/games.parquet
+# Any recorded game can be played again with its full turn log, see replay.py
+RECORD_GAMES = False
+
+# Save the state of the run every CHECKPOINT_EVERY games and continue it later with RESUME (see checkpoint.py)
+# Worker N of the process pool uses its own file (checkpointN.json), not supported by the policy engine
+CHECKPOINT_FILE = None # e.g. "checkpoint.json", None = no checkpoints
+CHECKPOINT_EVERY = 100000
+RESUME = False
+
 # debug
 PLAYER_ID = 900
 
+# Keep aggregate statistics of the games (win rate by seat, game length, hand size, forced draws, draw chains, card plays, ...)
+# with constant memory, printed at the end of the run (see game_statistics.py)
+ENABLE_STATISTICS = False
+STATISTICS_FILE = None # also save them to this json file
+
+# Time the phases of a run and count turns, draws, reshuffles, forced draws, ... (see instrumentation.py)
+# The report is printed at the end of the run
+ENABLE_INSTRUMENTATION = False
+INSTRUMENTATION_REPORT = None # also save the report to this json file
+PROFILE_OUTPUT = None # run under cProfile and save the stats to this file (python -m pstats FILE)
+
+
+
+# The modules that copy the settings when they are imported
+game_modules = ("checkpoint", "fast_engine", "game_logic", "game_statistics", "game_utility", "instrumentation", "mcts",
+                "policies", "policy_engine", "ratings", "replay", "tournament", "uno")
+
+def configure(**settings):
+    # Overrides the settings above (used by cli.py), e.g. configure(NUMBER_OF_PLAYERS=6, FAST_ENGINE=True)
+    # The game modules copy the settings when they are imported, so this must run before importing them:
+    # changing a setting that an imported module already copied raises (setting it to the same value is fine,
+    # a forked worker applies the settings of its parent again)
+    for name, value in settings.items():
+        if not name.isupper() or name not in globals():
+            raise KeyError("Unknown setting: " + name)
+        if value != globals()[name]:
+            for module_name in game_modules:
+                module = sys.modules.get(module_name)
+                if module is not None and name in vars(module):
+                    raise RuntimeError("configure(" + name + "=...) after " + module_name + " was imported, "
+                                       "it keeps the value it copied: configure the settings before importing the game modules")
+
+    globals().update(settings)
+
+def settings():
+    # Every setting, passed to the worker processes of simulation_pool.py
+    return {name: value for name, value in globals().items() if name.isupper()}
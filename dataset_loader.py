@@ -0,0 +1,259 @@
+# Parallel loader of the dataset for training
+# Finds the dataset files (dataset/data*.parquet, dataset/data*.arrow), reads their row groups in a thread pool
+# (pyarrow decodes without the GIL), filters the rows while reading and yields shuffled NumPy batches of
+# batch_size rows. A background thread keeps at most prefetch batches ready, reading never runs far ahead of training.
+#
+#   from dataset_loader import DatasetLoader
+#   loader = DatasetLoader('dataset', batch_size=4096, filters={'has_won': True, 'p_count': 4})
+#   for epoch in range(10):
+#       for batch in loader:            # {column: numpy array of batch_size rows}
+#           ...
+#   dataset = loader.tfDataset()        # the same batches as a tf.data.Dataset
+#
+# filters: {column: value} or {column: [values]}, every filter must match. Row groups whose statistics can't match
+# are not read at all.
+# Shuffling: the row groups are read in a new random order every epoch, and the rows are shuffled inside a buffer
+# of shuffle_buffer rows (the more rows, the better the mix, the more memory).
+# top_card_id is decoded to its card_id, stack_hands=True replaces hand0 .. hand53 by one (rows, 54) 'hand' array.
+
+import os
+import glob
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from game_utility import DATASET_COLUMNS, DATASET_TYPES, NUMBER_OF_KINDS
+
+
+HAND_COLUMNS = ['hand' + str(kind) for kind in range(NUMBER_OF_KINDS)]
+
+END = None  # end of an epoch in the queue of batches
+
+
+def datasetFiles(directory='dataset'):
+    # the dataset files of every worker and part, the records of --record (games.parquet) are not part of it
+    files = sorted(glob.glob(os.path.join(directory, 'data*.parquet')) + glob.glob(os.path.join(directory, 'data*.arrow')))
+    if len(files) == 0:
+        raise FileNotFoundError("No dataset in " + directory)
+    return files
+
+
+def filterValues(filters):
+    # {column: [values]}
+    values = {}
+    for name, value in (filters or {}).items():
+        if name not in DATASET_COLUMNS:
+            raise ValueError("Unknown column " + name + " in the filters")
+        values[name] = list(value) if isinstance(value, (list, tuple, set)) else [value]
+    return values
+
+
+def canMatch(row_group, filters):
+    # False when the statistics of the row group rule out every row
+    for index in range(row_group.num_columns):
+        column = row_group.column(index)
+        values = filters.get(column.path_in_schema)
+        if values is None or column.statistics is None or not column.statistics.has_min_max:
+            continue
+        low, high = column.statistics.min, column.statistics.max
+        if not any(low <= value <= high for value in values):
+            return False
+    return True
+
+
+class DatasetLoader:
+    def __init__(self, directory='dataset', batch_size=4096, columns=None, filters=None, shuffle=True, shuffle_buffer=262144,
+                 drop_remainder=True, workers=4, prefetch=8, stack_hands=False, seed=None):
+        self.files = datasetFiles(directory)
+        self.batch_size = batch_size
+        self.columns = list(columns or DATASET_COLUMNS)
+        self.filters = filterValues(filters)
+        self.shuffle = shuffle
+        self.shuffle_buffer = max(shuffle_buffer, batch_size)
+        self.drop_remainder = drop_remainder
+        self.workers = workers
+        self.prefetch = prefetch
+        self.stack_hands = stack_hands
+        self.random = np.random.default_rng(seed)
+
+        # the filter columns are read too, and dropped after filtering
+        self.read_columns = self.columns + [name for name in self.filters if name not in self.columns]
+        self.pieces = self.findPieces()
+
+    def findPieces(self):
+        # (file, row group) of every row group that can have rows passing the filters, (file, None) for arrow files
+        import pyarrow.parquet as pq
+
+        pieces = []
+        for file_name in self.files:
+            if file_name.endswith('.arrow'):
+                pieces.append((file_name, None))
+                continue
+
+            metadata = pq.ParquetFile(file_name).metadata
+            for row_group in range(metadata.num_row_groups):
+                if canMatch(metadata.row_group(row_group), self.filters):
+                    pieces.append((file_name, row_group))
+        return pieces
+
+    def readPiece(self, piece):
+        # rows of a piece passing the filters, {column: numpy array}, runs in the thread pool
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        file_name, row_group = piece
+        if row_group is None:
+            table = pa.ipc.open_file(pa.memory_map(file_name, 'r')).read_all().select(self.read_columns)
+        else:
+            # one thread per row group already, no threads inside the read
+            table = pq.ParquetFile(file_name).read_row_group(row_group, columns=self.read_columns, use_threads=False)
+
+        if len(self.filters) > 0:
+            mask = None
+            for name, values in self.filters.items():
+                column = table.column(name)
+                if pa.types.is_dictionary(column.type):
+                    column = column.cast(column.type.value_type)
+                match = pc.is_in(column, value_set=pa.array(values, type=column.type))
+                mask = match if mask is None else pc.and_(mask, match)
+            table = table.filter(mask)
+
+        arrays = {}
+        for name in self.columns:
+            column = table.column(name)
+            if pa.types.is_dictionary(column.type):
+                column = column.cast(column.type.value_type)
+            arrays[name] = column.to_numpy()
+        return arrays
+
+    def outputTypes(self):
+        # {name: (numpy dtype, shape of a row)} of the batches
+        dtypes = dict(DATASET_TYPES)
+        types = {}
+        for name in self.columns:
+            if self.stack_hands and name in HAND_COLUMNS:
+                types['hand'] = (np.dtype('uint8'), (NUMBER_OF_KINDS,))
+            else:
+                types[name] = (np.dtype(dtypes[name]), ())
+        return types
+
+    def makeBatch(self, arrays, order):
+        batch = {}
+        for name in self.columns:
+            if self.stack_hands and name in HAND_COLUMNS:
+                continue
+            batch[name] = arrays[name][order]
+        if self.stack_hands:
+            hands = [name for name in self.columns if name in HAND_COLUMNS]
+            if len(hands) > 0:
+                batch['hand'] = np.stack([arrays[name][order] for name in hands], axis=1)
+        return batch
+
+    def batches(self, pieces, stop):
+        # shuffled batches of the rows of the pieces, read by the thread pool with a bounded amount of reads in flight
+        buffered = []
+        buffered_rows = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            reads = deque()
+            next_piece = 0
+
+            while next_piece < len(pieces) or len(reads) > 0:
+                while next_piece < len(pieces) and len(reads) < 2 * self.workers:
+                    reads.append(pool.submit(self.readPiece, pieces[next_piece]))
+                    next_piece += 1
+
+                arrays = reads.popleft().result()
+                rows = len(arrays[self.columns[0]])
+                if rows == 0:
+                    continue
+                buffered.append(arrays)
+                buffered_rows += rows
+
+                if buffered_rows < self.shuffle_buffer:
+                    continue
+
+                # full buffer: every complete batch out, the rest stays for the next rows
+                arrays = {name: np.concatenate([part[name] for part in buffered]) for name in self.columns}
+                order = self.random.permutation(buffered_rows) if self.shuffle else np.arange(buffered_rows)
+                complete = buffered_rows - buffered_rows % self.batch_size
+                for start in range(0, complete, self.batch_size):
+                    yield self.makeBatch(arrays, order[start:start + self.batch_size])
+                    if stop.is_set():
+                        return
+
+                rest = order[complete:]
+                if not self.shuffle:
+                    rest = np.sort(rest)
+                buffered = [{name: arrays[name][rest] for name in self.columns}]
+                buffered_rows = len(rest)
+
+        # end of the epoch
+        if buffered_rows > 0:
+            arrays = {name: np.concatenate([part[name] for part in buffered]) for name in self.columns}
+            order = self.random.permutation(buffered_rows) if self.shuffle else np.arange(buffered_rows)
+            for start in range(0, buffered_rows, self.batch_size):
+                if self.drop_remainder and start + self.batch_size > buffered_rows:
+                    break
+                yield self.makeBatch(arrays, order[start:start + self.batch_size])
+
+    def __iter__(self):
+        # one epoch, the batches are made by a background thread and wait in a queue of prefetch batches
+        pieces = list(self.pieces)
+        if self.shuffle:
+            self.random.shuffle(pieces)
+
+        ready = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for batch in self.batches(pieces, stop):
+                    # waits while the queue is full, gives up when the epoch is abandoned
+                    while not stop.is_set():
+                        try:
+                            ready.put(batch, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    if stop.is_set():
+                        return
+                ready.put(END)
+            except BaseException as error:
+                ready.put(error)
+
+        producer = threading.Thread(target=produce, name="dataset loader", daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                batch = ready.get()
+                if batch is END:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                yield batch
+        finally:
+            stop.set()
+            # frees a producer waiting on a full queue
+            while producer.is_alive():
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+
+    def tfDataset(self):
+        # tf.data.Dataset of the batches, every iteration of the dataset is a new epoch (dataset.repeat(epochs))
+        # tensorflow is heavy, only imported when it is used
+        import tensorflow as tf
+
+        batch_size = self.batch_size if self.drop_remainder else None
+        signature = {name: tf.TensorSpec(shape=(batch_size,) + shape, dtype=tf.as_dtype(dtype))
+                     for name, (dtype, shape) in self.outputTypes().items()}
+        dataset = tf.data.Dataset.from_generator(lambda: iter(self), output_signature=signature)
+        return dataset.prefetch(tf.data.AUTOTUNE)
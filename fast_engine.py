@@ -0,0 +1,673 @@
+# Integer encoded game engine
+# Same rules as game_logic.logic / skipTurn, but cards are small integers (card kinds) that index
+# static attribute tables, and hands, draw pile and discard pile are bytearrays.
+# No Card object is created during a game, the deck template is built once.
+#
+# Card kinds:
+#   color * 13 + n   for the colored cards (color 0..3 = red, green, blue, yellow)
+#                    n = 0..9 numbers, 10 "Draw Two", 11 "Skip", 12 "Reverse"
+#   52               "Wild"
+#   53               "Wild Draw Four"
+#
+# Speed, 4 players, 1 deck, no logging, one core (python benchmark.py game): about 3x the turns per second of
+# the object engine without TrueSkill (about 450k against 150k turns/s), about 2.3x with it, the ratings take
+# the same time in both engines. What is left of a turn is interpreter overhead in turnSteps, logic and
+# playCard (playableCards, skipTurn and single card draws are inlined in turnSteps).
+
+import random
+import numpy as np
+
+import config
+
+import game_utility
+from game_utility import Player, shuffleDeck, resetSeats, removeSeat, NUMBER_OF_KINDS, WILD, WILD_DRAW_FOUR
+from ratings import RatingLog
+from instrumentation import INSTRUMENTATION, stats, clock
+from game_statistics import STATISTICS, run_stats
+
+
+NUMBER_OF_DECKS = config.NUMBER_OF_DECKS
+NUMBER_OF_PLAYERS = config.NUMBER_OF_PLAYERS
+NUMBER_OF_INITIAL_CARDS = config.NUMBER_OF_INITIAL_CARDS
+
+TOTAL_SIMULATIONS = config.TOTAL_SIMULATIONS
+
+# Rules
+ONLY_ONE_PLAYER_CAN_WIN = config.ONLY_ONE_PLAYER_CAN_WIN
+
+# Logging
+ENABLE_LOGGING = config.ENABLE_LOGGING
+RECORD_GAMES = config.RECORD_GAMES
+ONLY_LOG_WINNING_GAMES = config.ONLY_LOG_WINNING_GAMES
+
+ENABLE_MAX_TURNS = config.ENABLE_MAX_TURNS
+MAX_TURNS = config.MAX_TURNS
+
+
+# value codes, two cards have the same value when the card names are equal
+VALUE_DRAW_TWO = 10
+VALUE_SKIP = 11
+VALUE_REVERSE = 12
+VALUE_WILD = 13
+VALUE_WILD_DRAW_FOUR = 14
+
+# Static attribute tables, indexed by card kind (same meaning as the Card attributes)
+KIND_COLOR = []         # 1 red, 2 green, 3 blue, 4 yellow, 5 none
+KIND_TYPE = []          # 0 number, 1 action, 2 wildcard
+KIND_ACTION_TYPE = []
+KIND_VALUE = []
+KIND_DRAW_AMOUNT = []
+KIND_POINTS = []
+KIND_CARD_ID = []
+
+for kind in range(NUMBER_OF_KINDS):
+    if kind < WILD:
+        color = kind // 13 + 1
+        n = kind % 13
+        if n < 10:
+            card = (color, 0, 0, n, 0, n)
+        else:
+            # action_type is the index inside ["Draw Two", "Skip", "Reverse"], like generateDeck
+            card = (color, 1, n - 10, n, 2 if n == VALUE_DRAW_TWO else 0, 20)
+    elif kind == WILD:
+        card = (5, 2, 0, VALUE_WILD, 0, 50)
+    else:
+        card = (5, 2, 0, VALUE_WILD_DRAW_FOUR, 4, 50)
+
+    KIND_COLOR.append(card[0])
+    KIND_TYPE.append(card[1])
+    KIND_ACTION_TYPE.append(card[2])
+    KIND_VALUE.append(card[3])
+    KIND_DRAW_AMOUNT.append(card[4])
+    KIND_POINTS.append(card[5])
+    KIND_CARD_ID.append(int(str(card[0])+str(card[1])+str(card[2])+str(card[5])))
+
+KIND_COLOR = tuple(KIND_COLOR)
+KIND_TYPE = tuple(KIND_TYPE)
+KIND_ACTION_TYPE = tuple(KIND_ACTION_TYPE)
+KIND_VALUE = tuple(KIND_VALUE)
+KIND_DRAW_AMOUNT = tuple(KIND_DRAW_AMOUNT)
+KIND_POINTS = tuple(KIND_POINTS)
+KIND_CARD_ID = tuple(KIND_CARD_ID)
+
+# Translation tables for bytearray.translate, hand.translate(table) gives a 1 for every playable card
+# PLAYABLE[value][color] = cards that can be placed on a top card with that value and color
+# SAME_VALUE[value] = cards that can answer a draw card with that value
+PLAYABLE = []
+SAME_VALUE = []
+for value in range(15):
+    PLAYABLE.append([])
+    for color in range(6):
+        PLAYABLE[value].append(bytes(
+            1 if kind < NUMBER_OF_KINDS and (KIND_TYPE[kind] == 2 or KIND_VALUE[kind] == value or KIND_COLOR[kind] == color) else 0
+            for kind in range(256)))
+    SAME_VALUE.append(bytes(1 if kind < NUMBER_OF_KINDS and KIND_VALUE[kind] == value else 0 for kind in range(256)))
+
+
+def generateDeckTemplate():
+    # Same card order as game_utility.generateDeck, so a seed shuffles both decks the same way
+    # (both engines take their deck orders from game_utility.shuffler)
+    deck = bytearray()
+
+    for _ in range(NUMBER_OF_DECKS):
+        for color in range(4):
+            for value in range(10):
+                deck.append(color * 13 + value)
+                if value != 0:
+                    deck.append(color * 13 + value)
+
+        for _ in range(NUMBER_OF_DECKS):
+            for color in range(4):
+                for action in range(3):
+                    deck.append(color * 13 + 10 + action)
+                    deck.append(color * 13 + 10 + action)
+
+        for _ in range(4):
+            deck.append(WILD)
+            deck.append(WILD_DRAW_FOUR)
+
+    return bytes(deck)
+
+
+class FastTable:
+    def __init__(self):
+        self.deck = bytearray()     # draw pile, the last item is the top of the pile
+        self.alive = {}             # Player objects, Player.cards holds a bytearray of card kinds
+        self.dead = {}
+        self.next_seat = []         # seat ring, see game_utility.resetSeats
+        self.previous_seat = []
+        self.rating_log = None      # ratings.RatingLog, the wins are rated after the games (None = not rated)
+        self.shuffler = None        # DeckShuffler of the game, None = game_utility.shuffler (seedGame), see seedTable
+        self.seat_random = None     # random.Random of every seat for the policies, see seedTable
+        self.counted = True         # False for the rollouts of a search (mcts.py) and replays (replay.py), not part of the statistics of the run
+        self.finish_order = []      # ids of the winners of the game, in order
+        self.turns = 0              # turns of the game, up to date after every turn
+        self.stalled_turns = 0      # turns in a row nobody could play or draw, see the failsafe of turnSteps
+        self.reshuffles = 0         # discard pile reshuffles of the game
+        self.cards = bytearray()    # discard pile, last item is the top card
+        self.top_color = 5          # color of the top card, differs from KIND_COLOR for wild cards
+        self.top_used = 1           # Card.used of the top card
+        self.turn = 0
+        self.direction = True       # true = clockwise , false = counter clockwise
+        self.lastPlacementBy = -1
+        self.turns_to_be_skipped = 0
+        self.to_be_drawn = 0
+
+
+def newFastTable():
+    table = FastTable()
+    for i in range(NUMBER_OF_PLAYERS):
+        table.alive[i] = Player(bytearray(), i, 1)
+    return table
+
+
+def resetTable(table):
+    table.alive.update(table.dead)
+    table.dead.clear()
+    resetSeats(table)
+    table.turn = 0
+    table.direction = True
+    table.lastPlacementBy = -1
+    table.turns_to_be_skipped = 0
+    table.to_be_drawn = 0
+    table.finish_order = []
+    table.reshuffles = 0
+
+
+def seedTable(table, game_seed):
+    # Random streams of a game played next to other games (policy_engine.py): its own deck shuffler and one
+    # stream per seat, a seat draws the same numbers whatever the other seats play (see paired.py)
+    table.shuffler = game_utility.DeckShuffler(game_seed)
+    if table.seat_random is None:
+        table.seat_random = [random.Random() for _ in range(NUMBER_OF_PLAYERS)]
+    for seat, seat_random in enumerate(table.seat_random):
+        seat_random.seed(game_seed + seat + 1)
+
+
+def deckTemplate():
+    return np.frombuffer(generateDeckTemplate(), dtype=np.uint8)
+
+
+def drawCards(table, amount):
+    # Same as game_utility.drawCards, the top of the draw pile is the end of table.deck
+
+    # not enough cards, the discard pile goes under the draw pile first
+    if amount > len(table.deck) and len(table.cards) > 1:
+        recycleDiscardPile(table)
+
+    deck = table.deck
+    start = len(deck) - min(amount, len(deck))
+    drawn = deck[start:]
+    del deck[start:]
+    return drawn
+
+
+def skipTurn(table):
+    if len(table.alive) == 2 and KIND_VALUE[table.cards[-1]] == VALUE_REVERSE and table.top_used == 0:  # Only two players
+        table.top_used = 1  # Skip the next player
+    elif table.direction:
+        table.turn = table.next_seat[table.turn]
+    else:
+        table.turn = table.previous_seat[table.turn]
+
+
+def playableCards(table):
+    # need to draw cards ?
+    if table.to_be_drawn > 0:
+        return SAME_VALUE[KIND_VALUE[table.cards[-1]]]
+
+    # first time playing ?
+    if table.lastPlacementBy != table.turn:
+        return PLAYABLE[KIND_VALUE[table.cards[-1]]][table.top_color]
+
+    # can't play anything, must draw
+    return None
+
+
+def canPlayerPlay(hand, table):
+    playable = playableCards(table)
+    return playable is not None and 1 in hand.translate(playable)
+
+
+def playCard(mask, rng=random):
+    # mask = hand.translate(playableCards(table)), same pick as game_logic.playCard
+    # randrange(n) draws the same numbers as randrange(0, n) with less argument handling
+    index = mask.find(1)
+    count = mask.count(1, index + 1) + 1
+    if count > 1:
+        for _ in range(rng.randrange(count - 1)):
+            index = mask.find(1, index + 1)
+    return index
+
+
+def changeColor(hand, rng=random):
+    if len(hand) > 0:
+        return KIND_COLOR[hand[rng.randrange(len(hand))]]
+    return rng.randint(1, 4)
+
+
+def get_game_data(game_data, table, turns, player_id, p_count, hand_data, draw_amount):
+    # Same row as game_utility.get_game_data
+    top = table.cards[-1]
+
+    game_data.addRow((turns, KIND_CARD_ID[top], player_id, table.top_color, KIND_TYPE[top], KIND_DRAW_AMOUNT[top],
+                      KIND_POINTS[top], draw_amount, 0, p_count, table.direction),
+                     hand_data)
+
+    return game_data
+
+
+def logic(table, hand, index, game_data, turns, p_count, draw_amount):
+    # Plays hand[index], the color of a wild card is chosen by the caller (top_color stays 5)
+    # the moves of the MCTS rollouts (table.counted False) are not timed
+    timed = INSTRUMENTATION and table.counted
+    if timed:
+        logic_start = clock()
+
+    if game_data is not None:
+        hand_data = hand[:]
+
+    kind = hand.pop(index)
+    value = KIND_VALUE[kind]
+
+    if STATISTICS and table.counted:
+        run_stats.playCard(KIND_CARD_ID[kind])
+
+    # check if direction must be reversed
+    if value == VALUE_REVERSE:
+        table.direction = not table.direction
+
+    # check if player must be skipped
+    elif value == VALUE_SKIP:
+        table.turns_to_be_skipped += 1
+
+    # add to the bank
+    table.to_be_drawn += KIND_DRAW_AMOUNT[kind]
+
+    # set who placed the card
+    table.lastPlacementBy = table.turn
+
+    # put used card on the card pile
+    table.cards.append(kind)
+    table.top_color = KIND_COLOR[kind]
+    table.top_used = 0
+
+    if game_data is not None:
+        if timed:
+            logging_start = clock()
+
+        get_game_data(game_data, table, turns, table.turn, p_count, hand_data, draw_amount)
+
+        if timed:
+            stats.time("turn loop/logic/logging", logging_start)
+
+    if timed:
+        stats.time("turn loop/logic", logic_start)
+
+
+def recycleDiscardPile(table):
+    # Shuffle the discard pile under the cards left in the draw pile, the top card stays on the table
+    if INSTRUMENTATION and table.counted:
+        stats.count("reshuffles")
+
+    table.reshuffles += 1
+    top = table.cards.pop()
+
+    if table.shuffler is not None:
+        pile = table.shuffler.shuffle(table.cards)
+    else:
+        pile = shuffleDeck(table.cards)
+    pile += table.deck
+
+    table.deck = pile
+    table.cards = bytearray((top,))
+
+
+def playOut(table):
+    # Plays a game in progress to its end with the random policy (rollouts from a snapshot, see snapshotTable),
+    # returns the amount of winners, nothing is logged
+    try:
+        next(turnSteps(table, None))
+    except StopIteration as end:
+        return end.value
+
+
+def snapshotTable(table):
+    # State of a game in progress: draw pile, discard pile, hands, seats, direction, cards to be drawn, turns
+    # to be skipped, who placed the top card, turns of the game, ... and the counters of the players (wins, score,
+    # performance, turns)
+    # Everything is copied into bytes and tuples, a snapshot never changes and can be restored any number of times
+    # The random streams are not part of it, every rollout from a snapshot draws new numbers
+    players = dict(table.alive)
+    players.update(table.dead)
+    return (
+        bytes(table.deck), bytes(table.cards),
+        tuple((player_id, bytes(player.cards), player.wins, player.score, player.performance, player.turns) for player_id, player in players.items()),
+        tuple(table.alive), tuple(table.dead), tuple(table.next_seat), tuple(table.previous_seat), tuple(table.finish_order),
+        table.turn, table.direction, table.lastPlacementBy, table.turns_to_be_skipped, table.to_be_drawn,
+        table.top_color, table.top_used, table.turns, table.stalled_turns, table.reshuffles,
+    )
+
+
+def restoreTable(table, snapshot):
+    # Puts a table back in the state of the snapshot, the table can be another one with the same players
+    # (newFastTable), e.g. a scratch table for rollouts
+    (deck, cards, player_states, alive, dead, next_seat, previous_seat, finish_order,
+     table.turn, table.direction, table.lastPlacementBy, table.turns_to_be_skipped, table.to_be_drawn,
+     table.top_color, table.top_used, table.turns, table.stalled_turns, table.reshuffles) = snapshot
+
+    players = table.alive
+    players.update(table.dead)
+    for player_id, hand, wins, score, performance, turns in player_states:
+        player = players[player_id]
+        player.cards = bytearray(hand)
+        player.wins = wins
+        player.score = score
+        player.performance = performance
+        player.turns = turns
+
+    table.alive = {player_id: players[player_id] for player_id in alive}
+    table.dead = {player_id: players[player_id] for player_id in dead}
+    table.deck = bytearray(deck)
+    table.cards = bytearray(cards)
+    table.next_seat = list(next_seat)
+    table.previous_seat = list(previous_seat)
+    table.finish_order = list(finish_order)
+    return table
+
+
+def playGame(table, template, game_data):
+    # Plays a whole game with the random policy, returns the amount of winners
+    # game_data is a TurnLog, or None when nothing is logged
+    try:
+        next(gameSteps(table, template, game_data))
+    except StopIteration as end:
+        return end.value
+
+
+def gameSteps(table, template, game_data, decisions=False):
+    # Generator that plays a game, returns the amount of winners (StopIteration.value)
+    # decisions=False: the random policy plays every move and nothing is yielded
+    # decisions=True: the moves are asked to the caller (see policy_engine.py),
+    #   index = yield mask     the index of the card of the hand to play, mask = playable cards of the hand
+    #   color = yield None     the color (1..4) of the wild card that was just played
+    # the player is table.alive[table.turn]
+    # the games of a replay (table.counted False) are not counted again
+    timed = INSTRUMENTATION and table.counted
+    if timed:
+        phase_start = clock()
+
+    shuffler = table.shuffler if table.shuffler is not None else game_utility.shuffler
+    table.deck = bytearray(template[shuffler.newOrder(len(template))])
+
+    # Place the top card of the draw pile face-up in the middle of the table
+    table.cards = drawCards(table, 1)
+    table.top_color = KIND_COLOR[table.cards[0]]
+    table.top_used = 1
+
+    # Deal the cards, like game_utility.dealCards
+    for i in range(NUMBER_OF_PLAYERS):
+        table.alive[i].cards = drawCards(table, NUMBER_OF_INITIAL_CARDS + 1)
+
+    if game_data is not None:
+        get_game_data(game_data, table, 0, table.lastPlacementBy, NUMBER_OF_PLAYERS, b"", 0)
+
+    table.turns = 0
+    table.stalled_turns = 0
+
+    if timed:
+        phase_start = stats.time("setup", phase_start)
+
+    winners = yield from turnSteps(table, game_data, decisions)
+
+    if STATISTICS and table.counted:
+        run_stats.endGame(table.turns, table.finish_order, table.reshuffles)
+
+    if timed:
+        # a game that waits for its moves is paused, its turn loop time would include the other games
+        if not decisions:
+            stats.time("turn loop", phase_start)
+        stats.count("games")
+        stats.count("turns", table.turns)
+        stats.count("wins", winners)
+
+    return winners
+
+
+def turnSteps(table, game_data, decisions=False):
+    # The turns of a game from its current state until the game is over, see gameSteps
+    # A game in progress (restoreTable) goes on from here, returns the amount of winners of the whole game
+    # table.turns and table.stalled_turns are kept up to date, a snapshot taken at a yield continues the count
+    winners = len(table.finish_order)
+    turns = table.turns
+    counted = table.counted
+    alive = table.alive
+
+    while True:
+
+        p_count = len(alive)
+
+        # handle skip turn
+        while table.turns_to_be_skipped > 0:
+            table.turns_to_be_skipped -= 1
+            skipTurn(table)
+
+        turn_backup = table.turn
+        player = alive[turn_backup]
+        hand = player.cards
+
+        # Player's turn starts here
+        turns += 1
+        table.turns = turns
+        player.turns += 1
+
+        if STATISTICS and counted:
+            run_stats.turn(len(hand))
+
+        # playableCards, inlined
+        if table.to_be_drawn > 0:
+            playable = SAME_VALUE[KIND_VALUE[table.cards[-1]]]
+        elif table.lastPlacementBy != turn_backup:
+            playable = PLAYABLE[KIND_VALUE[table.cards[-1]]][table.top_color]
+        else:
+            playable = None
+        mask = hand.translate(playable) if playable is not None else b""
+
+        draw_amount = 0
+        if 1 not in mask:
+            # Draw
+            draw_amount = 1
+            if table.to_be_drawn > 0:
+                draw_amount = table.to_be_drawn
+                table.to_be_drawn = 0
+
+                if STATISTICS and counted:
+                    run_stats.forcedDraw(draw_amount, KIND_DRAW_AMOUNT[table.cards[-1]])
+
+                if INSTRUMENTATION and counted:
+                    stats.count("forced draws")
+                    stats.count("forced cards", draw_amount)
+                    stats.maximum("longest forced draw", draw_amount)
+
+            player.performance -= draw_amount
+            if draw_amount == 1 and table.deck:
+                # most draws are a single card from a pile that is not empty, no drawCards call
+                hand.append(table.deck.pop())
+                drawn = 1
+            else:
+                cards = drawCards(table, draw_amount)
+                hand += cards
+                drawn = len(cards)
+
+            if INSTRUMENTATION and counted:
+                stats.count("draws")
+                stats.count("cards drawn", drawn)
+
+            # IF the drawn card is playable:
+            if playable is not None:
+                mask = hand.translate(playableCards(table))
+
+            if 1 not in mask:
+                if drawn == 0:
+                    table.stalled_turns += 1
+                else:
+                    table.stalled_turns = 0
+
+        if 1 in mask:
+            if decisions:
+                index = yield mask
+            else:
+                index = playCard(mask)
+
+            logic(table, hand, index, game_data, turns, p_count, draw_amount)
+
+            # check if color must be changed
+            if table.top_color == 5:
+                if decisions:
+                    table.top_color = yield None
+                else:
+                    table.top_color = changeColor(hand)
+
+            player.performance += 1
+            table.stalled_turns = 0
+
+        # skipTurn, inlined
+        if p_count == 2 and KIND_VALUE[table.cards[-1]] == VALUE_REVERSE and table.top_used == 0:
+            table.top_used = 1
+        elif table.direction:
+            table.turn = table.next_seat[turn_backup]
+        else:
+            table.turn = table.previous_seat[turn_backup]
+
+        # IF a player has no cards left:
+        if not hand:
+            player.wins += 1
+
+            # Player with no cards left wins
+            points = 0
+            for player_id in alive:
+                if player_id != turn_backup:
+                    for kind in alive[player_id].cards:
+                        points += KIND_POINTS[kind]
+            player.score += points
+
+            if table.rating_log is not None:
+                table.rating_log.recordAlive(alive, turn_backup)
+
+            if game_data is not None:
+                game_data.markWinner(turn_backup)
+
+            # move player into dead players
+            table.dead[turn_backup] = alive.pop(turn_backup)
+            removeSeat(table, turn_backup)
+            table.finish_order.append(turn_backup)
+            winners += 1
+
+        # failsafe, every card is in the players' hands and nobody can play anymore
+        if table.stalled_turns > 2 * len(alive):
+            if INSTRUMENTATION and counted:
+                stats.count("stalled games")
+            break
+
+        # end conditions
+        if (ONLY_ONE_PLAYER_CAN_WIN and winners > 0) or (
+            not ONLY_ONE_PLAYER_CAN_WIN and winners >= NUMBER_OF_PLAYERS - 1) or (
+            ENABLE_MAX_TURNS and turns > MAX_TURNS):
+            break
+
+    return winners
+
+
+def startFastGame(total_simulations=TOTAL_SIMULATIONS, seed=None, shard=None, first_game_id=0):
+    # Drop-in replacement of uno.startGame
+    from game_utility import newDatasetWriter, TurnLog
+    from replay import GameRecorder
+    from checkpoint import CHECKPOINT_EVERY, checkpointFile, startingPoint, checkpointRun
+
+    # every game is seeded from the run seed and its id, like uno.startGame
+    if seed is None:
+        seed = game_utility.newRunSeed()
+
+    template = deckTemplate()
+
+    # Important check
+    if NUMBER_OF_PLAYERS * NUMBER_OF_INITIAL_CARDS > len(template):
+        print("[ERROR] NUMBER_OF_PLAYERS * NUMBER_OF_INITIAL_CARDS > len(deck)")
+        print("Either lower NUMBER_OF_PLAYERS or NUMBER_OF_INITIAL_CARDS")
+        return {}
+
+    table = newFastTable()
+    table.rating_log = RatingLog(dict(table.alive))
+
+    # a resumed run continues from its checkpoint (see checkpoint.py)
+    checkpoint_file = checkpointFile(shard)
+    run = startingPoint(shard, seed, first_game_id, table.alive)
+    seed = run['run_seed']
+    simulation = run['simulation']
+    game_id = run['next_game_id']
+
+    game_data = TurnLog() if ENABLE_LOGGING else None
+
+    # the dataset file stays open for the whole run, what is still buffered is written
+    # even if the run is interrupted
+    writer = newDatasetWriter(shard, first_part=run['dataset_part']) if ENABLE_LOGGING else None
+    recorder = GameRecorder(seed, shard, first_part=run['records_part']) if RECORD_GAMES else None
+
+    if INSTRUMENTATION:
+        run_start = clock()
+
+    try:
+        while (simulation < total_simulations and total_simulations != 0) or (total_simulations == 0):
+
+            game_seed = game_utility.seedGame(seed, game_id)
+            resetTable(table)
+
+            if ENABLE_LOGGING:
+                game_data.clear()
+
+            winners = playGame(table, template, game_data)
+
+            if RECORD_GAMES:
+                recorder.record(game_id, game_seed, table.turns, table.finish_order)
+
+            if total_simulations > 0:
+                simulation += 1
+
+            if ((ONLY_LOG_WINNING_GAMES and winners > 0) or (not ONLY_LOG_WINNING_GAMES)) and ENABLE_LOGGING:
+                if INSTRUMENTATION:
+                    phase_start = clock()
+
+                writer.write(game_data, game_id)
+
+                if INSTRUMENTATION:
+                    stats.time("dataset", phase_start)
+
+            # every game gets an id, logged or not
+            game_id += 1
+
+            if checkpoint_file is not None and (game_id - first_game_id) % CHECKPOINT_EVERY == 0:
+                checkpointRun(checkpoint_file, seed, game_id, simulation, table.rating_log, writer, recorder)
+
+    finally:
+        table.rating_log.update()
+
+        if recorder is not None:
+            recorder.close()
+
+        if writer is not None:
+            if INSTRUMENTATION:
+                phase_start = clock()
+
+            writer.close()
+
+            if INSTRUMENTATION:
+                stats.time("dataset", phase_start)
+
+        if INSTRUMENTATION:
+            stats.time("run", run_start)
+
+    # END of simulation
+    table.alive.update(table.dead)
+    table.dead.clear()
+
+    return table.alive
@@ -1,10 +1,10 @@
 import config
 import random
-import tensorflow as tf
-import numpy as np
-import trueskill
 
 from game_utility import get_game_data
+from instrumentation import INSTRUMENTATION, stats, clock
+from game_statistics import STATISTICS, run_stats
+from ratings import rateWin
 
 NUMBER_OF_DECKS = config.NUMBER_OF_DECKS
 NUMBER_OF_PLAYERS = config.NUMBER_OF_PLAYERS
@@ -19,96 +19,64 @@ ONLY_ONE_PLAYER_CAN_WIN = config.ONLY_ONE_PLAYER_CAN_WIN
 
 
 def skipTurn(table, currentTurn):
-    remaining_players = table.alive.keys()
-    keys_list = list(remaining_players)
-    keys_list = sorted(remaining_players)
-    num_players = len(keys_list)
+    top_card = table.cards[-1]
 
-    # Get the current index
-    current_index = keys_list.index(currentTurn)
-    
+    if len(table.alive) == 2 and top_card.value == "Reverse" and top_card.used == 0:  # Only two players
+        table.turn = currentTurn  # Skip the next player
+        top_card.used = 1
 
-    # Get the next index
-    next_index = 0
-    if num_players == 2 and (table.cards[len(table.cards) -1].value == "Reverse" or table.cards[len(table.cards) -1].value == "Reverse") and table.cards[len(table.cards) -1].used == 0:  # Only two players
-        
-        next_index = current_index  # Skip the next player
-        table.cards[len(table.cards) -1].used = 1
-        
+    # seat ring, see game_utility.resetSeats
+    elif table.direction:
+        table.turn = table.next_seat[currentTurn]
     else:
-        if table.direction:
-            next_index = (current_index + 1) % len(keys_list)
-        else:
-            next_index = (current_index - 1) % len(keys_list)
-    
-    table.turn = keys_list[next_index]
-    return table
-
-
-
+        table.turn = table.previous_seat[currentTurn]
 
+    return table
 
 
 def canPlayerPlay(hand, table):
+    # hand is a game_utility.Hand, its counts answer without looking at the cards
 
     if len(table.cards) < 1:
         return False
-    
+
+    top = table.cards[len(table.cards) - 1]
 
     # need to draw cards ?
     if table.to_be_drawn > 0:
-        for card in hand:
-            if card.value == table.cards[len(table.cards) - 1].value:
-                return True
-        return False
+        return hand.countValue(top.value) > 0
 
     # first time playing ?
     if table.lastPlacementBy != table.alive[table.turn].id:
-        for card in hand:
-            if card.type == 2:
-                return True
-            elif card.value == table.cards[len(table.cards) - 1].value:
-                return True
-            elif card.color == table.cards[len(table.cards) - 1].color:
-                return True
-    elif table.lastPlacementBy != table.alive[table.turn].id: # 2nd time playing
-        for card in hand:
-            if card.value == table.cards[len(table.cards) - 1].value:
-                return True
-    
+        return hand.countPlayable(top) > 0
+
     # can't play anything, must draw
     return False
 
 def playCard(hand, table):
-    playableCards = []
-
-    value = table.cards[len(table.cards) - 1].value
-    color = table.cards[len(table.cards) - 1].color
-
-    if table.lastPlacementBy != table.turn and table.to_be_drawn == 0:    
-        for card in hand:
-            if card.type == 2:
-                playableCards.append(card)
-                continue
-            if card.value == value:
-                playableCards.append(card)
-                continue
-            if card.color == color:
-                playableCards.append(card)
-                continue
+    top = table.cards[len(table.cards) - 1]
+    value = top.value
+    color = top.color
+
+    first_time = table.lastPlacementBy != table.turn and table.to_be_drawn == 0
+    if first_time:
+        count = hand.countPlayable(top)
     else:
-        for card in hand:
-            if card.value == value:
-                playableCards.append(card)
+        count = hand.countValue(value)
 
+    if count > 0:
+        # pick the same card as picking from the list of playable cards
+        pick = 0
+        if count > 1:
+            pick = random.randrange(0, count - 1)
+
+        # walk the hand only until the picked card
+        for index, card in enumerate(hand):
+            if card.value == value or (first_time and (card.type == 2 or card.color == color)):
+                if pick == 0:
+                    return index
+                pick -= 1
 
-    if len(playableCards) > 0:
-        if len(playableCards) > 1:
-            index = playableCards[random.randrange(0, len(playableCards) - 1)]
-            return hand.index(index)
-        else:
-            return hand.index(playableCards[0])
-    
     print("impossible")
     # This should never hit
     return 9999
@@ -116,25 +84,38 @@ def playCard(hand, table):
 
 
 def changeColor(table):
-    possibilities = []
-
-    if len(table.alive[table.turn].cards) > 0:
+    hand = table.alive[table.turn].cards
 
-        for card in table.alive[table.turn].cards:
-            possibilities.append(card.color)
-
-        return possibilities[random.randrange(0, len(possibilities))]
+    if len(hand) > 0:
+        # color of a random card of the hand
+        return hand[random.randrange(0, len(hand))].color
     else:
         return random.randint(1,4)
 
 
 def canCardBePlayed(table, hand, index):
-        card = hand[index]
-        hand = []
-        hand.append(card)
-        return canPlayerPlay(hand, table) # will return true of false
+    # same rules as canPlayerPlay for one card of the hand
+    if len(table.cards) < 1:
+        return False
+
+    card = hand[index]
+    top = table.cards[len(table.cards) - 1]
+
+    # need to draw cards ?
+    if table.to_be_drawn > 0:
+        return card.value == top.value
+
+    # first time playing ?
+    if table.lastPlacementBy != table.alive[table.turn].id:
+        return card.type == 2 or card.color == top.color or card.value == top.value
+
+    # can't play anything, must draw
+    return False
 
 def logic(table, hand, game_data, turns, p_count, draw_amount):
+
+    if INSTRUMENTATION:
+        logic_start = clock()
     
     while canPlayerPlay(hand, table):
         
@@ -160,6 +141,9 @@ def logic(table, hand, game_data, turns, p_count, draw_amount):
             index = int(input("pick index: "))
 
         hand_data = hand.copy()
+
+        if STATISTICS:
+            run_stats.playCard(hand[index].card_id)
         
         # check if direction must be reversed
         if hand[index].value == "Reverse":
@@ -183,42 +167,26 @@ def logic(table, hand, game_data, turns, p_count, draw_amount):
         table.alive[table.turn].cards = hand
 
         if ENABLE_LOGGING:
+            if INSTRUMENTATION:
+                logging_start = clock()
+
             game_data = get_game_data(game_data, table, turns, p_count, hand_data, draw_amount)
 
+            if INSTRUMENTATION:
+                stats.time("turn loop/logic/logging", logging_start)
+
         # check if color must be changed
         if table.cards[len(table.cards) - 1].color == 5:
             table.cards[len(table.cards) - 1].color = changeColor(table)
-        
+
+        if INSTRUMENTATION:
+            stats.time("turn loop/logic", logic_start)
         
         return table, hand, game_data
 
 
 
 def update_trueskill(table, winning_player_id):
-    
-    players = list(table.alive.values())
-    
-    env = trueskill.TrueSkill()
-
-    ratings = []
-    for player in players:
-        player_rating = env.create_rating(player.trueskill)
-        player_rating_group = [player_rating]  # Wrap the rating in a list
-        ratings.append(player_rating_group)
-
-    # index of the winning player
-    winning_player_index = [player.id for player in players].index(winning_player_id)
-
-    # list of ranks for all players
-    ranks = [1] * len(players)  # SEt all ranks to 1 initially
-    ranks[winning_player_index] = 0  # Set the rank of the winning player to 0
-
-    # update the TrueSkill ratings based on the outcome
-    new_ratings = env.rate(ratings, ranks=ranks)
-
-    for i, player in enumerate(players):
-        player.trueskill = new_ratings[i][0].mu
-
-    table.alive = {player.id: player for player in players}
-
+    # Rates the win right away, the engines record the wins in a ratings.RatingLog and rate them in bulk
+    rateWin(table.alive, list(table.alive), winning_player_id)
     return table
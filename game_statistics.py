@@ -0,0 +1,283 @@
+# Aggregate statistics of a run, with constant memory
+# Instead of logging every turn, the engines feed running totals while they play (behind "if STATISTICS:"):
+#   seats          finishing position of every seat, win rate by seat with its Wilson interval
+#   game turns     turns per game
+#   hand size      cards held by the player at the start of every turn
+#   forced draw    cards drawn when a draw card can't be answered
+#   draw chain     draw cards played in a row before a player had to draw (forced draw / cards of one draw card)
+#   reshuffles     discard pile reshuffles per game
+#   card plays     cards played, by card_id (the two wild cards share a card_id, like in the dataset), share of
+#                  the plays with its Wilson interval
+# Counts go into histograms with a fixed amount of bins, the rare larger values only update a running mean
+# and variance, so nothing grows with the amount of games. Means come with their 95% confidence interval.
+# The hand sizes of the turns of a game are far from independent, the interval of their mean comes from the
+# totals of every game (GameMeans) instead of every turn.
+# The summary is printed at the end of the run and saved as json (STATISTICS_FILE).
+#   python cli.py -n 100000 --engine fast --no-logging --stats statistics.json
+
+import json
+import math
+
+import config
+
+
+STATISTICS = config.ENABLE_STATISTICS
+NUMBER_OF_PLAYERS = config.NUMBER_OF_PLAYERS
+
+Z = 1.96 # 95% confidence intervals
+
+
+def wilsonInterval(successes, trials, z=Z):
+    # Confidence interval of a proportion, stays inside [0, 1] even for rare events
+    if trials == 0:
+        return [0.0, 1.0]
+
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return [center - margin, center + margin]
+
+
+class Accumulator:
+    # Running count, mean and variance (Welford), merged with the parallel formula of Chan et al.
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0   # sum of squared differences from the mean
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def combine(self, count, mean, m2):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def toDict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+
+class Histogram:
+    # counts[value] for values below size, larger values go into the overflow accumulator
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.overflow = Accumulator()
+        self.maximum = 0
+
+    def add(self, value):
+        if value < len(self.counts):
+            self.counts[value] += 1
+        else:
+            self.overflow.add(value)
+            if value > self.maximum:
+                self.maximum = value
+
+    def accumulator(self):
+        # count, mean and variance of every value
+        total = Accumulator()
+        for value, count in enumerate(self.counts):
+            if count > 0:
+                # count values equal to value: mean = value, no spread
+                total.combine(count, value, 0.0)
+        total.combine(self.overflow.count, self.overflow.mean, self.overflow.m2)
+        return total
+
+    def merge(self, other):
+        # other is the toDict() of another histogram of the same size
+        for value, count in enumerate(other['counts']):
+            self.counts[value] += count
+        self.overflow.combine(**other['overflow'])
+        self.maximum = max(self.maximum, other['maximum'])
+
+    def toDict(self):
+        return {'counts': list(self.counts), 'overflow': self.overflow.toDict(), 'maximum': self.maximum}
+
+    def summary(self):
+        total = self.accumulator()
+        margin = Z * math.sqrt(total.variance() / total.count) if total.count > 0 else 0.0
+
+        largest = self.maximum
+        for value in range(len(self.counts) - 1, -1, -1):
+            if self.counts[value] > 0:
+                largest = max(largest, value)
+                break
+
+        return {
+            'count': total.count,
+            'mean': total.mean,
+            'mean_interval': [total.mean - margin, total.mean + margin],
+            'std': math.sqrt(total.variance()),
+            'max': largest,
+            'histogram': {value: count for value, count in enumerate(self.counts) if count > 0},
+            'overflow': self.overflow.count,
+        }
+
+
+class GameMeans:
+    # Mean of a value seen every turn (sum of the values / turns) with a confidence interval from the games:
+    # the games are independent, the turns of a game are not. Ratio estimator over the games, only running
+    # sums are kept (values S and turns T of every game: sums of S, T, S^2, T^2 and S*T).
+    def __init__(self):
+        self.game_sum = 0   # the game being played
+        self.game_turns = 0
+        self.games = 0
+        self.sums = [0.0, 0.0, 0.0, 0.0, 0.0]   # S, T, S^2, T^2, S*T
+
+    def add(self, value):
+        self.game_sum += value
+        self.game_turns += 1
+
+    def endGame(self):
+        if self.game_turns > 0:
+            total, turns = self.game_sum, self.game_turns
+            self.games += 1
+            for index, value in enumerate((total, turns, total * total, turns * turns, total * turns)):
+                self.sums[index] += value
+        self.game_sum = 0
+        self.game_turns = 0
+
+    def interval(self, z=Z):
+        games = self.games
+        if games == 0 or self.sums[1] == 0:
+            return [0.0, 0.0]
+        total, turns, total2, turns2, cross = self.sums
+        mean = total / turns
+        if games == 1:
+            return [mean, mean]
+
+        # variance of the residuals S - mean * T of the games
+        residuals = max(total2 - 2 * mean * cross + mean * mean * turns2, 0.0) / (games - 1)
+        margin = z * math.sqrt(residuals / games) / (turns / games)
+        return [mean - margin, mean + margin]
+
+    def merge(self, other):
+        self.games += other['games']
+        for index, value in enumerate(other['sums']):
+            self.sums[index] += value
+
+    def toDict(self):
+        return {'games': self.games, 'sums': list(self.sums)}
+
+
+class RunStatistics:
+    def __init__(self, players=NUMBER_OF_PLAYERS):
+        self.games = 0
+        # positions[seat][position], position NUMBER_OF_PLAYERS = did not finish
+        self.positions = [[0] * (players + 1) for _ in range(players)]
+        self.game_turns = Histogram(1024)
+        self.hand_size = Histogram(128)
+        self.hand_size_games = GameMeans()
+        self.forced_draw = Histogram(64)
+        self.draw_chain = Histogram(32)
+        self.reshuffles = Histogram(64)
+        self.card_plays = {}    # card_id: count, at most one entry per card
+
+    def clear(self):
+        self.__init__(len(self.positions))
+
+    def turn(self, hand_size):
+        self.hand_size.add(hand_size)
+        self.hand_size_games.add(hand_size)
+
+    def playCard(self, card_id):
+        self.card_plays[card_id] = self.card_plays.get(card_id, 0) + 1
+
+    def forcedDraw(self, amount, card_amount):
+        # amount cards drawn for a chain of draw cards of card_amount cards each (only the same card answers one)
+        self.forced_draw.add(amount)
+        self.draw_chain.add(amount // card_amount)
+
+    def endGame(self, turns, finish_order, reshuffles):
+        self.games += 1
+        self.game_turns.add(turns)
+        self.reshuffles.add(reshuffles)
+        self.hand_size_games.endGame()
+
+        players = len(self.positions)
+        finished = [players] * players
+        for position, seat in enumerate(finish_order):
+            finished[seat] = position
+        for seat in range(players):
+            self.positions[seat][finished[seat]] += 1
+
+    def histograms(self):
+        return {'game_turns': self.game_turns, 'hand_size': self.hand_size, 'forced_draw': self.forced_draw,
+                'draw_chain': self.draw_chain, 'reshuffles': self.reshuffles}
+
+    def toDict(self):
+        state = {'games': self.games, 'positions': [list(seat) for seat in self.positions], 'card_plays': dict(self.card_plays)}
+        for name, histogram in self.histograms().items():
+            state[name] = histogram.toDict()
+        state['hand_size_games'] = self.hand_size_games.toDict()
+        return state
+
+    def merge(self, other):
+        # other is the toDict() of another run (a worker of the process pool)
+        self.games += other['games']
+        for seat, positions in enumerate(other['positions']):
+            for position, count in enumerate(positions):
+                self.positions[seat][position] += count
+        for card_id, count in other['card_plays'].items():
+            self.card_plays[card_id] = self.card_plays.get(card_id, 0) + count
+        for name, histogram in self.histograms().items():
+            histogram.merge(other[name])
+        self.hand_size_games.merge(other['hand_size_games'])
+
+    def summary(self):
+        summary = {'games': self.games, 'seats': {}}
+
+        players = len(self.positions)
+        for seat in range(players):
+            positions = self.positions[seat]
+            summary['seats'][seat] = {
+                'win_rate': positions[0] / self.games if self.games > 0 else 0.0,
+                'win_rate_interval': wilsonInterval(positions[0], self.games),
+                'positions': positions[:players],
+                'not_finished': positions[players],
+            }
+
+        for name, histogram in self.histograms().items():
+            summary[name] = histogram.summary()
+        # the turns of a game are correlated, the interval comes from the games
+        summary['hand_size']['mean_interval'] = self.hand_size_games.interval()
+
+        # share of the cards played, a play is a trial for every card_id
+        plays = sum(self.card_plays.values())
+        summary['card_plays'] = {card_id: {'count': count, 'share': count / plays if plays > 0 else 0.0,
+                                           'share_interval': wilsonInterval(count, plays)}
+                                 for card_id, count in sorted(self.card_plays.items())}
+        return summary
+
+    def report(self, file_name=None):
+        # Prints the summary, and writes it as json if file_name is given
+        summary = self.summary()
+
+        print("Statistics of", summary['games'], "games:")
+        for seat, seat_summary in summary['seats'].items():
+            low, high = seat_summary['win_rate_interval']
+            print("  seat %d  win rate %.4f [%.4f, %.4f]  positions %s  not finished %d"
+                  % (seat, seat_summary['win_rate'], low, high, seat_summary['positions'], seat_summary['not_finished']))
+
+        for name in self.histograms():
+            histogram = summary[name]
+            low, high = histogram['mean_interval']
+            print("  %-12s mean %9.3f [%9.3f, %9.3f]  std %8.3f  max %6d" % (name, histogram['mean'], low, high, histogram['std'], histogram['max']))
+
+        if file_name is not None:
+            with open(file_name, "w") as file:
+                json.dump(summary, file, indent=2)
+            print("Statistics saved to", file_name)
+
+
+run_stats = RunStatistics()
@@ -1,17 +1,14 @@
 import os
+import glob
+import hashlib
 import numpy as np
 import config
 import random
 from trueskill import Rating
 
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
+from instrumentation import INSTRUMENTATION, stats, clock
 
-#from uno import Card, Player, Table
-
-
-# Yes it's being defined twice :) I've never dealt with circular imports
+# Card, Player and Table live here, uno.py imports them from this module
 
 class Card:
     def __init__(self, color, type, action_type, value, draw_amount, changes_color, points, owner):
@@ -21,6 +18,7 @@ class Card:
         self.draw_amount = draw_amount  # 0 default
         self.value = value     # holds the card name
         self.card_id = int(str(color)+str(type)+str(action_type)+str(points)) # this number will be fed into the neural network
+        self.kind = cardKind(color, type, action_type, value, draw_amount) # index of the hand columns of the dataset
         self.used = 0
         self.changeColor = changes_color
         self.points = points
@@ -30,6 +28,9 @@ class Card:
     # Draw two, yellow = 411
     # Skip, green = 212
     # Wild card
+    #
+    # Card kinds are the card kinds of fast_engine.py: color * 13 + n for the colored cards (n = number, or
+    # 10 "Draw Two", 11 "Skip", 12 "Reverse"), 52 "Wild", 53 "Wild Draw Four"
 
     def __getstate__(self):
         # Return a dictionary of the card's attributes to be pickled
@@ -39,6 +40,98 @@ class Card:
         # Restore the card's attributes from the pickled state
         self.__dict__.update(state)    
 
+def cardKind(color, type, action_type, value, draw_amount):
+    if type == 2:
+        return WILD_DRAW_FOUR if draw_amount > 0 else WILD
+    if type == 1:
+        return (color - 1) * 13 + 10 + action_type
+    return (color - 1) * 13 + value
+
+NUMBER_OF_KINDS = 54
+WILD = 52
+WILD_DRAW_FOUR = 53
+
+class Hand(list):
+    # List of cards that keeps counts of what it holds, updated on every card added or removed,
+    # so the game logic can check, pick and score a hand without walking through it.
+    # Only append, extend, +=, insert, pop, remove and clear keep the counts right
+
+    def __init__(self, cards=()):
+        super().__init__()
+        self.points = 0
+        self.wilds = 0          # type 2 cards
+        self.colors = [0] * 6   # non wild cards by color
+        self.values = {}        # every card by value (card name)
+        self.pairs = {}         # non wild cards by (value, color)
+        self.extend(cards)
+
+    def updateCounts(self, card, amount):
+        self.points += card.points * amount
+        self.values[card.value] = self.values.get(card.value, 0) + amount
+
+        if card.type == 2:
+            self.wilds += amount
+        else:
+            self.colors[card.color] += amount
+            self.pairs[(card.value, card.color)] = self.pairs.get((card.value, card.color), 0) + amount
+
+    def append(self, card):
+        super().append(card)
+        self.updateCounts(card, 1)
+
+    def extend(self, cards):
+        for card in cards:
+            self.append(card)
+
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+
+    def insert(self, index, card):
+        super().insert(index, card)
+        self.updateCounts(card, 1)
+
+    def pop(self, index=-1):
+        card = super().pop(index)
+        self.updateCounts(card, -1)
+        return card
+
+    def remove(self, card):
+        super().remove(card)
+        self.updateCounts(card, -1)
+
+    def clear(self):
+        super().clear()
+        self.__init__()
+
+    def countValue(self, value):
+        return self.values.get(value, 0)
+
+    def countPlayable(self, top):
+        # cards that can be placed on top: wild cards, same value or same color
+        if top.type == 2:
+            # the only cards with the value of a wild card are wild cards
+            return self.wilds + self.colors[top.color]
+        return self.wilds + self.colors[top.color] + self.values.get(top.value, 0) - self.pairs.get((top.value, top.color), 0)
+
+    def state(self):
+        # cards and counts, for snapshotTable
+        return (tuple(self), self.points, self.wilds, tuple(self.colors), dict(self.values), dict(self.pairs))
+
+    @classmethod
+    def fromState(cls, state):
+        # a new hand with the cards and counts of state(), nothing is counted again
+        cards, points, wilds, colors, values, pairs = state
+        hand = cls.__new__(cls)
+        list.extend(hand, cards)
+        hand.points = points
+        hand.wilds = wilds
+        hand.colors = list(colors)
+        hand.values = dict(values)
+        hand.pairs = dict(pairs)
+        return hand
+
+
 class Player:
     def __init__(self, cards, id, AI_LEVEL):
         self.id = id
@@ -50,6 +143,7 @@ class Player:
         self.isCheater = 0      # cheater AI will be able to see everyone's hand
         self.AI_LEVEL = AI_LEVEL       # 0 = basic ;; 1 = tensorflow ;; 2 = debug (player)
         self.performance = 0
+        self.turns = 0          # turns played, skipped turns are not counted
         
 # This class named Table will contain the played cards and who played them    
 class Table:
@@ -64,6 +158,12 @@ class Table:
         self.turns_to_be_skipped = 0
         self.reverses = 0
         self.to_be_drawn = 0
+        self.next_seat = []         # seat ring, see resetSeats
+        self.previous_seat = []
+        self.finish_order = []      # ids of the winners of the game, in order
+        self.reshuffles = 0         # discard pile reshuffles of the game
+        self.turns = 0              # turns of the game, see uno.playTurn
+        self.stalled_turns = 0      # turns in a row nobody could play or draw
 
 
 
@@ -78,91 +178,345 @@ PLAYER_ID = config.PLAYER_ID
 # Rules
 ONLY_ONE_PLAYER_CAN_WIN = config.ONLY_ONE_PLAYER_CAN_WIN
 
-
-def logData(data, table_number):
-    
-    #print("Saving ... "+str(table_number))
-
-    df = pd.DataFrame(data)
-    schema = pa.schema([
-        ('game_turn', pa.int64()),
-        ('top_card_id', pa.int64()),
-        #('top_card_value', pa.string()),
-        ('player_id', pa.int64()),
-        ('top_card_color', pa.int64()),
-        ('top_card_type', pa.int64()),
-        ('top_card_draw_amount', pa.int64()),
-        ('top_card_points', pa.int64()),
-        ('drawn_cards', pa.int64()),
-        ('has_won', pa.int64()),
-        ('p_count', pa.int64()),
-        ('dir', pa.int64()),
-        ('card0', pa.int64()),
-        ('card1', pa.int64()),
-        ('card2', pa.int64()),
-        ('card3', pa.int64()),
-        ('card4', pa.int64()),
-        ('card5', pa.int64()),
-        ('card6', pa.int64()),
-        ('card7', pa.int64()),
-        ('card8', pa.int64()),
-        ('card9', pa.int64()),
-        ('card10', pa.int64()),
-        ('card11', pa.int64()),
-        ('card12', pa.int64()),
-        ('card13', pa.int64()),
-        ('card14', pa.int64()),
-        ('card15', pa.int64()),
-        ('card16', pa.int64()),
-        ('card17', pa.int64()),
-        ('card18', pa.int64()),
-        ('card19', pa.int64()),
-        ('card20', pa.int64()),
-        ('card21', pa.int64()),
-        ('card22', pa.int64()),
-        ('card23', pa.int64()),
-        ('card24', pa.int64()),
-        ('card25', pa.int64()),
-        ('card26', pa.int64()),
-        ('card27', pa.int64()),
-        ('card28', pa.int64()),
-        ('card29', pa.int64())
-        
-    ])
-    
-    table = pa.Table.from_pandas(df, schema=schema)
-
-    # Save the table as a Parquet file
-    pq.write_table(table, 'dataset/data'+str(table_number)+'.parquet')
-
-def get_game_data(game_data, table, turns, p_count, hand_data, draw_amount):
-
-    
-    game_data["game_turn"].append(turns)
-    game_data["top_card_id"].append(table.cards[len(table.cards) - 1].card_id)
-    #game_data["top_card_value"].append(str(table.cards[len(table.cards) - 1].value))
-    game_data["top_card_color"].append(table.cards[len(table.cards) - 1].color)
-    game_data["top_card_type"].append(table.cards[len(table.cards) - 1].type)
-    game_data["top_card_draw_amount"].append(table.cards[len(table.cards) - 1].draw_amount)
-    game_data["top_card_points"].append(table.cards[len(table.cards) - 1].points)
-    game_data["player_id"].append(table.turn)
-    game_data["drawn_cards"].append(draw_amount) 
-    game_data["has_won"].append(0) 
-    game_data["p_count"].append(p_count)
-    game_data["dir"].append(table.direction)
-
-    length = len(hand_data)
-
-    for x in range(30):
-        if x >= length:
-            game_data["card"+str(x)].append(0)
+# Logging
+ROWS_PER_ROW_GROUP = config.ROWS_PER_ROW_GROUP
+ROWS_PER_FILE = config.ROWS_PER_FILE
+DATASET_FORMAT = config.DATASET_FORMAT
+WRITER_QUEUE_SIZE = config.WRITER_QUEUE_SIZE
+
+# Columns of the dataset and their types, game_id tells the games apart inside a file
+# top_card_id is dictionary encoded (int8 indices into CARD_IDS)
+# player_id is the player that placed the top card, -1 on the first turn of a game (the card came from the deck)
+# hand0 .. hand53 are the cards of the hand of the player, counted by card kind (see Card), hands of any size fit
+DATASET_TYPES = [
+    ('game_id', 'int64'),
+    ('game_turn', 'uint32'),
+    ('top_card_id', 'uint16'),
+    #('top_card_value', ...),
+    ('player_id', 'int8'),
+    ('top_card_color', 'uint8'),
+    ('top_card_type', 'uint8'),
+    ('top_card_draw_amount', 'uint8'),
+    ('top_card_points', 'uint8'),
+    ('drawn_cards', 'uint16'),
+    ('has_won', 'bool'),
+    ('p_count', 'uint8'),
+    ('dir', 'bool')] + [('hand'+str(kind), 'uint8') for kind in range(NUMBER_OF_KINDS)]
+
+DATASET_COLUMNS = [name for name, _ in DATASET_TYPES]
+
+# every card_id of a deck, sorted
+CARD_IDS = np.array(sorted(set(
+    [int(str(color)+'00'+str(value)) for color in range(1, 5) for value in range(10)] +
+    [int(str(color)+'1'+str(action_type)+'20') for color in range(1, 5) for action_type in range(3)] +
+    [52050])), dtype=np.uint16)
+
+def datasetSchema():
+    # pyarrow is only imported when something is logged
+    import pyarrow as pa
+
+    fields = []
+    for name, dtype in DATASET_TYPES:
+        if name == 'top_card_id':
+            fields.append((name, pa.dictionary(pa.int8(), pa.uint16())))
         else:
-            game_data["card"+str(x)].append(hand_data[x].card_id)
+            fields.append((name, pa.from_numpy_dtype(np.dtype(dtype))))
+    return pa.schema(fields)
+
+# game_turn ... dir, the columns of a turn before the hand
+TURN_LOG_COLUMNS = DATASET_COLUMNS.index('hand0') - 1
+HAS_WON_COLUMN = DATASET_COLUMNS.index('has_won') - 1
+PLAYER_ID_COLUMN = DATASET_COLUMNS.index('player_id') - 1
+TOP_CARD_ID_COLUMN = DATASET_COLUMNS.index('top_card_id') - 1
+
+class TurnLog:
+    # Turn log of a game, one int32 array per column of the dataset (without game_id and the hand),
+    # the hands are the card kinds of every turn one after the other
+    # The arrays are allocated once, doubled when full and reused by every game of the run
+    def __init__(self, capacity=256):
+        self.data = np.zeros((TURN_LOG_COLUMNS, capacity), dtype=np.int32)
+        self.hands = bytearray()
+        self.hand_sizes = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.size = 0
+        self.hands.clear()
+        self.hand_sizes.clear()
+
+    def addRow(self, values, kinds):
+        # values: game_turn, top_card_id, player_id, top_card_color, top_card_type, top_card_draw_amount,
+        # top_card_points, drawn_cards, has_won, p_count, dir
+        # kinds: the card kinds of the hand (bytes)
+        if self.size == self.data.shape[1]:
+            data = np.zeros((TURN_LOG_COLUMNS, self.size * 2), dtype=np.int32)
+            data[:, :self.size] = self.data
+            self.data = data
+
+        self.data[:, self.size] = values
+        self.hands += kinds
+        self.hand_sizes.append(len(kinds))
+        self.size += 1
+
+    def markWinner(self, player_id):
+        # every row of the winner gets has_won = 1
+        rows = self.data[:, :self.size]
+        rows[HAS_WON_COLUMN, rows[PLAYER_ID_COLUMN] == player_id] = 1
+
+    def handCounts(self):
+        # (NUMBER_OF_KINDS, rows) cards of every kind in the hand of every turn
+        rows = np.repeat(np.arange(self.size), self.hand_sizes)
+        kinds = np.frombuffer(bytes(self.hands), dtype=np.uint8)
+        counts = np.bincount(kinds.astype(np.intp) * self.size + rows, minlength=NUMBER_OF_KINDS * self.size)
+        return counts.reshape(NUMBER_OF_KINDS, self.size).astype(np.uint8)
+
+    def columns(self, game_id):
+        # copy of the rows of the game, one numpy array per column of the dataset with the dtype of DATASET_TYPES
+        # (top_card_id holds the card ids, datasetBatch encodes them)
+        rows = self.data[:, :self.size]
+        columns = [np.full(self.size, game_id, dtype=np.int64)]
+        columns.extend(rows[column].astype(dtype) for column, (_, dtype) in enumerate(DATASET_TYPES[1:TURN_LOG_COLUMNS + 1]))
+        columns.extend(self.handCounts())
+        return columns
+
+def datasetBatch(columns, schema):
+    # numpy columns of TurnLog.columns (or several games of them concatenated) to a pyarrow RecordBatch
+    import pyarrow as pa
+
+    arrays = []
+    for index, column in enumerate(columns):
+        if index == TOP_CARD_ID_COLUMN + 1:
+            indices = np.searchsorted(CARD_IDS, column).astype(np.int8)
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(CARD_IDS)))
+        else:
+            arrays.append(pa.array(column))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+class DatasetWriter:
+    # Keeps a dataset file open for the whole run
+    # Games are buffered as numpy columns and written as one row group once ROWS_PER_ROW_GROUP turns are buffered,
+    # a row group always ends with a complete game
+    # file_format 'parquet' (compressed) or 'arrow': uncompressed Arrow IPC files that can be memory-mapped,
+    # each one with an index of its games (data.index.npy: game_id, first row, rows), see mapped_dataset.py
+    # With first_part (runs with checkpoints, see checkpoint.py) the files are always numbered and a checkpoint
+    # closes the current file, the parts from first_part on are left over from an interrupted run and are removed
+    def __init__(self, shard=None, rows_per_row_group=ROWS_PER_ROW_GROUP, rows_per_file=ROWS_PER_FILE, directory='dataset', first_part=None, file_format=DATASET_FORMAT):
+        self.schema = datasetSchema()
+
+        self.shard = shard
+        self.rows_per_row_group = rows_per_row_group
+        self.rows_per_file = rows_per_file # 0 = a single file
+        self.directory = directory
+        self.file_format = file_format
+        self.index = []     # (game_id, first row, rows) of every game of the current file
+
+        self.games = []     # TurnLog.columns of the buffered games
+        self.buffered_rows = 0
+
+        self.writer = None
+        self.file_rows = 0
+        self.part = first_part or 0
+        self.numbered = rows_per_file > 0 or first_part is not None
+        self.files = []
+
+        if first_part is not None:
+            removeParts(self.directory, self.prefix(), first_part)
+
+    def prefix(self):
+        # every worker of the process pool writes its own files
+        if self.shard is not None:
+            return 'data' + str(self.shard)
+        return 'data'
+
+    def fileName(self):
+        name = self.prefix()
+        if self.numbered:
+            name += '_'+str(self.part)
+        return os.path.join(self.directory, name+'.'+self.file_format)
+
+    def write(self, game_log, game_id):
+        if len(game_log) == 0:
+            return
+        self.add(game_log.columns(game_id), game_id)
+
+    def add(self, columns, game_id):
+        # columns: TurnLog.columns of a game
+        rows = len(columns[0])
+        self.index.append((game_id, self.file_rows + self.buffered_rows, rows))
+        self.games.append(columns)
+        self.buffered_rows += rows
+
+        if self.buffered_rows >= self.rows_per_row_group:
+            self.flush()
+
+    def flush(self):
+        if self.buffered_rows == 0:
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.files.append(self.fileName())
+            if self.file_format == 'arrow':
+                self.writer = pa.ipc.new_file(self.files[-1], self.schema)
+            else:
+                self.writer = pq.ParquetWriter(self.files[-1], self.schema)
+
+        # one array per column for the whole row group
+        columns = [np.concatenate([game[index] for game in self.games]) for index in range(len(DATASET_COLUMNS))]
+        batch = datasetBatch(columns, self.schema)
+        if self.file_format == 'arrow':
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch.num_rows)
+        self.file_rows += batch.num_rows
+
+        self.games = []
+        self.buffered_rows = 0
+
+        # rolling files, the next row group goes into a new file
+        if self.rows_per_file > 0 and self.file_rows >= self.rows_per_file:
+            self.closeFile()
+            self.part += 1
+
+    def closeFile(self):
+        # the file is not valid until its footer is written here
+        self.writer.close()
+        self.writer = None
+
+        if self.file_format == 'arrow':
+            np.save(indexFileName(self.files[-1]), np.array(self.index, dtype=np.int64).reshape(-1, 3))
+        self.index = []
+        self.file_rows = 0
+
+    def close(self):
+        # writes what is left in the buffer
+        self.flush()
+        if self.writer is not None:
+            self.closeFile()
+
+    def checkpoint(self):
+        # Writes every buffered game and closes the file, returns the part of the next file
+        self.flush()
+        if self.writer is not None:
+            self.closeFile()
+            self.part += 1
+        return self.part
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class BackgroundWriter:
+    # A DatasetWriter on its own thread, the simulation never waits for the parquet / arrow I/O
+    # write() copies the rows of the game (TurnLog.columns) into a queue of at most queue_size games and returns,
+    # the thread buffers them and writes the row groups (pyarrow releases the GIL while it compresses and writes)
+    # A full queue blocks write() until the thread catches up: a slow disk slows the run down instead of filling
+    # the memory. checkpoint() and close() wait until every queued game is written, close() runs in the finally
+    # of the engines so the queued games are written on Ctrl-C too.
+    # An error of the thread (full disk, ...) is raised by the next write, checkpoint or close.
+    def __init__(self, writer, queue_size=WRITER_QUEUE_SIZE):
+        import queue
+        import threading
+
+        self.writer = writer
+        self.queue = queue.Queue(queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='dataset writer', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                # after an error the queue is only emptied, nobody waits forever on a full queue
+                if job is not None and self.error is None:
+                    if INSTRUMENTATION:
+                        phase_start = clock()
+
+                    self.writer.add(*job)
+
+                    if INSTRUMENTATION:
+                        stats.time("writer thread", phase_start)
+            except BaseException as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+            if job is None:
+                return
+
+    def depth(self):
+        # games waiting in the queue
+        return self.queue.qsize()
+
+    def raiseError(self):
+        if self.error is not None:
+            raise RuntimeError("The dataset writer thread failed") from self.error
+
+    def write(self, game_log, game_id):
+        if len(game_log) == 0:
+            return
+        self.raiseError()
+
+        if INSTRUMENTATION:
+            depth = self.queue.qsize()
+            stats.maximum("writer queue depth", depth)
+            if depth >= self.queue.maxsize:
+                stats.count("writer queue full")
+
+        self.queue.put((game_log.columns(game_id), game_id))
+
+    def checkpoint(self):
+        # the thread waits for the next game while the checkpoint closes the file
+        self.queue.join()
+        self.raiseError()
+        return self.writer.checkpoint()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.raiseError()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def newDatasetWriter(shard=None, first_part=None):
+    # The dataset writer of the engines, on a thread unless WRITER_QUEUE_SIZE is 0
+    writer = DatasetWriter(shard, first_part=first_part)
+    if WRITER_QUEUE_SIZE > 0:
+        return BackgroundWriter(writer)
+    return writer
+
+def indexFileName(file_name):
+    # data_0.arrow -> data_0.index.npy
+    return os.path.splitext(file_name)[0] + '.index.npy'
+
+def removeParts(directory, prefix, first_part):
+    # Removes the numbered files prefix_N.* (data, index) with N >= first_part
+    for file_name in glob.glob(os.path.join(directory, prefix + '_*.*')):
+        part = os.path.basename(file_name)[len(prefix) + 1:].split('.')[0]
+        if part.isdigit() and int(part) >= first_part:
+            os.remove(file_name)
 
-        
-        
+def get_game_data(game_data, table, turns, p_count, hand_data, draw_amount):
+    top = table.cards[-1]
 
-    
+    game_data.addRow((turns, top.card_id, table.turn, top.color, top.type, top.draw_amount, top.points,
+                      draw_amount, 0, p_count, table.direction),
+                     bytes([card.kind for card in hand_data]))
 
     return game_data
 
@@ -213,41 +567,195 @@ def generateDeck():
 
 
 
+class DeckShuffler:
+    # Fisher-Yates shuffles from a seedable NumPy generator
+    # Every game reseeds it (see seedGame), so the orders are generated one at a time
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def newOrder(self, size):
+        return self.rng.permutation(size)
+
+    def shuffle(self, deck):
+        # in place, nothing is copied, works with lists of cards and bytearrays of card kinds
+        # (the same swaps for both, the object and fast engines shuffle their discard piles the same way)
+        self.rng.shuffle(deck)
+        return deck
+
+
+shuffler = DeckShuffler()
+
+def seedShuffler(seed):
+    global shuffler
+    shuffler = DeckShuffler(seed)
+
+
 def shuffleDeck(deck):
-    for i in range(len(deck)):
-        rand = random.randint(0, len(deck)-1)
-        deck[i], deck[rand] = deck[rand], deck[i]
-    return deck
+    return shuffler.shuffle(deck)
 
-def drawCards(deck, amount, owner):
-    cardsDrawn = []
-    # deck has no cards, should never get executed
-    if len(deck) < 1:
-        print("ERROR: no more available cards in deck")
-        return cardsDrawn
-    
-    # requested too many cards
-    if amount > len(deck):
-        for _ in range(len(deck)-1):
-            deck[0].owner = owner
-            deck[0].used = 0
-            cardsDrawn.append(deck.pop(0))
-    else:
-        for _ in range(amount):
-            deck[0].owner = owner
-            deck[0].used = 0
-            cardsDrawn.append(deck.pop(0))
+
+def newRunSeed():
+    return random.SystemRandom().randrange(2**32)
+
+def gameSeed(run_seed, game_id):
+    # 64 bit seed of a game, every game of a run can be played again on its own (see replay.py)
+    digest = hashlib.blake2b(str(run_seed).encode() + b':' + str(game_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def seedGame(run_seed, game_id):
+    # Seeds random and the deck shuffler for one game, returns the seed of the game
+    seed = gameSeed(run_seed, game_id)
+    random.seed(seed)
+    seedShuffler(seed)
+    return seed
+
+
+deck_template = None
+special_cards = ()  # cards of deck_template whose attributes change during a game, see snapshotTable
+
+def newDeck():
+    # The deck is generated once, every game gets the same cards in a new order
+    global deck_template, special_cards
+    if deck_template is None:
+        deck_template = tuple(generateDeck())
+        special_cards = tuple(card for card in deck_template if card.type == 2 or card.value == "Reverse")
+
+    # cards are reused by every game, put back what the last game changed
+    # (used and owner are set when a card is drawn)
+    for card in deck_template:
+        if card.type == 2:
+            card.color = 5
+
+    return [deck_template[i] for i in shuffler.newOrder(len(deck_template)).tolist()]
+
+def recycleDiscardPile(table):
+    # Shuffle the discard pile under the cards left in the draw pile, the top card stays on the table
+    # The discard pile list becomes the draw pile, nothing is copied
+    if INSTRUMENTATION:
+        stats.count("reshuffles")
+
+    table.reshuffles += 1
+    top = table.cards.pop()
+
+    # played wild cards go back to the deck without the chosen color
+    for card in table.cards:
+        if card.type == 2:
+            card.color = 5
+
+    pile = shuffleDeck(table.cards)
+    pile.extend(table.deck)
+
+    table.cards = table.deck
+    table.cards.clear()
+    table.cards.append(top)
+    table.deck = pile
+
+def drawCards(table, amount, owner):
+    # The top of the draw pile is the end of table.deck, all the cards are taken with one slice
+    deck = table.deck
+
+    # not enough cards, the discard pile goes under the draw pile first
+    if amount > len(deck) and len(table.cards) > 1:
+        recycleDiscardPile(table)
+        deck = table.deck
+
+    # every card is in the players' hands, take what is left
+    amount = min(amount, len(deck))
+    if amount == 0:
+        return []
+
+    cardsDrawn = deck[-amount:]
+    del deck[-amount:]
+
+    for card in cardsDrawn:
+        card.owner = owner
+        card.used = 0
     return cardsDrawn
 
+def snapshotTable(table):
+    # State of a game in progress, without copying Player or Card objects: draw pile, discard pile, hands (with
+    # their counts), seats, direction, cards to be drawn, turns to be skipped, who placed the top card, turns of
+    # the game, ... the counters of the players (wins, score, performance, turns), and the attributes the game
+    # changes on the cards (color of the wild cards, used of the reverse cards).
+    # A snapshot never changes and can be restored any number of times (rollouts of a lookahead player), the
+    # random streams are not part of it. fast_engine.snapshotTable is the same for the fast engine.
+    players = dict(table.alive)
+    players.update(table.dead)
+
+    # the cards of newDeck are known, the cards of another deck are looked up
+    cards = special_cards
+    if len(table.cards) == 0 or deck_template is None or table.cards[-1] not in deck_template:
+        cards = [card for card in table.deck + table.cards if card.type == 2 or card.value == "Reverse"]
+        for player in players.values():
+            cards += [card for card in player.cards if card.type == 2 or card.value == "Reverse"]
+
+    return (
+        tuple(table.deck), tuple(table.cards),
+        tuple((player_id, player.cards.state(), player.wins, player.score, player.performance, player.turns) for player_id, player in players.items()),
+        tuple((card, card.color, card.used) for card in cards),
+        tuple(table.alive), tuple(table.dead), tuple(table.next_seat), tuple(table.previous_seat), tuple(table.finish_order),
+        table.turn, table.direction, table.lastPlacementBy, table.turns_to_be_skipped, table.reverses, table.to_be_drawn, table.reshuffles,
+        table.turns, table.stalled_turns,
+    )
+
+def restoreTable(table, snapshot):
+    # Puts a table back in the state of the snapshot, the table can be another one with the same players
+    (deck, cards, player_states, card_states, alive, dead, next_seat, previous_seat, finish_order,
+     table.turn, table.direction, table.lastPlacementBy, table.turns_to_be_skipped, table.reverses, table.to_be_drawn, table.reshuffles,
+     table.turns, table.stalled_turns) = snapshot
+
+    players = table.alive
+    players.update(table.dead)
+    for player_id, hand, wins, score, performance, turns in player_states:
+        player = players[player_id]
+        player.cards = Hand.fromState(hand)
+        player.wins = wins
+        player.score = score
+        player.performance = performance
+        player.turns = turns
+
+    for card, color, used in card_states:
+        card.color = color
+        card.used = used
+
+    table.alive = {player_id: players[player_id] for player_id in alive}
+    table.dead = {player_id: players[player_id] for player_id in dead}
+    table.deck = list(deck)
+    table.cards = list(cards)
+    table.next_seat = list(next_seat)
+    table.previous_seat = list(previous_seat)
+    table.finish_order = list(finish_order)
+    return table
+
 def spawnPlayers(table):
     for i in range(NUMBER_OF_PLAYERS):
         table.alive[i] = Player([], i, 1)
-    
+
+    resetSeats(table)
     return table
 
+def resetSeats(table):
+    # Circular doubly linked list of the alive players in id order, indexed by player id
+    # next_seat is the next player clockwise, previous_seat counter clockwise
+    seats = sorted(table.alive)
+    table.next_seat = [0] * (seats[-1] + 1)
+    table.previous_seat = [0] * (seats[-1] + 1)
+
+    for i, seat in enumerate(seats):
+        table.next_seat[seat] = seats[(i + 1) % len(seats)]
+        table.previous_seat[seat] = seats[i - 1]
+
+def removeSeat(table, seat):
+    # The player left the game, its neighbours now point to each other
+    previous_seat = table.previous_seat[seat]
+    next_seat = table.next_seat[seat]
+    table.next_seat[previous_seat] = next_seat
+    table.previous_seat[next_seat] = previous_seat
+
 def dealCards(table):
     for i in range(NUMBER_OF_PLAYERS):
-        table.alive[i].cards = drawCards(table.deck, NUMBER_OF_INITIAL_CARDS + 1, i)
+        table.alive[i].cards = Hand(drawCards(table, NUMBER_OF_INITIAL_CARDS + 1, i))
     
     #table.alive = sorted(table.alive)
     return table
\ No newline at end of file
@@ -0,0 +1,102 @@
+# Timers and counters of a simulation run
+# The engines only touch them behind "if INSTRUMENTATION:", a disabled run pays one global lookup per check
+#
+# Phases are named like paths, a phase includes the time of the phases below it:
+#   setup                        new deck, deal, first log row
+#   turn loop                    every turn of the game
+#   turn loop/logic              playing a card
+#   turn loop/logic/logging      get_game_data
+#   ratings                      TrueSkill (RatingLog.update), inside the turn loop when RATING_BATCH wins are reached
+#   dataset                      DatasetWriter.write and close (parquet I/O), with the writer thread
+#                                (WRITER_QUEUE_SIZE) only the waits for a full queue and the last games at close
+#   writer thread                the I/O of the writer thread, it overlaps the other phases
+#   checkpoint                   checkpoint.checkpointRun, ratings and closing the files included
+#   policy                       decide calls of the policy engine, it has no turn loop time (its games are
+#                                played side by side)
+
+import json
+import time
+
+import config
+
+
+INSTRUMENTATION = config.ENABLE_INSTRUMENTATION
+
+clock = time.perf_counter
+
+
+class Instrumentation:
+    def __init__(self):
+        self.timers = {}    # phase: seconds
+        self.counters = {}  # name: amount
+        self.maximums = {}  # name: largest value seen
+
+    def time(self, phase, start):
+        # Adds the time since start to the phase, returns the current time so the next phase can start from it
+        now = clock()
+        self.timers[phase] = self.timers.get(phase, 0.0) + now - start
+        return now
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def maximum(self, name, value):
+        if value > self.maximums.get(name, 0):
+            self.maximums[name] = value
+
+    def clear(self):
+        self.timers.clear()
+        self.counters.clear()
+        self.maximums.clear()
+
+    def toDict(self):
+        return {'timers': dict(self.timers), 'counters': dict(self.counters), 'maximums': dict(self.maximums)}
+
+    def merge(self, other):
+        # other is the toDict() of another run (a worker of the process pool)
+        for phase, seconds in other['timers'].items():
+            self.timers[phase] = self.timers.get(phase, 0.0) + seconds
+        for name, amount in other['counters'].items():
+            self.count(name, amount)
+        for name, value in other['maximums'].items():
+            self.maximum(name, value)
+
+    def report(self, file_name=None):
+        # Prints the summary, and writes it as json if file_name is given
+        print("Phases:")
+        total = self.timers.get('run', 0.0)
+        for phase in sorted(self.timers):
+            seconds = self.timers[phase]
+            share = " (%5.1f%%)" % (100 * seconds / total) if total > 0 else ""
+            print("  %-28s %10.3f s%s" % (phase, seconds, share))
+
+        print("Counters:")
+        for name in sorted(self.counters):
+            print("  %-28s %10d" % (name, self.counters[name]))
+        for name in sorted(self.maximums):
+            print("  %-28s %10d" % (name, self.maximums[name]))
+
+        turns = self.counters.get('turns', 0)
+        if total > 0 and turns > 0:
+            print("  %-28s %10.0f" % ("turns/s", turns / total))
+
+        if file_name is not None:
+            with open(file_name, "w") as file:
+                json.dump(self.toDict(), file, indent=2)
+
+
+stats = Instrumentation()
+
+
+def profileRun(function, file_name):
+    # Runs function under cProfile, dumps the stats to file_name (python -m pstats file_name) and prints the top 25
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function)
+    finally:
+        profiler.dump_stats(file_name)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+        print("Profile saved to", file_name)
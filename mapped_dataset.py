@@ -0,0 +1,139 @@
+# Zero-copy reader of the Arrow dataset files (DATASET_FORMAT = "arrow", cli.py --format arrow)
+# The files are memory-mapped: opening a dataset only reads the file footers and the small game indexes,
+# the rows stay in the page cache and are read when they are used, nothing is copied into the process.
+#
+#   from mapped_dataset import MappedDataset, toNumpy
+#   dataset = MappedDataset('dataset')
+#   rows = dataset.rows(0, 4096)            # pyarrow Table with the columns of game_utility.DATASET_COLUMNS
+#   rows = dataset.games(100, 200)          # every turn of the games 100 .. 199
+#   columns = toNumpy(rows)                 # {name: numpy array}
+#   for rows in dataset.batches(4096):
+#       ...
+#
+# Slices of a file are views of the mapped file. toNumpy gives views too for the integer columns of a range
+# inside one record batch (ROWS_PER_ROW_GROUP rows). A range across two batches or files is concatenated.
+# The bool columns (has_won, dir) and top_card_id (dictionary) are always decoded into new arrays.
+
+import os
+import glob
+
+import numpy as np
+
+from game_utility import indexFileName
+
+
+class MappedDataset:
+    def __init__(self, directory='dataset', pattern='data*.arrow'):
+        import pyarrow as pa
+
+        self.files = sorted(glob.glob(os.path.join(directory, pattern)))
+        if len(self.files) == 0:
+            raise FileNotFoundError("No arrow dataset in " + directory + ", run with DATASET_FORMAT = \"arrow\" (cli.py --format arrow)")
+
+        self.tables = []
+        self.offsets = [0]  # first row of every file, then the amount of rows
+        indexes = []
+
+        for file_name in self.files:
+            table = pa.ipc.open_file(pa.memory_map(file_name, 'r')).read_all()
+
+            # game_id, first row, rows, first row counted from the start of the dataset
+            index = np.load(indexFileName(file_name))
+            index[:, 1] += self.offsets[-1]
+
+            self.tables.append(table)
+            indexes.append(index)
+            self.offsets.append(self.offsets[-1] + table.num_rows)
+
+        self.offsets = np.array(self.offsets, dtype=np.int64)
+
+        # games sorted by id
+        index = np.concatenate(indexes)
+        order = np.argsort(index[:, 0], kind='stable')
+        self.game_ids = index[order, 0]
+        self.game_starts = index[order, 1]
+        self.game_sizes = index[order, 2]
+
+        self.schema = self.tables[0].schema
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def numberOfGames(self):
+        return len(self.game_ids)
+
+    def slices(self, start, stop):
+        # the pieces of the files holding rows start .. stop - 1
+        pieces = []
+        file = int(np.searchsorted(self.offsets, start, side='right')) - 1
+
+        while start < stop and file < len(self.tables):
+            end = min(stop, int(self.offsets[file + 1]))
+            pieces.append(self.tables[file].slice(start - int(self.offsets[file]), end - start))
+            start = end
+            file += 1
+        return pieces
+
+    def rows(self, start, stop):
+        # rows start .. stop - 1 of the whole dataset (every file one after the other)
+        import pyarrow as pa
+
+        start = max(0, start)
+        stop = min(len(self), stop)
+        pieces = self.slices(start, stop) if start < stop else []
+        if len(pieces) == 0:
+            return self.schema.empty_table()
+        return pa.concat_tables(pieces)
+
+    def games(self, first_game_id, last_game_id):
+        # every row of the games first_game_id .. last_game_id - 1 that are in the dataset, by game id
+        import pyarrow as pa
+
+        first = int(np.searchsorted(self.game_ids, first_game_id, side='left'))
+        last = int(np.searchsorted(self.game_ids, last_game_id, side='left'))
+
+        # games that follow each other in the files are read as one range
+        pieces = []
+        range_start = range_stop = -1
+        for start, size in zip(self.game_starts[first:last].tolist(), self.game_sizes[first:last].tolist()):
+            if start != range_stop:
+                if range_stop > range_start:
+                    pieces.extend(self.slices(range_start, range_stop))
+                range_start = start
+            range_stop = start + size
+        if range_stop > range_start:
+            pieces.extend(self.slices(range_start, range_stop))
+
+        if len(pieces) == 0:
+            return self.schema.empty_table()
+        return pa.concat_tables(pieces)
+
+    def game(self, game_id):
+        return self.games(game_id, game_id + 1)
+
+    def batches(self, batch_size, start=0, stop=None):
+        # rows start .. stop - 1 in tables of batch_size rows (the last one can be smaller)
+        if stop is None:
+            stop = len(self)
+        for batch_start in range(start, stop, batch_size):
+            yield self.rows(batch_start, min(batch_start + batch_size, stop))
+
+
+def toNumpy(table, columns=None):
+    # {name: numpy array} of the columns of a table of MappedDataset
+    import pyarrow as pa
+
+    arrays = {}
+    for name in columns or table.column_names:
+        column = table.column(name)
+        if column.num_chunks == 1:
+            column = column.chunk(0)
+        else:
+            column = pa.concat_arrays(column.chunks)
+
+        if pa.types.is_dictionary(column.type):
+            column = column.dictionary_decode()
+
+        # integer columns without nulls are views of the mapped file
+        arrays[name] = column.to_numpy(zero_copy_only=False)
+    return arrays
@@ -0,0 +1,271 @@
+# Determinized Monte Carlo tree search player (the "mcts" policy of policies.py)
+# Information set MCTS at the root: the player knows its hand, the discard pile and how many cards every
+# opponent holds, but not which ones. Every iteration
+#   1. samples a determinization: the unseen cards (draw pile and the opponents' hands) are shuffled and dealt
+#      again, every opponent keeps its amount of cards
+#   2. picks a move with UCB1 (a card kind of the hand, or a color after a wild card)
+#   3. plays the move and the rest of the game with random moves (fast_engine.turnSteps) until someone finishes
+#   4. counts a win when the player finishes first
+# The most visited move is played.
+#
+# The statistics of a position are kept in a transposition cache keyed on the public state that decides the move
+# (playable moves, top card, color, cards to be drawn, direction, amount of cards of the player and of the next
+# seat up to MCTS_KEY_HAND_SIZE), a position seen again starts with the rollouts of the previous searches.
+# The discard pile, the size of the draw pile and the rest of the hands are left out, they change every turn
+# and no position would ever be seen again. Positions that share a key are not the same position: a search
+# inherits at most MCTS_CACHE_VISITS visits (the statistics are scaled down), older rollouts fade out instead
+# of outweighing the rollouts of the search.
+# Budget: MCTS_ROLLOUTS rollouts per move, or MCTS_MILLISECONDS per move. With MCTS_WORKERS the moves of the
+# games waiting in the policy engine are searched on a process pool (mcts_pool.py).
+# The cache is kept by the policy, not by the searches: every search of a batch starts from the cache as it was
+# before the batch, the results are stored in the order of the games. A search only depends on its position,
+# its seed and the cache, the games are the same with or without workers (not with MCTS_MILLISECONDS, the
+# amount of rollouts then depends on the speed of the machine).
+#   python cli.py -n 1000 --policy 0=mcts --mcts-rollouts 100 --mcts-workers 4
+#   python tournament.py mcts random --max-games 20000
+
+import math
+import time
+import random
+from collections import OrderedDict
+
+import config
+
+import game_utility
+from instrumentation import INSTRUMENTATION, stats
+from fast_engine import newFastTable, snapshotTable, restoreTable, turnSteps, logic, skipTurn, playCard, changeColor
+
+
+MCTS_ROLLOUTS = config.MCTS_ROLLOUTS
+MCTS_MILLISECONDS = config.MCTS_MILLISECONDS
+MCTS_EXPLORATION = config.MCTS_EXPLORATION
+MCTS_ROLLOUT_TURNS = config.MCTS_ROLLOUT_TURNS
+MCTS_CACHE_SIZE = config.MCTS_CACHE_SIZE
+MCTS_CACHE_VISITS = config.MCTS_CACHE_VISITS
+MCTS_KEY_HAND_SIZE = config.MCTS_KEY_HAND_SIZE
+MCTS_WORKERS = config.MCTS_WORKERS
+
+
+class Searcher:
+    # Searches moves on a scratch table
+    def __init__(self, rollouts=MCTS_ROLLOUTS, milliseconds=MCTS_MILLISECONDS, exploration=MCTS_EXPLORATION):
+        self.rollouts = rollouts
+        self.milliseconds = milliseconds
+        self.exploration = exploration
+        self.table = newFastTable()
+        self.table.counted = False
+
+    def determinize(self, snapshot, rng):
+        # the table of the snapshot, with the unseen cards dealt again
+        table = restoreTable(self.table, snapshot)
+        seat = table.turn
+
+        unseen = bytearray(table.deck)
+        for player_id, player in table.alive.items():
+            if player_id != seat:
+                unseen += player.cards
+        rng.shuffle(unseen)
+
+        start = 0
+        for player_id, player in table.alive.items():
+            if player_id != seat:
+                size = len(player.cards)
+                player.cards = unseen[start:start + size]
+                start += size
+        table.deck = unseen[start:]
+        return table
+
+    def rollout(self, table, move, color_request, rng):
+        # Plays the move and the rest of the game with random moves, 1 when the player finishes first
+        seat = table.turn
+        finished = len(table.finish_order)
+        hand = table.alive[seat].cards
+
+        if color_request:
+            table.top_color = move
+        else:
+            index = hand.index(move)
+            logic(table, hand, index, None, table.turns, len(table.alive), 0)
+            if table.top_color == 5:
+                table.top_color = changeColor(hand, rng)
+
+        if len(hand) == 0:
+            return 1
+        table.stalled_turns = 0
+        skipTurn(table)
+
+        steps = turnSteps(table, None, True)
+        try:
+            request = next(steps)
+            for _ in range(MCTS_ROLLOUT_TURNS):
+                if len(table.finish_order) > finished:
+                    break
+                if request is None:
+                    answer = changeColor(table.alive[table.turn].cards, rng)
+                else:
+                    answer = playCard(request, rng)
+                request = steps.send(answer)
+        except StopIteration:
+            pass
+        finally:
+            steps.close()
+
+        return 1 if len(table.finish_order) > finished and table.finish_order[finished] == seat else 0
+
+    def search(self, snapshot, mask, seed, statistics):
+        # The answer of the player of the snapshot to the request mask (see policies.py)
+        # statistics {move: [visits, wins]} of the moves, with the visits inherited from the cache,
+        # returned with the rollouts of the search
+        rng = random.Random(seed)
+        self.table.shuffler = game_utility.DeckShuffler(seed)
+
+        restoreTable(self.table, snapshot)
+        hand = self.table.alive[self.table.turn].cards
+        moves = sorted(statistics)
+
+        deadline = time.perf_counter() + self.milliseconds / 1000 if self.milliseconds > 0 else None
+        iteration = 0
+        while True:
+            if deadline is None:
+                if iteration >= self.rollouts:
+                    break
+            elif iteration >= len(moves) and time.perf_counter() > deadline:
+                break
+            iteration += 1
+
+            move = self.select(statistics, moves)
+            table = self.determinize(snapshot, rng)
+            result = statistics[move]
+            result[0] += 1
+            result[1] += self.rollout(table, move, mask is None, rng)
+
+        best = max(moves, key=lambda move: statistics[move][0])
+        return answerMove(best, hand, mask), statistics
+
+    def select(self, statistics, moves):
+        # UCB1, every move is tried once first
+        total = 0
+        for move in moves:
+            visits = statistics[move][0]
+            if visits == 0:
+                return move
+            total += visits
+
+        log_total = math.log(total)
+        best = None
+        best_score = -1.0
+        for move in moves:
+            visits, wins = statistics[move]
+            score = wins / visits + self.exploration * math.sqrt(log_total / visits)
+            if score > best_score:
+                best = move
+                best_score = score
+        return best
+
+
+def playableMoves(table, mask):
+    # the moves of the player of the table: the kinds of its playable cards, or the colors
+    if mask is None:
+        return [1, 2, 3, 4]
+    hand = table.alive[table.turn].cards
+    return sorted(set(hand[index] for index in range(len(mask)) if mask[index]))
+
+
+def positionKey(table, mask, moves):
+    seat = table.turn
+
+    # amount of cards of the next seat, a seat close to finishing is all that changes the move
+    following = table.next_seat[seat] if table.direction else table.previous_seat[seat]
+    following_size = min(len(table.alive[following].cards), MCTS_KEY_HAND_SIZE)
+
+    return (bytes(moves), mask is None, table.cards[-1], table.top_color, table.to_be_drawn, table.direction,
+            len(table.alive[seat].cards), following_size)
+
+
+def answerMove(move, hand, mask):
+    if mask is None:
+        return move
+    # the first playable card of the kind
+    index = hand.find(move)
+    while not mask[index]:
+        index = hand.find(move, index + 1)
+    return index
+
+
+class MCTSPolicy:
+    def __init__(self, workers=MCTS_WORKERS, cache_size=MCTS_CACHE_SIZE, cache_visits=MCTS_CACHE_VISITS):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.cache_visits = cache_visits
+        self.cache = OrderedDict()  # public position: {move: [visits, wins]}
+        self.searcher = Searcher() if workers == 0 else None
+        self.pool = None
+
+    def inherited(self, key, moves):
+        # the statistics a search of the position starts from, at most cache_visits visits
+        statistics = {move: [0, 0] for move in moves}
+        cached = self.cache.get(key)
+        if INSTRUMENTATION:
+            stats.count("mcts searches")
+            if cached is not None:
+                stats.count("mcts cache hits")
+        if cached is None:
+            return statistics
+
+        total = sum(visits for visits, _ in cached.values())
+        scale = min(1.0, self.cache_visits / total) if total > 0 else 0.0
+        for move, (visits, wins) in cached.items():
+            statistics[move] = [visits * scale, wins * scale]
+        return statistics
+
+    def store(self, key, statistics):
+        if self.cache_size <= 0:
+            return
+        self.cache[key] = statistics
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def decide(self, tables, masks):
+        answers = [None] * len(tables)
+        keys = []
+        jobs = []
+        for index, (table, mask) in enumerate(zip(tables, masks)):
+            # the search is seeded from the stream of the seat
+            rng = table.seat_random[table.turn] if table.seat_random is not None else random
+            seed = rng.getrandbits(64)
+
+            moves = playableMoves(table, mask)
+            if len(moves) == 1:
+                answers[index] = answerMove(moves[0], table.alive[table.turn].cards, mask)
+                continue
+
+            key = positionKey(table, mask, moves)
+            keys.append((index, key))
+            jobs.append((snapshotTable(table), mask, seed, self.inherited(key, moves)))
+
+        if len(jobs) == 0:
+            return answers
+
+        if self.workers == 0:
+            results = [self.searcher.search(*job) for job in jobs]
+        else:
+            if self.pool is None:
+                import multiprocessing
+                from mcts_pool import initWorker
+                self.pool = multiprocessing.Pool(self.workers, initializer=initWorker, initargs=(config.settings(),))
+            from mcts_pool import searchJob
+            results = self.pool.map(searchJob, jobs, chunksize=max(1, len(jobs) // (4 * self.workers)))
+
+        # in the order of the games, a position searched twice in the batch keeps the last search
+        for (index, key), (answer, statistics) in zip(keys, results):
+            answers[index] = answer
+            self.store(key, statistics)
+        return answers
+
+    def close(self):
+        # stops the worker processes, a new pool is started if the policy decides again
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
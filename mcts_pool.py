@@ -0,0 +1,20 @@
+# Worker processes of the mcts policy (mcts.MCTSPolicy with MCTS_WORKERS)
+# Only config is imported here: when the worker is spawned instead of forked it imports this module to find
+# initWorker, the game modules copy the settings when they are imported, so they are imported after the
+# settings of the parent are applied (like simulation_pool.runShard)
+
+import config
+
+
+# searcher of the worker process
+worker_searcher = None
+
+def initWorker(settings):
+    global worker_searcher
+    config.configure(**settings)
+
+    from mcts import Searcher
+    worker_searcher = Searcher()
+
+def searchJob(job):
+    return worker_searcher.search(*job)
@@ -0,0 +1,181 @@
+# Paired simulation of two variants with common random numbers
+# Both variants play the same games: game g of variant A and game g of variant B have the same deck order and
+# the same random stream for every seat (seeded from the run seed and the game id, fast_engine.seedTable),
+# they only differ where the variants make them differ. The difference of the outcomes of a seat, game by game,
+# has a much smaller variance than the difference of two independent runs: small edges show up in fewer games.
+#   python paired.py -n 20000 --a 0=linear --b 0=random
+#   python paired.py -n 20000 --a-set NUMBER_OF_INITIAL_CARDS=5 --b-set NUMBER_OF_INITIAL_CARDS=7 --seed 42
+#
+# --a / --b set the policies of seats (PLAYER_POLICIES), --a-set / --b-set any setting of config.py.
+# Every job runs in a fresh interpreter: the game modules copy the settings when they are imported, a worker that
+# played a job of one variant would play the next job with the same settings.
+# Outcomes of --seat in every game:
+#   win        1 when the seat is the first out of cards
+#   position   finishing position of the seat, NUMBER_OF_PLAYERS when it did not finish
+#   turns      turns of the game
+# The report gives, for every outcome, the mean of each variant, the mean paired difference (A - B) with its
+# standard error and 95% interval, the standard error two independent runs of the same size would have, and
+# the variance reduction (how many times more games independent runs need for the same precision).
+
+import os
+import ast
+import math
+import argparse
+import multiprocessing
+
+import numpy as np
+
+import config
+
+
+OUTCOMES = ['win', 'position', 'turns']
+Z = 1.96 # 95% confidence intervals
+
+
+def playVariant(job):
+    # Plays games first_game_id .. first_game_id + games - 1 of a variant, returns the outcomes of the seat
+    settings, seed, first_game_id, games, seat = job
+    config.configure(**settings)
+
+    # imported here, after the settings of the variant
+    from fast_engine import newFastTable, deckTemplate
+    from policy_engine import Game, playPolicyGames, seatPolicies, CONCURRENT_GAMES
+
+    players = config.NUMBER_OF_PLAYERS
+    outcomes = {'win': np.zeros(games, dtype=np.int8), 'position': np.zeros(games, dtype=np.int8), 'turns': np.zeros(games, dtype=np.int32)}
+
+    seats = seatPolicies()
+    slots = [Game(newFastTable(), None) for _ in range(min(CONCURRENT_GAMES, games))]
+
+    def endGame(game):
+        game_index = game.game_id - first_game_id
+        finish_order = game.table.finish_order
+        position = finish_order.index(seat) if seat in finish_order else players
+        outcomes['win'][game_index] = position == 0
+        outcomes['position'][game_index] = position
+        outcomes['turns'][game_index] = game.table.turns
+
+    try:
+        playPolicyGames(slots, deckTemplate(), seed, range(first_game_id, first_game_id + games), lambda game_id: seats, endGame)
+    finally:
+        for policy in set(seats):
+            policy.close()
+    return outcomes
+
+
+def pairedSummary(a, b):
+    # a, b: outcomes of the same games under the two variants
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+    games = len(a)
+    difference = a - b
+
+    variance = difference.var(ddof=1) if games > 1 else 0.0
+    independent_variance = (a.var(ddof=1) + b.var(ddof=1)) if games > 1 else 0.0
+    standard_error = math.sqrt(variance / games)
+    mean = float(difference.mean())
+
+    return {
+        'a': float(a.mean()),
+        'b': float(b.mean()),
+        'difference': mean,
+        'standard_error': standard_error,
+        'interval': [mean - Z * standard_error, mean + Z * standard_error],
+        'independent_standard_error': math.sqrt(independent_variance / games),
+        'variance_reduction': independent_variance / variance if variance > 0 else math.inf,
+        'correlation': float(np.corrcoef(a, b)[0, 1]) if a.std() > 0 and b.std() > 0 else 0.0,
+    }
+
+
+def runPaired(settings_a, settings_b, games, seed=None, seat=0, processes=None):
+    # Plays the same games with both variants, returns {outcome: pairedSummary}
+    from simulation_pool import splitSimulations
+    from game_utility import newRunSeed
+
+    if seed is None:
+        seed = newRunSeed()
+    if processes is None:
+        processes = config.NUMBER_OF_PROCESSES
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+
+    # every variant gets half of the processes, each one plays a shard of the games
+    shards = max(1, min(processes // 2, games))
+    jobs = []
+    for settings in (settings_a, settings_b):
+        first_game_id = 0
+        for shard_games in splitSimulations(games, shards):
+            jobs.append((settings, seed, first_game_id, shard_games, seat))
+            first_game_id += shard_games
+
+    print("Playing", games, "paired games of two variants on", min(processes, len(jobs)), "processes (seed:", seed, ")")
+
+    # spawned workers that die after one job, a forked worker would also inherit the modules of this process
+    with multiprocessing.get_context('spawn').Pool(min(processes, len(jobs)), maxtasksperchild=1) as pool:
+        results = pool.map(playVariant, jobs)
+
+    outcomes_a = {name: np.concatenate([result[name] for result in results[:shards]]) for name in OUTCOMES}
+    outcomes_b = {name: np.concatenate([result[name] for result in results[shards:]]) for name in OUTCOMES}
+    return {name: pairedSummary(outcomes_a[name], outcomes_b[name]) for name in OUTCOMES}
+
+
+def printPaired(summaries, seat):
+    print("Seat", seat, "- variant A - variant B, paired over the same games")
+    for name, summary in summaries.items():
+        low, high = summary['interval']
+        print("  %-8s A %9.4f  B %9.4f  difference %+9.4f [%+9.4f, %+9.4f]  se %.5f (independent %.5f, variance / %.1f)"
+              % (name, summary['a'], summary['b'], summary['difference'], low, high, summary['standard_error'],
+                 summary['independent_standard_error'], summary['variance_reduction']))
+
+
+def variantSettings(policies, overrides):
+    # settings of a variant from its SEAT=NAME policies and NAME=VALUE settings
+    settings = {}
+    if policies:
+        settings['PLAYER_POLICIES'] = {int(seat): name for seat, name in (policy.split("=") for policy in policies)}
+    for override in overrides or []:
+        name, value = override.split("=", 1)
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            pass    # a string
+        settings[name] = value
+    return settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paired simulation of two variants with common random numbers")
+    parser.add_argument("-n", "--simulations", type=int, default=10000, help="games played by each variant")
+    parser.add_argument("--a", action="append", metavar="SEAT=NAME", help="policy of a seat in variant A, can be repeated")
+    parser.add_argument("--b", action="append", metavar="SEAT=NAME", help="policy of a seat in variant B, can be repeated")
+    parser.add_argument("--a-set", action="append", metavar="NAME=VALUE", help="setting of config.py in variant A, can be repeated")
+    parser.add_argument("--b-set", action="append", metavar="NAME=VALUE", help="setting of config.py in variant B, can be repeated")
+    parser.add_argument("--seat", type=int, default=0, help="seat whose outcomes are compared")
+    parser.add_argument("--players", type=int, help="NUMBER_OF_PLAYERS")
+    parser.add_argument("--processes", type=int, help="NUMBER_OF_PROCESSES, 0 = every core")
+    parser.add_argument("--model", help="MODEL_FILE of the keras policy")
+    parser.add_argument("--seed", type=int, help="SIMULATION_SEED")
+    parser.add_argument("--max-turns", type=int, default=2000, help="MAX_TURNS, 0 = no limit (two deterministic policies can pass wild cards back and forth forever)")
+    args = parser.parse_args(argv)
+
+    # settings of both variants, nothing is logged
+    common = {"ENABLE_LOGGING": False, "ENABLE_MAX_TURNS": args.max_turns > 0, "MAX_TURNS": args.max_turns}
+    if args.players is not None:
+        common["NUMBER_OF_PLAYERS"] = args.players
+    if args.model is not None:
+        common["MODEL_FILE"] = args.model
+    config.configure(**common)
+
+    settings_a = dict(config.settings(), **variantSettings(args.a, args.a_set))
+    settings_b = dict(config.settings(), **variantSettings(args.b, args.b_set))
+    if settings_a == settings_b:
+        parser.error("the two variants have the same settings")
+
+    summaries = runPaired(settings_a, settings_b, args.simulations, args.seed if args.seed is not None else config.SIMULATION_SEED,
+                          args.seat, args.processes)
+    printPaired(summaries, args.seat)
+    return summaries
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# Player policies of the policy engine (policy_engine.py)
+# A policy plays the moves of its seats for many games at once: decide(tables, masks) gets every game that waits
+# for a move of one of its players and returns one answer per game, so a model is called once per batch.
+#   mask = playable cards of the hand (bytes, 1 = playable)    answer = index of the card of the hand to play
+#   mask = None, a wild card was just played                    answer = the new color, 1..4
+# The player is table.alive[table.turn], tables are fast_engine.FastTable (hands of card kinds).
+# close() frees what the policy holds (the worker processes of mcts) once the games are over.
+#
+# Policies (config.PLAYER_POLICIES, cli.py --policy SEAT=NAME):
+#   random    the moves of game_logic.playCard / changeColor
+#   linear    LinearModel, plays the card worth the most points and picks the color it holds the most
+#   keras     a keras model loaded from MODEL_FILE (tensorflow is only imported for it)
+#   mcts      determinized Monte Carlo tree search with random rollouts (mcts.py)
+# Models take the float32 features of encodeTables (batch, FEATURES) and return scores (batch, OUTPUTS):
+# one score per card kind, the best playable card is played, then one score per color.
+
+import random
+
+import numpy as np
+
+import config
+
+from fast_engine import NUMBER_OF_KINDS, KIND_COLOR, KIND_POINTS, playCard, changeColor
+
+
+MODEL_FILE = config.MODEL_FILE
+
+# Features of a decision, columns of encodeTables
+HAND_FEATURES = 0               # cards of the hand, by card kind
+TOP_FEATURES = NUMBER_OF_KINDS  # card kind of the top card, one hot
+COLOR_FEATURES = 2 * NUMBER_OF_KINDS    # color of the top card (1..5), one hot
+TO_BE_DRAWN_FEATURE = COLOR_FEATURES + 5
+DIRECTION_FEATURE = TO_BE_DRAWN_FEATURE + 1
+ALIVE_FEATURE = DIRECTION_FEATURE + 1   # players still playing
+NEXT_HAND_FEATURE = ALIVE_FEATURE + 1   # cards of the next player
+COLOR_REQUEST_FEATURE = NEXT_HAND_FEATURE + 1   # 1 when the color of a wild card is asked
+FEATURES = COLOR_REQUEST_FEATURE + 1
+
+# Scores of a model
+COLOR_SCORES = NUMBER_OF_KINDS
+OUTPUTS = NUMBER_OF_KINDS + 4
+
+
+def encodeTables(tables, masks):
+    size = len(tables)
+    rows = np.arange(size)
+    features = np.zeros((size, FEATURES), dtype=np.float32)
+
+    # every hand of the batch in one bincount
+    hands = [table.alive[table.turn].cards for table in tables]
+    hand_rows = np.repeat(rows, [len(hand) for hand in hands])
+    kinds = np.frombuffer(b"".join(hands), dtype=np.uint8)
+    features[:, HAND_FEATURES:HAND_FEATURES + NUMBER_OF_KINDS] = np.bincount(hand_rows * NUMBER_OF_KINDS + kinds, minlength=size * NUMBER_OF_KINDS).reshape(size, NUMBER_OF_KINDS)
+
+    features[rows, [TOP_FEATURES + table.cards[-1] for table in tables]] = 1
+    features[rows, [COLOR_FEATURES + table.top_color - 1 for table in tables]] = 1
+    features[:, TO_BE_DRAWN_FEATURE] = [table.to_be_drawn for table in tables]
+    features[:, DIRECTION_FEATURE] = [table.direction for table in tables]
+    features[:, ALIVE_FEATURE] = [len(table.alive) for table in tables]
+    features[:, NEXT_HAND_FEATURE] = [len(table.alive[table.next_seat[table.turn] if table.direction else table.previous_seat[table.turn]].cards) for table in tables]
+    features[:, COLOR_REQUEST_FEATURE] = [mask is None for mask in masks]
+
+    return features
+
+
+class RandomPolicy:
+    # Same moves as the fast engine without a policy, there is nothing to batch
+    # Each seat draws from its own stream when the table has them (fast_engine.seedTable)
+    def decide(self, tables, masks):
+        answers = []
+        for table, mask in zip(tables, masks):
+            rng = table.seat_random[table.turn] if table.seat_random is not None else random
+            if mask is None:
+                answers.append(changeColor(table.alive[table.turn].cards, rng))
+            else:
+                answers.append(playCard(mask, rng))
+        return answers
+
+    def close(self):
+        pass
+
+
+class ModelPolicy:
+    # Evaluates every decision of the batch with a single model call
+    def __init__(self, model):
+        self.model = model  # float32 (batch, FEATURES) -> scores (batch, OUTPUTS)
+
+    def decide(self, tables, masks):
+        scores = np.asarray(self.model(encodeTables(tables, masks)))
+
+        answers = []
+        for row_scores, table, mask in zip(scores.tolist(), tables, masks):
+            if mask is None:
+                colors = row_scores[COLOR_SCORES:]
+                answers.append(colors.index(max(colors)) + 1)
+            else:
+                # the playable card with the best score, the first one on a tie
+                hand = table.alive[table.turn].cards
+                best = mask.find(1)
+                index = mask.find(1, best + 1)
+                while index != -1:
+                    if row_scores[hand[index]] > row_scores[hand[best]]:
+                        best = index
+                    index = mask.find(1, index + 1)
+                answers.append(best)
+        return answers
+
+    def close(self):
+        pass
+
+
+class LinearModel:
+    # scores = features @ weights + bias, runs on the cpu without tensorflow
+    # The default weights play the card worth the most points and pick the color the hand holds the most
+    def __init__(self, weights=None, bias=None):
+        if weights is None:
+            weights = np.zeros((FEATURES, OUTPUTS), dtype=np.float32)
+            for kind in range(NUMBER_OF_KINDS):
+                if KIND_COLOR[kind] < 5:
+                    weights[HAND_FEATURES + kind, COLOR_SCORES + KIND_COLOR[kind] - 1] = 1
+        if bias is None:
+            bias = np.zeros(OUTPUTS, dtype=np.float32)
+            bias[:NUMBER_OF_KINDS] = KIND_POINTS
+
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+
+    def __call__(self, features):
+        return features @ self.weights + self.bias
+
+
+def kerasModel(file_name):
+    # tensorflow is heavy, only imported when a keras policy is used
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(file_name)
+
+    # calling the model directly is much cheaper than model.predict for small batches
+    return lambda features: model(features, training=False).numpy()
+
+
+def newPolicy(name):
+    if name == "random":
+        return RandomPolicy()
+    if name == "linear":
+        return ModelPolicy(LinearModel())
+    if name == "keras":
+        if not MODEL_FILE:
+            raise ValueError("The keras policy needs MODEL_FILE (cli.py --model)")
+        return ModelPolicy(kerasModel(MODEL_FILE))
+    if name == "mcts":
+        from mcts import MCTSPolicy
+        return MCTSPolicy()
+    raise KeyError("Unknown policy: " + name + " (random, linear, keras or mcts)")
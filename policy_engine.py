@@ -0,0 +1,224 @@
+# Policy engine
+# Plays CONCURRENT_GAMES games of the fast engine at the same time, every seat is played by a policy
+# (config.PLAYER_POLICIES, see policies.py). Each game runs until its next move (fast_engine.gameSteps),
+# then the moves of all the waiting games are decided together, one decide call (one model call) per policy.
+# When a game is over its slot is filled with a new game, so the batch stays full until the end.
+#
+# Every game is seeded from the run seed and its id when it starts, the deck order is the same as in the
+# other engines. The games are played next to each other, so each one has its own random streams
+# (fast_engine.seedTable): a run gives the same games for a seed whatever CONCURRENT_GAMES, but the random
+# moves differ from the fast engine (RECORD_GAMES is not supported).
+
+import itertools
+
+import config
+
+import game_utility
+from game_utility import Player, newDatasetWriter, TurnLog
+from fast_engine import newFastTable, resetTable, seedTable, deckTemplate, gameSteps
+from policies import newPolicy
+from ratings import RatingLog
+from instrumentation import INSTRUMENTATION, stats, clock
+
+
+NUMBER_OF_PLAYERS = config.NUMBER_OF_PLAYERS
+NUMBER_OF_INITIAL_CARDS = config.NUMBER_OF_INITIAL_CARDS
+
+TOTAL_SIMULATIONS = config.TOTAL_SIMULATIONS
+
+PLAYER_POLICIES = config.PLAYER_POLICIES
+CONCURRENT_GAMES = config.CONCURRENT_GAMES
+
+# Logging
+ENABLE_LOGGING = config.ENABLE_LOGGING
+ONLY_LOG_WINNING_GAMES = config.ONLY_LOG_WINNING_GAMES
+
+
+class Game:
+    # A game in flight and what it waits for
+    def __init__(self, table, game_data):
+        self.table = table
+        self.game_data = game_data  # TurnLog, None when nothing is logged
+        self.steps = None           # fast_engine.gameSteps generator
+        self.seats = None           # policy of every seat
+        self.game_id = 0
+        self.request = None         # mask of the playable cards, None when a color is asked
+        self.answer = None
+        self.winners = 0
+
+
+def seatPolicies():
+    # one policy object per name, seats that are not in PLAYER_POLICIES play random moves
+    policies = {}
+    seats = []
+    for seat in range(NUMBER_OF_PLAYERS):
+        name = PLAYER_POLICIES.get(seat, "random")
+        if name not in policies:
+            policies[name] = newPolicy(name)
+        seats.append(policies[name])
+    return seats
+
+
+def advance(game, answer):
+    # Plays the game until its next move, returns False when the game is over
+    try:
+        game.request = game.steps.send(answer)
+        return True
+    except StopIteration as end:
+        game.winners = end.value
+        return False
+
+
+def playPolicyGames(slots, template, seed, game_ids, seatsOf, endGame):
+    # Plays the games of game_ids (any iterable, endless or not) on the slots (Game objects, one per concurrent game)
+    # seatsOf(game_id) gives the policy of every seat of a game, endGame(game) is called when a game is over
+    game_ids = iter(game_ids)
+    games = []      # games in flight, all of them wait for a move
+
+    def startNext(game):
+        # Starts new games in the slot until one needs a move, returns False when every game was started
+        for game_id in game_ids:
+            game.game_id = game_id
+            game.seats = seatsOf(game_id)
+
+            seedTable(game.table, game_utility.gameSeed(seed, game_id))
+            resetTable(game.table)
+            if game.game_data is not None:
+                game.game_data.clear()
+
+            game.steps = gameSteps(game.table, template, game.game_data, True)
+            if advance(game, None):
+                return True
+
+            endGame(game)
+        return False
+
+    try:
+        for game in slots:
+            if startNext(game):
+                games.append(game)
+
+        while len(games) > 0:
+            if INSTRUMENTATION:
+                policy_start = clock()
+                stats.count("decisions", len(games))
+
+            # the waiting games of every policy
+            waiting = {}
+            for game in games:
+                policy = game.seats[game.table.turn]
+                if policy not in waiting:
+                    waiting[policy] = []
+                waiting[policy].append(game)
+
+            for policy, policy_games in waiting.items():
+                answers = policy.decide([game.table for game in policy_games], [game.request for game in policy_games])
+                for game, answer in zip(policy_games, answers):
+                    game.answer = answer
+
+                if INSTRUMENTATION:
+                    stats.count("policy batches")
+
+            if INSTRUMENTATION:
+                stats.time("policy", policy_start)
+
+            # every game plays until its next move, finished games make room for new ones
+            playing = []
+            for game in games:
+                if advance(game, game.answer):
+                    playing.append(game)
+                else:
+                    endGame(game)
+                    if startNext(game):
+                        playing.append(game)
+            games = playing
+
+    finally:
+        for game in games:
+            game.steps.close()
+
+
+def addPlayers(players, slots):
+    # adds up the players of the tables of the slots
+    for game in slots:
+        table = game.table
+        table.alive.update(table.dead)
+        table.dead.clear()
+        for i in table.alive:
+            player = players[i]
+            player.wins += table.alive[i].wins
+            player.score += table.alive[i].score
+            player.performance += table.alive[i].performance
+            player.turns += table.alive[i].turns
+    return players
+
+
+def startPolicyGame(total_simulations=TOTAL_SIMULATIONS, seed=None, shard=None, first_game_id=0, concurrent_games=CONCURRENT_GAMES):
+    # Drop-in replacement of uno.startGame
+    if seed is None:
+        seed = game_utility.newRunSeed()
+
+    template = deckTemplate()
+
+    # Important check
+    if NUMBER_OF_PLAYERS * NUMBER_OF_INITIAL_CARDS > len(template):
+        print("[ERROR] NUMBER_OF_PLAYERS * NUMBER_OF_INITIAL_CARDS > len(deck)")
+        print("Either lower NUMBER_OF_PLAYERS or NUMBER_OF_INITIAL_CARDS")
+        return {}
+
+    seats = seatPolicies()
+
+    # the results of the run, every table has its own players (their hands) that are added up at the end
+    players = {i: Player([], i, 1) for i in range(NUMBER_OF_PLAYERS)}
+    rating_log = RatingLog(players)
+
+    writer = newDatasetWriter(shard) if ENABLE_LOGGING else None
+
+    if total_simulations > 0:
+        concurrent_games = min(concurrent_games, total_simulations)
+        game_ids = range(first_game_id, first_game_id + total_simulations)
+    else:
+        game_ids = itertools.count(first_game_id)
+
+    slots = []
+    for _ in range(concurrent_games):
+        table = newFastTable()
+        table.rating_log = rating_log
+        slots.append(Game(table, TurnLog() if ENABLE_LOGGING else None))
+
+    def endGame(game):
+        if ((ONLY_LOG_WINNING_GAMES and game.winners > 0) or (not ONLY_LOG_WINNING_GAMES)) and ENABLE_LOGGING:
+            if INSTRUMENTATION:
+                phase_start = clock()
+
+            writer.write(game.game_data, game.game_id)
+
+            if INSTRUMENTATION:
+                stats.time("dataset", phase_start)
+
+    if INSTRUMENTATION:
+        run_start = clock()
+
+    try:
+        playPolicyGames(slots, template, seed, game_ids, lambda game_id: seats, endGame)
+
+    finally:
+        for policy in set(seats):
+            policy.close()
+
+        rating_log.update()
+
+        if writer is not None:
+            if INSTRUMENTATION:
+                phase_start = clock()
+
+            writer.close()
+
+            if INSTRUMENTATION:
+                stats.time("dataset", phase_start)
+
+        if INSTRUMENTATION:
+            stats.time("run", run_start)
+
+    # END of simulation
+    return addPlayers(players, slots)
@@ -0,0 +1,91 @@
+# TrueSkill ratings of the players
+# The engines only record who was still playing and who won (RatingLog.recordWin), the ratings are computed
+# afterwards in bulk with a single TrueSkill environment, every RATING_BATCH wins and at the end of the run.
+# The winner ranks first, the other alive players tie for second, like the old update_trueskill.
+# Players keep their full Rating (mu and sigma) between updates.
+# The workers of the process pool rate the wins of their shard from the prior, the parent merges the ratings
+# (simulation_pool.mergeRatings). With EXACT_POOL_RATINGS they keep their wins instead (deferRatings) and the
+# parent rates the wins of all the shards in one pass, in game order.
+
+import trueskill
+
+import config
+
+from instrumentation import INSTRUMENTATION, stats, clock
+
+
+RATING_BATCH = config.RATING_BATCH
+
+# every rating is computed with the default environment, like the old update_trueskill
+environment = trueskill.TrueSkill()
+
+# wins of this worker of the process pool, in the order they happened, None = the wins are rated here
+deferred_alive = None
+deferred_winners = None
+
+
+def deferRatings(alive=(), winners=()):
+    # From now on RatingLog.update keeps the wins in deferred_alive / deferred_winners instead of rating them
+    global deferred_alive, deferred_winners
+    deferred_alive = list(alive)
+    deferred_winners = list(winners)
+
+
+def rateWin(players, alive_ids, winner_id):
+    # players: {id: Player}, alive_ids: ids of the players that were still playing, winner included
+    ratings = [(players[player_id].trueskill,) for player_id in alive_ids]
+    ranks = [0 if player_id == winner_id else 1 for player_id in alive_ids]
+
+    new_ratings = environment.rate(ratings, ranks=ranks)
+
+    for player_id, (rating,) in zip(alive_ids, new_ratings):
+        players[player_id].trueskill = rating
+
+
+class RatingLog:
+    # Finish order of the games, one (alive players bitmask, winner id) pair per win
+    def __init__(self, players, batch=RATING_BATCH):
+        self.players = players  # {id: Player}, every player of the table
+        self.batch = batch      # 0 = only rate at the end of the run
+        self.alive = []
+        self.winners = []
+
+    def __len__(self):
+        return len(self.winners)
+
+    def recordWin(self, alive_bits, winner_id):
+        # alive_bits: bit i is set if player i was still playing
+        self.alive.append(alive_bits)
+        self.winners.append(winner_id)
+
+        if self.batch > 0 and len(self.winners) >= self.batch:
+            self.update()
+
+    def recordAlive(self, alive, winner_id):
+        # same as recordWin, from the table.alive dict
+        alive_bits = 0
+        for player_id in alive:
+            alive_bits |= 1 << player_id
+        self.recordWin(alive_bits, winner_id)
+
+    def update(self):
+        # Rates every recorded win, in the order they happened
+        if INSTRUMENTATION:
+            ratings_start = clock()
+
+        players = self.players
+
+        if deferred_alive is not None:
+            # rated by the parent process
+            deferred_alive.extend(self.alive)
+            deferred_winners.extend(self.winners)
+        else:
+            for alive_bits, winner_id in zip(self.alive, self.winners):
+                alive_ids = [player_id for player_id in players if alive_bits >> player_id & 1]
+                rateWin(players, alive_ids, winner_id)
+
+        self.alive.clear()
+        self.winners.clear()
+
+        if INSTRUMENTATION:
+            stats.time("ratings", ratings_start)
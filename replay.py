@@ -0,0 +1,188 @@
+# Game records and replays
+# Every game is seeded on its own from the run seed and its game id (game_utility.seedGame), so a game can be
+# played again without the games before it. With RECORD_GAMES the engines only save a small record per game
+# to dataset/games.parquet (dataset/gamesN.parquet for worker N of the process pool):
+#   game_id, run_seed, seed, config_hash, turns, winners (finish order)
+# replayGames plays the chosen games again and returns their full turn log, the same rows as the dataset files.
+#
+#   from replay import replayGames
+#   rows = replayGames([12, 4031])            # pyarrow Table, columns of game_utility.DATASET_COLUMNS
+#
+# A replay must run with the settings of the recorded run (same cli flags), the config hash is checked.
+
+import os
+import json
+import glob
+import random
+import hashlib
+
+import config
+
+from game_utility import TurnLog, datasetSchema, datasetBatch, seedShuffler, removeParts
+
+
+ROWS_PER_ROW_GROUP = config.ROWS_PER_ROW_GROUP
+
+# settings that change how a game is played
+GAME_SETTINGS = [
+    'NUMBER_OF_DECKS',
+    'NUMBER_OF_PLAYERS',
+    'NUMBER_OF_INITIAL_CARDS',
+    'ONLY_ONE_PLAYER_CAN_WIN',
+    'ENABLE_MAX_TURNS',
+    'MAX_TURNS',
+]
+
+
+def configHash(settings=None):
+    if settings is None:
+        settings = config.settings()
+    game_settings = {name: settings[name] for name in GAME_SETTINGS}
+    return hashlib.sha1(json.dumps(game_settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def recordSchema():
+    import pyarrow as pa
+    return pa.schema([
+        ('game_id', pa.int64()),
+        ('run_seed', pa.int64()),
+        ('seed', pa.uint64()),
+        ('config_hash', pa.string()),
+        ('turns', pa.int32()),
+        ('winners', pa.list_(pa.int8())),
+    ])
+
+
+class GameRecorder:
+    # One record per game, written as row groups of ROWS_PER_ROW_GROUP games
+    # first_part: numbered files closed by every checkpoint, like game_utility.DatasetWriter
+    def __init__(self, run_seed, shard=None, directory='dataset', rows_per_row_group=ROWS_PER_ROW_GROUP, first_part=None):
+        self.run_seed = run_seed
+        self.config_hash = configHash()
+        self.rows_per_row_group = rows_per_row_group
+
+        self.prefix = 'games' + (str(shard) if shard is not None else '')
+        self.part = first_part or 0
+        self.numbered = first_part is not None
+        self.directory = directory
+        self.writer = None
+
+        if first_part is not None:
+            removeParts(directory, self.prefix, first_part)
+
+        self.game_ids = []
+        self.seeds = []
+        self.turns = []
+        self.winners = []
+
+    def record(self, game_id, seed, turns, winners):
+        self.game_ids.append(game_id)
+        self.seeds.append(seed)
+        self.turns.append(turns)
+        self.winners.append(list(winners))
+
+        if len(self.game_ids) >= self.rows_per_row_group:
+            self.flush()
+
+    def flush(self):
+        if len(self.game_ids) == 0:
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = recordSchema()
+        if self.writer is None:
+            os.makedirs(self.directory, exist_ok=True)
+            name = self.prefix + ('_' + str(self.part) if self.numbered else '')
+            self.writer = pq.ParquetWriter(os.path.join(self.directory, name + '.parquet'), schema)
+
+        size = len(self.game_ids)
+        table = pa.Table.from_arrays([
+            pa.array(self.game_ids, pa.int64()),
+            pa.array([self.run_seed] * size, pa.int64()),
+            pa.array(self.seeds, pa.uint64()),
+            pa.array([self.config_hash] * size, pa.string()),
+            pa.array(self.turns, pa.int32()),
+            pa.array(self.winners, pa.list_(pa.int8())),
+        ], schema=schema)
+        self.writer.write_table(table, row_group_size=size)
+
+        self.game_ids.clear()
+        self.seeds.clear()
+        self.turns.clear()
+        self.winners.clear()
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def checkpoint(self):
+        # Writes every buffered record and closes the file, returns the part of the next file
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.part += 1
+        return self.part
+
+
+def loadRecords(path='dataset'):
+    # path is a records file or a directory with games*.parquet files
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, 'games*.parquet')))
+    else:
+        files = [path]
+
+    if len(files) == 0:
+        raise FileNotFoundError("No game records in " + path + ", run with RECORD_GAMES (cli.py --record)")
+
+    return pa.concat_tables([pq.read_table(file_name) for file_name in files])
+
+
+def replayGames(game_ids, records='dataset'):
+    # Plays the games again, returns their turn log as a pyarrow Table (same columns as the dataset files)
+    # records: a path for loadRecords or an already loaded records table
+    import pyarrow as pa
+    import fast_engine
+
+    if isinstance(records, str):
+        records = loadRecords(records)
+
+    rows_of_game = {game_id: row for row, game_id in enumerate(records.column('game_id').to_pylist())}
+    current_hash = configHash()
+
+    # the games were counted by the recorded run, not by the run that replays them
+    table = fast_engine.newFastTable()
+    table.counted = False
+    template = fast_engine.deckTemplate()
+    game_data = TurnLog()
+    schema = datasetSchema()
+
+    batches = []
+    for game_id in game_ids:
+        if game_id not in rows_of_game:
+            raise KeyError("Game " + str(game_id) + " is not in the records")
+
+        record = {name: records.column(name)[rows_of_game[game_id]].as_py() for name in records.column_names}
+        if record['config_hash'] != current_hash:
+            raise ValueError("Game " + str(game_id) + " was played with other settings, run the replay with the same flags as the recorded run")
+
+        random.seed(record['seed'])
+        seedShuffler(record['seed'])
+
+        fast_engine.resetTable(table)
+        game_data.clear()
+        fast_engine.playGame(table, template, game_data)
+
+        if table.turns != record['turns'] or table.finish_order != record['winners']:
+            raise RuntimeError("Game " + str(game_id) + " played differently, the rules changed since it was recorded")
+
+        batches.append(datasetBatch(game_data.columns(game_id), schema))
+
+    return pa.Table.from_batches(batches, schema=schema)
@@ -0,0 +1,169 @@
+# Runs TOTAL_SIMULATIONS on a process pool
+# Every worker plays its share of the games (numbered from its first game id) and writes its own dataset file,
+# the per-player results are merged back into a single summary at the end.
+# TrueSkill: every worker rates the wins of its shard and the parent merges the ratings of the shards
+# (mergeRatings), with EXACT_POOL_RATINGS the parent rates the wins of all the workers instead (ratings.deferRatings)
+
+import os
+import random
+import multiprocessing
+
+import numpy as np
+
+import config
+
+
+def splitSimulations(total_simulations, processes):
+    # [100, 3] -> [34, 33, 33]
+    share, remainder = divmod(total_simulations, processes)
+    return [share + 1 if i < remainder else share for i in range(processes)]
+
+
+def runShard(args):
+    shard, simulations, seed, first_game_id, settings = args
+
+    # settings given on the command line are lost when the worker is spawned instead of forked,
+    # they are applied again before the game modules are imported
+    config.configure(**settings)
+
+    # with EXACT_POOL_RATINGS the wins of the shard are rated by the parent, after the wins of the shards before it
+    import ratings
+    if config.EXACT_POOL_RATINGS:
+        ratings.deferRatings()
+
+    # a worker of the pool can play more than one shard, the shard returns its own timers and statistics
+    from instrumentation import stats
+    from game_statistics import run_stats
+    stats.clear()
+    run_stats.clear()
+
+    # imported here, the modules are only needed inside the worker
+    if config.POLICY_ENGINE:
+        from policy_engine import startPolicyGame
+        players = startPolicyGame(simulations, seed, shard, first_game_id)
+    else:
+        if config.FAST_ENGINE:
+            from fast_engine import startFastGame as startGame
+        else:
+            from uno import startGame
+        players = startGame(simulations, seed, shard, first_game_id)
+
+    results = {}
+    for player_id in players:
+        player = players[player_id]
+        results[player_id] = {
+            'wins': player.wins,
+            'score': player.score,
+            'performance': player.performance,
+            'turns': player.turns,
+            'mu': player.trueskill.mu,
+            'sigma': player.trueskill.sigma,
+        }
+
+    wins = None
+    if ratings.deferred_alive is not None:
+        wins = (np.array(ratings.deferred_alive, dtype=np.int64), np.array(ratings.deferred_winners, dtype=np.int16))
+
+    return simulations, results, wins, stats.toDict(), run_stats.toDict()
+
+
+def mergeResults(shard_results):
+    # shard_results in the order of the shards (of their game ids)
+    from game_utility import Player
+    from ratings import RatingLog
+
+    players = {}
+
+    for _, results, _, _, _ in shard_results:
+        for player_id in results:
+            result = results[player_id]
+
+            if player_id not in players:
+                players[player_id] = Player([], player_id, 1)
+
+            player = players[player_id]
+            player.wins += result['wins']
+            player.score += result['score']
+            player.performance += result['performance']
+            player.turns += result['turns']
+
+    players = dict(sorted(players.items()))
+    if not config.EXACT_POOL_RATINGS:
+        mergeRatings(players, shard_results)
+        return players
+
+    # the wins of every shard are rated from the prior in game order, like a run on a single process
+    # (players in seat order, the order of the teams changes the ratings a bit)
+    rating_log = RatingLog(players, 0)
+    for _, _, (alive, winners), _, _ in shard_results:
+        rating_log.alive.extend(alive.tolist())
+        rating_log.winners.extend(winners.tolist())
+    rating_log.update()
+
+    return players
+
+
+def mergeRatings(players, shard_results):
+    # TrueSkill ratings can't be merged exactly, every shard rated its own games from the prior (the rating of a
+    # new Player): mu is the mean of the product of the shard ratings with the prior counted once, every shard
+    # is a measurement of the same skill weighted by 1 / sigma^2. sigma is not the sigma of that product:
+    # TrueSkill adds the dynamics factor tau to sigma before every game, a long run settles at the same sigma
+    # whatever its length, the merged sigma is the mean sigma of the shards weighted by their games.
+    # A single process run gives more weight to its last games, its mu is noisier than the merged one.
+    from ratings import environment
+
+    for player_id, player in players.items():
+        prior = player.trueskill
+        prior_precision = 1 / prior.sigma ** 2
+        shards = [(simulations, results[player_id]) for simulations, results, _, _, _ in shard_results]
+
+        precision = sum(1 / result['sigma'] ** 2 for _, result in shards) - (len(shards) - 1) * prior_precision
+        mean = sum(result['mu'] / result['sigma'] ** 2 for _, result in shards) - (len(shards) - 1) * prior.mu * prior_precision
+        sigma = sum(result['sigma'] * simulations for simulations, result in shards) / sum(simulations for simulations, _ in shards)
+
+        player.trueskill = environment.create_rating(mean / precision, sigma)
+
+
+def runSubdividedSimulations(total_simulations=None, processes=None, seed=None):
+    # defaults are read when called, cli.py may have changed the settings after this module was imported
+    if total_simulations is None:
+        total_simulations = config.TOTAL_SIMULATIONS
+    if processes is None:
+        processes = config.NUMBER_OF_PROCESSES
+    if seed is None:
+        seed = config.SIMULATION_SEED
+
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+
+    # no point in spawning workers that have nothing to do
+    processes = min(processes, total_simulations)
+
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
+
+    # game ids keep counting across the shards, every game of the run has a different id
+    # and its own seed, the games don't depend on the amount of processes
+    jobs = []
+    first_game_id = 0
+    for shard, simulations in enumerate(splitSimulations(total_simulations, processes)):
+        jobs.append((shard, simulations, seed, first_game_id, config.settings()))
+        first_game_id += simulations
+
+    print("Running", total_simulations, "simulations on", processes, "processes (seed:", seed, ")")
+
+    with multiprocessing.Pool(processes) as pool:
+        shard_results = pool.map(runShard, jobs)
+
+    # the timers of the workers are summed, phase times are cpu time of all the processes
+    if config.ENABLE_INSTRUMENTATION:
+        from instrumentation import stats
+        for _, _, _, shard_stats, _ in shard_results:
+            stats.merge(shard_stats)
+
+    if config.ENABLE_STATISTICS:
+        from game_statistics import run_stats
+        for _, _, _, _, shard_statistics in shard_results:
+            run_stats.merge(shard_statistics)
+
+    return mergeResults(shard_results)
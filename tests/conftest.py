@@ -0,0 +1,9 @@
+# The modules of the simulator live at the root of the repository
+# They copy the settings of config.py when they are imported: the tests run with the settings of config.py,
+# a test that needs other settings runs the game in a fresh interpreter
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
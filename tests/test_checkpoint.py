@@ -0,0 +1,54 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from conftest import ROOT
+
+
+GAMES = 3000
+FLAGS = ["-n", str(GAMES), "--engine", "fast", "--seed", "9", "--checkpoint", "run.json", "--checkpoint-every", "100"]
+
+
+def run(directory, *flags):
+    return subprocess.Popen([sys.executable, os.path.join(ROOT, "cli.py")] + FLAGS + list(flags), cwd=directory,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def dataset(directory):
+    files = sorted(os.listdir(os.path.join(directory, "dataset")))
+    frames = [pd.read_parquet(os.path.join(directory, "dataset", name)) for name in files if name.endswith(".parquet")]
+    return pd.concat(frames).sort_values("game_id", kind="stable").reset_index(drop=True)
+
+
+def checkpoint(directory):
+    with open(os.path.join(directory, "run.json")) as file:
+        return json.load(file)
+
+
+def test_killed_run_resumes_like_a_whole_run(tmp_path):
+    whole, killed = tmp_path / "whole", tmp_path / "killed"
+    whole.mkdir()
+    killed.mkdir()
+    assert run(whole).wait() == 0
+
+    # killed between two checkpoints, past the first one
+    process = run(killed)
+    while process.poll() is None:
+        if os.path.exists(killed / "run.json") and checkpoint(killed)['next_game_id'] >= 300:
+            time.sleep(0.05)
+            process.send_signal(signal.SIGKILL)
+            break
+        time.sleep(0.01)
+    process.wait()
+    assert checkpoint(killed)['next_game_id'] < GAMES
+
+    assert run(killed, "--resume").wait() == 0
+
+    assert checkpoint(killed)['next_game_id'] == GAMES
+    assert checkpoint(killed)['players'] == checkpoint(whole)['players']
+    pd.testing.assert_frame_equal(dataset(killed), dataset(whole))
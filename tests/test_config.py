@@ -0,0 +1,23 @@
+import pytest
+
+import config
+import uno
+
+
+def test_configure_refuses_a_setting_copied_by_an_imported_module():
+    players = config.NUMBER_OF_PLAYERS
+    assert uno.NUMBER_OF_PLAYERS == players
+
+    with pytest.raises(RuntimeError):
+        config.configure(NUMBER_OF_PLAYERS=players + 1)
+    assert config.NUMBER_OF_PLAYERS == players
+
+    # the same value again, as a forked worker does
+    config.configure(**config.settings())
+
+
+def test_configure_refuses_unknown_settings():
+    with pytest.raises(KeyError):
+        config.configure(NUMBER_OF_PLAYER=4)
+    with pytest.raises(KeyError):
+        config.configure(configure=None)
@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import fast_engine
+from conftest import ROOT
+from game_utility import BackgroundWriter, DatasetWriter, TurnLog, DATASET_COLUMNS, datasetSchema
+
+
+def test_first_turn_has_no_player(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fast_engine.startFastGame(20, seed=8)
+    rows = pd.read_parquet(tmp_path / "dataset" / "data.parquet")
+
+    first = rows[rows.game_turn == 0]
+    assert (first.player_id == -1).all()
+    # the winner of every game is a seat
+    assert rows[rows.has_won].player_id.between(0, 3).all()
+
+
+def writeRun(directory, queue_size):
+    os.makedirs(directory)
+    subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), "-n", "80", "--engine", "fast", "--seed", "5",
+                    "--writer-queue", str(queue_size)], cwd=directory, stdout=subprocess.DEVNULL, check=True)
+    return pd.read_parquet(os.path.join(directory, "dataset", "data.parquet"))
+
+
+def test_writer_thread_writes_the_dataset_of_the_simulation_thread(tmp_path):
+    # a queue of 2 games is full most of the time, the simulation waits for the thread
+    threaded = writeRun(tmp_path / "threaded", 2)
+    inline = writeRun(tmp_path / "inline", 0)
+
+    assert threaded.game_id.nunique() > 0
+    pd.testing.assert_frame_equal(threaded, inline)
+
+
+class FailingWriter:
+    def __init__(self):
+        self.closed = False
+
+    def add(self, columns, game_id):
+        raise OSError("No space left on device")
+
+    def checkpoint(self):
+        return 0
+
+    def close(self):
+        self.closed = True
+
+
+def test_writer_thread_error_reaches_the_simulation_thread():
+    game_log = TurnLog()
+    game_log.addRow((0, 1, -1, 1, 0, 0, 1, 0, 0, 4, 1), bytes([1, 2, 3]))
+
+    writer = FailingWriter()
+    background = BackgroundWriter(writer, queue_size=4)
+    background.write(game_log, 0)
+
+    # checkpoint waits for the queued game, the error of the thread is raised here
+    with pytest.raises(RuntimeError) as error:
+        background.checkpoint()
+    assert isinstance(error.value.__cause__, OSError)
+
+    # and by every write that follows, the games are not queued anymore
+    with pytest.raises(RuntimeError):
+        background.write(game_log, 1)
+    with pytest.raises(RuntimeError):
+        background.close()
+    assert not background.thread.is_alive()
+
+
+def loggedGame(rows, players=(0, 1, 2, 3)):
+    # a turn log of `rows` turns, the seats play in turn, the hand of turn t holds the cards t % 54 and 53
+    game_log = TurnLog(capacity=4)
+    for turn in range(rows):
+        game_log.addRow((turn, 1000, players[turn % len(players)], 1, 0, 0, 0, turn % 3, 0, 4, 1), bytes([turn % 54, 53]))
+    return game_log
+
+
+def test_turn_log_grows_past_its_capacity():
+    game_log = loggedGame(11)
+    assert len(game_log) == 11 and game_log.data.shape[1] == 16
+
+    columns = dict(zip(DATASET_COLUMNS, game_log.columns(7)))
+    assert columns['game_id'].tolist() == [7] * 11
+    assert columns['game_turn'].tolist() == list(range(11))
+    assert columns['drawn_cards'].tolist() == [turn % 3 for turn in range(11)]
+    assert columns['hand53'].tolist() == [1] * 11
+    assert columns['hand4'].tolist() == [1 if turn == 4 else 0 for turn in range(11)]
+
+    # the arrays are kept for the next game
+    game_log.clear()
+    game_log.addRow((0, 1000, -1, 1, 0, 0, 0, 0, 0, 4, 1), b"")
+    assert len(game_log) == 1 and game_log.data.shape[1] == 16
+    assert game_log.columns(8)[DATASET_COLUMNS.index('hand53')].tolist() == [0]
+
+
+def test_mark_winner_marks_every_row_of_the_winner():
+    game_log = loggedGame(9, players=(-1, 0, 1, 2))
+    game_log.markWinner(1)
+    has_won = game_log.columns(0)[DATASET_COLUMNS.index('has_won')]
+    assert has_won.tolist() == [turn % 4 == 2 for turn in range(9)]
+
+
+def test_writer_rolls_the_files_and_indexes_their_games(tmp_path):
+    import numpy as np
+    import pyarrow as pa
+
+    # row groups of at least 5 rows, a new file once a file holds 10 rows
+    writer = DatasetWriter(rows_per_row_group=5, rows_per_file=10, directory=str(tmp_path), file_format='arrow')
+    for game_id, rows in enumerate((3, 4, 6, 2)):
+        writer.write(loggedGame(rows), game_id)
+    writer.write(TurnLog(), 4)  # nothing logged, nothing written
+    writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == ['data_0.arrow', 'data_0.index.npy', 'data_1.arrow', 'data_1.index.npy']
+    assert np.load(tmp_path / 'data_0.index.npy').tolist() == [[0, 0, 3], [1, 3, 4], [2, 7, 6]]
+    assert np.load(tmp_path / 'data_1.index.npy').tolist() == [[3, 0, 2]]
+
+    with pa.memory_map(str(tmp_path / 'data_0.arrow')) as source:
+        reader = pa.ipc.open_file(source)
+        # one record batch per row group, a row group always ends with a complete game
+        assert [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)] == [7, 6]
+        table = reader.read_all()
+    assert table.column('game_id').to_pylist() == [0] * 3 + [1] * 4 + [2] * 6
+    assert table.column('game_turn').to_pylist() == list(range(3)) + list(range(4)) + list(range(6))
+    assert table.schema == datasetSchema()
+
+
+def test_parquet_writer_rolls_the_files(tmp_path):
+    import pyarrow.parquet as pq
+
+    writer = DatasetWriter(rows_per_row_group=5, rows_per_file=10, directory=str(tmp_path))
+    for game_id, rows in enumerate((3, 4, 6, 2)):
+        writer.write(loggedGame(rows), game_id)
+    writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == ['data_0.parquet', 'data_1.parquet']
+    first = pq.ParquetFile(tmp_path / 'data_0.parquet')
+    assert [first.metadata.row_group(i).num_rows for i in range(first.num_row_groups)] == [7, 6]
+    assert pq.read_table(tmp_path / 'data_1.parquet').column('game_id').to_pylist() == [3, 3]
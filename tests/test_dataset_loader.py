@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import fast_engine
+from dataset_loader import DatasetLoader
+from game_utility import NUMBER_OF_KINDS
+
+
+def writeDataset(directory, monkeypatch):
+    # a run of the fast engine, written again in row groups of 500 rows so the loader has many pieces
+    monkeypatch.chdir(directory)
+    fast_engine.startFastGame(60, seed=4)
+    table = pq.read_table(directory / "dataset" / "data.parquet")
+    pq.write_table(table, directory / "dataset" / "data.parquet", row_group_size=500)
+    return table.to_pandas()
+
+
+def rowKeys(batches):
+    return sorted(zip(np.concatenate([batch['game_id'] for batch in batches]).tolist(),
+                      np.concatenate([batch['game_turn'] for batch in batches]).tolist()))
+
+
+def test_every_row_once_per_epoch(tmp_path, monkeypatch):
+    rows = writeDataset(tmp_path, monkeypatch)
+    loader = DatasetLoader(str(tmp_path / "dataset"), batch_size=1000, shuffle_buffer=3000, drop_remainder=False, workers=3, seed=1)
+    assert len(loader.pieces) > 10
+
+    expected = sorted(zip(rows.game_id.tolist(), rows.game_turn.tolist()))
+    first = list(loader)
+    second = list(loader)
+    assert rowKeys(first) == expected
+    assert rowKeys(second) == expected
+    # every epoch is shuffled again
+    assert not np.array_equal(first[0]['game_id'], second[0]['game_id'])
+
+    # all the batches are full but the last one
+    assert all(len(batch['game_id']) == 1000 for batch in first[:-1])
+    assert 0 < len(first[-1]['game_id']) <= 1000
+
+
+def test_drop_remainder_and_seed(tmp_path, monkeypatch):
+    rows = writeDataset(tmp_path, monkeypatch)
+
+    def epoch(seed):
+        return list(DatasetLoader(str(tmp_path / "dataset"), batch_size=700, shuffle_buffer=2000, seed=seed))
+
+    batches = epoch(3)
+    assert all(len(batch['game_id']) == 700 for batch in batches)
+    assert len(batches) == len(rows) // 700
+
+    # same seed, same batches
+    again = epoch(3)
+    assert all(np.array_equal(a['game_id'], b['game_id']) and np.array_equal(a['game_turn'], b['game_turn']) for a, b in zip(batches, again))
+    assert not np.array_equal(batches[0]['game_turn'], epoch(4)[0]['game_turn'])
+
+
+def test_filters(tmp_path, monkeypatch):
+    rows = writeDataset(tmp_path, monkeypatch)
+    directory = str(tmp_path / "dataset")
+
+    loader = DatasetLoader(directory, batch_size=64, drop_remainder=False, columns=['game_id', 'game_turn'], filters={'has_won': True})
+    batches = list(loader)
+    assert list(batches[0]) == ['game_id', 'game_turn']
+    winning = rows[rows.has_won]
+    assert rowKeys(batches) == sorted(zip(winning.game_id.tolist(), winning.game_turn.tolist()))
+
+    loader = DatasetLoader(directory, batch_size=256, drop_remainder=False, filters={'p_count': [2, 3], 'has_won': False}, stack_hands=True)
+    batches = list(loader)
+    assert all(set(batch['p_count'].tolist()) <= {2, 3} and not batch['has_won'].any() for batch in batches)
+    expected = rows[rows.p_count.isin([2, 3]) & ~rows.has_won]
+    assert len(expected) > 0
+    assert sum(len(batch['p_count']) for batch in batches) == len(expected)
+    assert batches[0]['hand'].shape == (len(batches[0]['p_count']), NUMBER_OF_KINDS)
@@ -0,0 +1,30 @@
+import os
+
+import pandas as pd
+
+import fast_engine
+import uno
+
+
+def dataset(directory):
+    files = sorted(name for name in os.listdir(directory / "dataset") if name.endswith(".parquet"))
+    return pd.concat([pd.read_parquet(directory / "dataset" / name) for name in files]).reset_index(drop=True)
+
+
+def test_fast_engine_plays_the_games_of_the_object_engine(tmp_path, monkeypatch):
+    # same seed, same games: same players and the same dataset, row for row
+    (tmp_path / "objects").mkdir()
+    (tmp_path / "fast").mkdir()
+
+    monkeypatch.chdir(tmp_path / "objects")
+    objects = uno.startGame(200, seed=123)
+    monkeypatch.chdir(tmp_path / "fast")
+    fast = fast_engine.startFastGame(200, seed=123)
+
+    assert sorted(objects) == sorted(fast)
+    for player_id, player in objects.items():
+        assert (fast[player_id].wins, fast[player_id].score, fast[player_id].performance, fast[player_id].turns) == \
+               (player.wins, player.score, player.performance, player.turns)
+        assert fast[player_id].trueskill == player.trueskill
+
+    pd.testing.assert_frame_equal(dataset(tmp_path / "fast"), dataset(tmp_path / "objects"))
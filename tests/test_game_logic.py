@@ -0,0 +1,181 @@
+from random import Random
+
+from game_utility import Hand, Player, Table, DeckShuffler, generateDeck
+from game_logic import canPlayerPlay, canCardBePlayed
+
+
+def test_shuffle_in_place():
+    cards = list(range(100))
+    kinds = bytearray(range(100))
+    assert DeckShuffler(3).shuffle(cards) is cards
+    assert DeckShuffler(3).shuffle(kinds) is kinds
+
+    # same order for the cards of the object engine and the card kinds of the fast engine
+    assert sorted(cards) == list(range(100))
+    assert list(kinds) == cards
+
+
+def test_can_card_be_played_like_a_hand_of_one_card():
+    deck = generateDeck()
+    table = Table([])
+    table.alive = {0: Player([], 0, 1)}
+
+    for top in deck[::3]:
+        top.color = 2 if top.type == 2 else top.color  # the color chosen for a wild card
+        table.cards = [top]
+        for to_be_drawn, last_placement in ((0, -1), (2, -1), (0, 0)):
+            table.to_be_drawn = to_be_drawn
+            table.lastPlacementBy = last_placement
+            for card in deck:
+                assert canCardBePlayed(table, [card], 0) == canPlayerPlay(Hand([card]), table)
+
+
+def handCounts(hand):
+    # the counts of the hand, without the values and pairs the hand held before and has none of anymore
+    _, points, wilds, colors, values, pairs = hand.state()
+    return (points, wilds, colors, {key: count for key, count in values.items() if count != 0},
+            {key: count for key, count in pairs.items() if count != 0})
+
+
+def test_hand_counts_follow_every_change():
+    deck = generateDeck()
+    Random(4).shuffle(deck)
+
+    hand = Hand(deck[:10])
+    assert handCounts(hand) == handCounts(Hand(list(hand)))
+
+    hand.append(deck[10])
+    hand.extend(deck[11:15])
+    hand += deck[15:18]
+    hand.insert(2, deck[18])
+    assert handCounts(hand) == handCounts(Hand(list(hand)))
+
+    for index in (0, -1, 5, 3):
+        hand.pop(index)
+        assert handCounts(hand) == handCounts(Hand(list(hand)))
+
+    hand.remove(hand[4])
+    assert handCounts(hand) == handCounts(Hand(list(hand)))
+
+    hand.clear()
+    assert handCounts(hand) == handCounts(Hand())
+    assert hand.points == hand.wilds == 0 and sum(hand.colors) == 0
+
+
+def test_hand_counts_after_the_discard_pile_is_recycled():
+    from game_utility import recycleDiscardPile, drawCards, seedShuffler
+
+    seedShuffler(6)
+    deck = generateDeck()
+    table = Table([])
+    table.alive = {0: Player(Hand(), 0, 1)}
+
+    # the wild cards were played with a color, the discard pile goes back under the draw pile
+    wilds = [card for card in deck if card.type == 2]
+    for card, color in zip(wilds, (1, 2, 3, 4) * 2):
+        card.color = color
+    table.cards = [card for card in deck if card.type != 2][:20] + wilds
+    table.deck = [card for card in deck if card.type != 2][20:25]
+
+    hand = table.alive[0].cards
+    hand.extend(drawCards(table, 30, 0))
+    assert table.reshuffles == 1
+    assert all(card.color == 5 for card in hand if card.type == 2)
+    assert hand.wilds == len([card for card in hand if card.type == 2]) > 0
+    assert handCounts(hand) == handCounts(Hand(list(hand)))
+
+    # the colors of the hand only count the colored cards, a wild card can be played on any top card
+    top = next(card for card in deck if card.type == 0)
+    assert hand.countPlayable(top) == sum(card.type == 2 or card.color == top.color or card.value == top.value for card in hand)
+
+
+
+def seatedTable(top):
+    # 4 players, the top card of the discard pile
+    from game_utility import spawnPlayers
+
+    table = spawnPlayers(Table([]))
+    table.cards = [top]
+    return table
+
+
+def leave(table, seat):
+    # the player emptied its hand, like the end of a turn of uno.playTurn
+    from game_utility import removeSeat
+
+    table.dead[seat] = table.alive.pop(seat)
+    removeSeat(table, seat)
+
+
+def cardNamed(value, color=1):
+    return next(card for card in generateDeck() if card.value == value and card.color in (color, 5))
+
+
+def lap(table, turns):
+    from game_logic import skipTurn
+
+    seats = []
+    for _ in range(turns):
+        skipTurn(table, table.turn)
+        seats.append(table.turn)
+    return seats
+
+
+def test_reverse_with_two_players_left_gives_the_turn_back():
+    import fast_engine
+    from game_utility import removeSeat
+
+    table = seatedTable(cardNamed("Reverse"))
+    leave(table, 1)
+    leave(table, 3)
+    table.turn = 2
+
+    # a fresh reverse skips the only other player, once
+    assert lap(table, 3) == [2, 0, 2]
+    assert table.cards[-1].used == 1
+    table.direction = False
+    assert lap(table, 2) == [0, 2]
+
+    # same ring in the fast engine
+    fast = fast_engine.newFastTable()
+    fast_engine.resetTable(fast)
+    fast.cards = bytearray((12,))  # red Reverse
+    fast.top_used = 0
+    for seat in (1, 3):
+        fast.dead[seat] = fast.alive.pop(seat)
+        removeSeat(fast, seat)
+    fast.turn = 2
+    fast_engine.skipTurn(fast)
+    assert fast.turn == 2 and fast.top_used == 1
+    fast_engine.skipTurn(fast)
+    assert fast.turn == 0
+
+
+def test_skip_played_as_the_last_card_skips_the_next_seat():
+    from game_logic import skipTurn
+
+    # seat 1 plays a Skip with its last card, the end of its turn moves the turn on and removes its seat,
+    # the skip of the next turn passes over the next seat
+    for direction, order in ((True, [3, 0, 2, 3, 0]), (False, [3, 2, 0, 3, 2])):
+        table = seatedTable(cardNamed("Skip"))
+        table.direction = direction
+        table.turn = 1
+        table.turns_to_be_skipped = 1
+
+        skipTurn(table, table.turn)
+        leave(table, 1)
+        table.turns_to_be_skipped -= 1
+        skipTurn(table, table.turn)
+
+        assert [table.turn] + lap(table, 4) == order
+
+
+def test_removed_seat_still_leads_to_its_neighbours():
+    # removeSeat leaves the links of the removed seat, a turn that ends on the seat of the player who just
+    # left goes on to the next alive seat and the seat never comes back
+    for direction, order in ((True, [3, 0, 1, 3]), (False, [1, 0, 3, 1])):
+        table = seatedTable(cardNamed(4))
+        table.direction = direction
+        table.turn = 2
+        leave(table, 2)
+        assert lap(table, 4) == order
@@ -0,0 +1,68 @@
+import math
+import random
+
+from game_statistics import GameMeans, RunStatistics
+
+
+def test_hand_size_interval_comes_from_the_games():
+    # every turn of a game has the hand size of the game: the turns say nothing more than the games
+    rng = random.Random(1)
+    run_stats = RunStatistics(4)
+    game_means = []
+    for game in range(200):
+        size = rng.randint(2, 20)
+        turns = rng.randint(50, 150)
+        for _ in range(turns):
+            run_stats.turn(size)
+        run_stats.endGame(turns, [0, 1, 2, 3], 0)
+        game_means.append(size)
+
+    summary = run_stats.summary()['hand_size']
+    low, high = summary['mean_interval']
+    assert low < summary['mean'] < high
+
+    # about as wide as the interval of the means of the games, far wider than one of independent turns
+    spread = math.sqrt(sum((size - sum(game_means) / 200) ** 2 for size in game_means) / 199)
+    assert high - low > 0.5 * 2 * 1.96 * spread / math.sqrt(200)
+    assert high - low > 5 * 2 * 1.96 * summary['std'] / math.sqrt(summary['count'])
+
+
+def test_game_means_merge():
+    whole, first, second = GameMeans(), GameMeans(), GameMeans()
+    rng = random.Random(2)
+    for game in range(40):
+        part = first if game < 15 else second
+        for _ in range(rng.randint(1, 30)):
+            size = rng.randint(1, 12)
+            whole.add(size)
+            part.add(size)
+        whole.endGame()
+        part.endGame()
+
+    merged = GameMeans()
+    merged.merge(first.toDict())
+    merged.merge(second.toDict())
+    assert merged.interval() == whole.interval()
+
+
+def test_draw_chain_counts_draw_cards():
+    run_stats = RunStatistics(4)
+    run_stats.forcedDraw(6, 2)   # three +2 cards
+    run_stats.forcedDraw(8, 4)   # two +4 cards
+    run_stats.forcedDraw(2, 2)
+    summary = run_stats.summary()
+    assert summary['draw_chain']['histogram'] == {1: 1, 2: 1, 3: 1}
+    assert summary['forced_draw']['histogram'] == {2: 1, 6: 1, 8: 1}
+
+
+def test_card_plays_have_an_interval():
+    run_stats = RunStatistics(4)
+    assert run_stats.summary()['card_plays'] == {}
+
+    for card_id in [1001] * 30 + [2005] * 10:
+        run_stats.playCard(card_id)
+    card_plays = run_stats.summary()['card_plays']
+    assert card_plays[1001]['share'] == 0.75
+    low, high = card_plays[1001]['share_interval']
+    assert low < 0.75 < high
+    assert card_plays[2005]['share_interval'][1] < low
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+RUN = """
+import json
+import sys
+import config
+
+if __name__ == "__main__":
+    config.configure(ENABLE_INSTRUMENTATION=sys.argv[1] == "on", TOTAL_SIMULATIONS=20, RECORD_GAMES=True,
+                     CHECKPOINT_FILE="run.json", CHECKPOINT_EVERY=10, PLAYER_POLICIES={0: "random"}, CONCURRENT_GAMES=4)
+    from instrumentation import stats
+    from uno import startGame
+    from fast_engine import startFastGame
+    from policy_engine import startPolicyGame
+
+    startGame(seed=1)
+    startFastGame(seed=1)
+    startPolicyGame(seed=1)
+    print(json.dumps(stats.toDict()))
+"""
+
+
+def instrumentedRun(mode, directory):
+    output = subprocess.run([sys.executable, "-c", RUN, mode], cwd=directory, env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_disabled_instrumentation_leaves_the_stats_empty(tmp_path):
+    # every engine, with logging, the writer thread, ratings, records and checkpoints
+    assert instrumentedRun("off", tmp_path) == {'timers': {}, 'counters': {}, 'maximums': {}}
+
+    enabled = instrumentedRun("on", tmp_path)
+    assert enabled['counters']['games'] == 60
+    assert {'run', 'setup', 'ratings', 'checkpoint', 'writer thread'} <= set(enabled['timers'])
+
+
+PROFILED = """
+import sys
+import cli
+
+if __name__ == "__main__":
+    # the profiler of the run, if any
+    cli.runSimulations = lambda: print(sys.getprofile() is not None)
+    cli.main(sys.argv[1:])
+"""
+
+
+def profiledRun(directory, *flags):
+    output = subprocess.run([sys.executable, "-c", PROFILED] + list(flags), cwd=directory, env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, check=True).stdout
+    return output.splitlines()
+
+
+def test_profiler_only_runs_when_asked(tmp_path):
+    assert profiledRun(tmp_path, "-n", "1") == ["False"]
+    assert os.listdir(tmp_path) == []
+
+    output = profiledRun(tmp_path, "-n", "1", "--profile", "run.prof")
+    assert output[0] == "True"
+    assert output[-1] == "Profile saved to run.prof"
+    assert os.listdir(tmp_path) == ["run.prof"]
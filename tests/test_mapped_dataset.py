@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+from conftest import ROOT
+from mapped_dataset import MappedDataset, toNumpy
+
+
+def run(directory, *flags):
+    directory.mkdir()
+    subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), "-n", "80", "--engine", "fast", "--seed", "21"] + list(flags),
+                   cwd=directory, stdout=subprocess.DEVNULL, check=True)
+    return directory / "dataset"
+
+
+def test_mapped_games_are_the_games_of_the_parquet_dataset(tmp_path):
+    parquet = pd.read_parquet(run(tmp_path / "parquet") / "data.parquet")
+    # two workers, two arrow files
+    dataset = MappedDataset(str(run(tmp_path / "arrow", "--format", "arrow", "--subdivide", "--processes", "2")))
+    assert len(dataset.files) == 2
+
+    # the index covers every game and every row
+    assert dataset.game_ids.tolist() == sorted(parquet.game_id.unique())
+    assert len(dataset) == len(parquet) == dataset.game_sizes.sum()
+
+    for game_id in dataset.game_ids.tolist():
+        game = pd.DataFrame(toNumpy(dataset.game(game_id)))
+        expected = parquet[parquet.game_id == game_id].reset_index(drop=True)
+        pd.testing.assert_frame_equal(game, expected)
+
+    # games across the two files
+    assert dataset.games(0, 80).num_rows == len(parquet)
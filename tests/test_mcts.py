@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+
+import mcts
+from fast_engine import newFastTable, seedTable, snapshotTable, restoreTable, playableCards
+
+from conftest import ROOT
+from test_snapshot import playUntil
+
+
+def decision(seed, requests):
+    # a table waiting for a card of the player, with the request mask of the decision
+    table = newFastTable()
+    seedTable(table, seed)
+    playUntil(table, requests)
+    playable = playableCards(table)
+    mask = [playable[card] for card in table.alive[table.turn].cards]
+    return table, mask
+
+
+def test_cache_key_leaves_out_the_piles():
+    table, mask = decision(5, 30)
+    moves = mcts.playableMoves(table, mask)
+    key = mcts.positionKey(table, mask, moves)
+
+    # same public state, other cards under the top card and in the draw pile
+    other = restoreTable(newFastTable(), snapshotTable(table))
+    moved = other.deck[:5]
+    del other.deck[:5]
+    other.cards[:0] = moved
+    assert mcts.positionKey(other, mask, moves) == key
+
+
+def test_search_inherits_a_bounded_amount_of_visits():
+    table, mask = decision(5, 30)
+    policy = mcts.MCTSPolicy(workers=0, cache_visits=10)
+    policy.searcher.rollouts = 8
+    key = mcts.positionKey(table, mask, mcts.playableMoves(table, mask))
+
+    policy.decide([table], [mask])
+    assert len(policy.cache) == 1
+    assert sum(visits for visits, _ in policy.cache[key].values()) == 8
+
+    # the 8 visits of the first search and 8 new ones, then 10 of the 16 and 8 new ones
+    policy.decide([table], [mask])
+    assert sum(visits for visits, _ in policy.cache[key].values()) == 16
+    policy.decide([table], [mask])
+    assert abs(sum(visits for visits, _ in policy.cache[key].values()) - 18) < 1e-9
+
+
+def test_close_stops_the_workers():
+    table, mask = decision(5, 30)
+    policy = mcts.MCTSPolicy(workers=1)
+    policy.decide([table], [mask])
+    assert policy.pool is not None
+    policy.close()
+    assert policy.pool is None
+    policy.close()
+
+
+def test_rollouts_are_not_timed(monkeypatch):
+    import fast_engine
+    from instrumentation import stats
+
+    monkeypatch.setattr(fast_engine, 'INSTRUMENTATION', True)
+    table, mask = decision(5, 30)
+    stats.clear()
+    try:
+        moves = mcts.playableMoves(table, mask)
+        mcts.Searcher(rollouts=20).search(snapshotTable(table), mask, 1, {move: [0, 0] for move in moves})
+        assert 'turn loop/logic' not in stats.timers
+
+        # a move of the game itself is timed
+        fast_engine.logic(table, table.alive[table.turn].cards, mask.index(True), None, 0, 4, 0)
+        assert 'turn loop/logic' in stats.timers
+    finally:
+        stats.clear()
+
+
+MCTS_RUN = """
+import multiprocessing
+import sys
+import config
+
+if __name__ == "__main__":
+    # the workers are spawned: they don't inherit the settings, 6 players is not the default
+    multiprocessing.set_start_method("spawn")
+    config.configure(NUMBER_OF_PLAYERS=6, PLAYER_POLICIES={0: "mcts"}, MCTS_ROLLOUTS=20, MCTS_WORKERS=int(sys.argv[1]),
+                     ENABLE_LOGGING=False, ENABLE_MAX_TURNS=True, MAX_TURNS=300)
+    from policy_engine import startPolicyGame
+    players = startPolicyGame(12, seed=3, concurrent_games=6)
+    print(sorted((i, p.wins, p.score, p.turns) for i, p in players.items()))
+"""
+
+
+def playMCTS(workers):
+    return subprocess.run([sys.executable, "-c", MCTS_RUN, str(workers)], cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT),
+                          capture_output=True, text=True, check=True).stdout
+
+
+def test_workers_play_the_games_of_the_simulation_process():
+    single = playMCTS(0)
+    assert playMCTS(2) == single
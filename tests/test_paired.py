@@ -0,0 +1,19 @@
+import config
+from paired import runPaired
+
+
+def variant(policies):
+    return dict(config.settings(), ENABLE_LOGGING=False, ENABLE_MAX_TURNS=True, MAX_TURNS=2000, PLAYER_POLICIES=policies)
+
+
+def test_different_variants_play_differently():
+    # one worker plays the jobs of both variants, each one must use its own settings
+    summaries = runPaired(variant({0: 'linear'}), variant({0: 'random'}), 400, seed=4, processes=1)
+    assert summaries['turns']['standard_error'] > 0
+    assert summaries['turns']['difference'] != 0
+
+
+def test_same_games_with_any_amount_of_processes():
+    a = runPaired(variant({0: 'linear'}), variant({0: 'random'}), 200, seed=4, processes=1)
+    b = runPaired(variant({0: 'linear'}), variant({0: 'random'}), 200, seed=4, processes=2)
+    assert a == b
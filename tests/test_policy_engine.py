@@ -0,0 +1,69 @@
+from fast_engine import newFastTable, deckTemplate
+from policies import RandomPolicy
+from policy_engine import Game, playPolicyGames
+
+
+class CountingPolicy(RandomPolicy):
+    # random moves, remembers the games of every decide call
+    def __init__(self):
+        self.calls = []
+
+    def decide(self, tables, masks):
+        self.calls.append([id(table) for table in tables])
+        return super().decide(tables, masks)
+
+
+def playGames(concurrent_games, seats, games=24, seed=9):
+    # the finish order and the turns of every game, by game id
+    results = {}
+
+    def endGame(game):
+        results[game.game_id] = (tuple(game.table.finish_order), game.table.turns)
+
+    slots = [Game(newFastTable(), None) for _ in range(concurrent_games)]
+    playPolicyGames(slots, deckTemplate(), seed, range(games), lambda game_id: seats, endGame)
+    return results
+
+
+def test_one_decide_call_per_round():
+    # every game in flight makes one move per round, all of them in the same call
+    policy = CountingPolicy()
+    results = playGames(24, [policy] * 4)
+
+    assert len(policy.calls[0]) == 24
+    for call in policy.calls:
+        assert len(set(call)) == len(call)
+    sizes = [len(call) for call in policy.calls]
+    assert sizes == sorted(sizes, reverse=True)
+
+    # the games start together, there are as many rounds as moves in the longest game
+    moves = {}
+    for call in policy.calls:
+        for table in call:
+            moves[table] = moves.get(table, 0) + 1
+    assert len(policy.calls) == max(moves.values())
+    assert len(results) == 24
+
+
+def test_one_decide_call_per_policy_per_round():
+    # the same games with two policies: each one is called at most once per round
+    single = CountingPolicy()
+    playGames(24, [single] * 4)
+    rounds = len(single.calls)
+
+    first, others = CountingPolicy(), CountingPolicy()
+    playGames(24, [first, others, others, others])
+
+    assert len(first.calls) <= rounds
+    assert len(others.calls) <= rounds
+    assert len(first.calls) + len(others.calls) >= rounds
+    assert sum(map(len, first.calls)) + sum(map(len, others.calls)) == sum(map(len, single.calls))
+
+
+def test_same_games_with_any_amount_of_concurrent_games():
+    seats = [RandomPolicy()] * 4
+    one = playGames(1, seats)
+    assert len(one) == 24
+    assert playGames(3, seats) == one
+    assert playGames(8, seats) == one
+    assert playGames(24, [CountingPolicy(), RandomPolicy(), CountingPolicy(), RandomPolicy()]) == one
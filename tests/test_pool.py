@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+
+import config
+from conftest import ROOT
+from game_utility import Player
+from simulation_pool import runSubdividedSimulations, splitSimulations, mergeRatings
+from uno import startGame
+
+
+def test_split_simulations():
+    assert splitSimulations(100, 3) == [34, 33, 33]
+
+
+def test_pool_plays_the_games_of_a_single_process(tmp_path, monkeypatch):
+    # every game is seeded from the run seed and its id, the wins of the shards are rated in game order
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "EXACT_POOL_RATINGS", True)
+    single = startGame(120, 5)
+    pooled = runSubdividedSimulations(120, 3, 5)
+
+    for player_id, player in single.items():
+        assert pooled[player_id].wins == player.wins
+        assert pooled[player_id].score == player.score
+        assert pooled[player_id].trueskill == player.trueskill
+
+
+def test_pool_merges_the_ratings_of_the_shards(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    single = startGame(400, 5)
+    pooled = runSubdividedSimulations(400, 4, 5)
+
+    for player_id, player in single.items():
+        assert pooled[player_id].wins == player.wins
+        assert abs(pooled[player_id].trueskill.mu - player.trueskill.mu) < 1
+        assert abs(pooled[player_id].trueskill.sigma - player.trueskill.sigma) < 0.1
+
+
+def shardResult(simulations, mu, sigma):
+    return simulations, {0: {'mu': mu, 'sigma': sigma}}, None, {}, {}
+
+
+def test_merge_ratings_counts_the_prior_once():
+    # a single shard keeps its rating
+    players = {0: Player([], 0, 1)}
+    mergeRatings(players, [shardResult(10, 31.5, 2.0)])
+    assert players[0].trueskill.mu == 31.5 and players[0].trueskill.sigma == 2.0
+
+    # shards that never rated the player leave the prior
+    players = {0: Player([], 0, 1)}
+    mergeRatings(players, [shardResult(10, 30, 8), shardResult(10, 30, 8)])
+    assert abs(players[0].trueskill.mu - 30) < 1e-9
+
+    # the more certain shard weighs more, sigma is the mean of the shards weighted by games
+    players = {0: Player([], 0, 1)}
+    mergeRatings(players, [shardResult(30, 32, 1.0), shardResult(10, 28, 2.0)])
+    assert 31 < players[0].trueskill.mu < 32
+    assert abs(players[0].trueskill.sigma - 1.25) < 1e-9
+
+
+POOL_RUN = """
+import json
+import sys
+import config
+
+if __name__ == "__main__":
+    config.configure(ENABLE_STATISTICS=True, ENABLE_INSTRUMENTATION=True, ENABLE_LOGGING=False, FAST_ENGINE=True)
+    from instrumentation import stats
+    from game_statistics import run_stats
+    if sys.argv[1] == "pool":
+        from simulation_pool import runSubdividedSimulations
+        runSubdividedSimulations(64, 32, 1)
+    else:
+        from fast_engine import startFastGame
+        startFastGame(64, 1)
+    print(json.dumps({"statistics": run_stats.toDict(), "counters": stats.counters}))
+"""
+
+
+def playRun(mode, directory):
+    output = subprocess.run([sys.executable, "-c", POOL_RUN, mode], cwd=directory, env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_pool_counts_every_game_once(tmp_path):
+    # 32 shards of 2 games, a worker plays several shards: it must not send the totals of its earlier shards again
+    single = playRun("single", tmp_path)
+    pooled = playRun("pool", tmp_path)
+
+    assert pooled["counters"] == single["counters"]
+    assert pooled["counters"]["games"] == 64
+    for name in ("games", "positions", "card_plays"):
+        assert pooled["statistics"][name] == single["statistics"][name]
+    for name in ("game_turns", "hand_size", "forced_draw", "draw_chain", "reshuffles"):
+        assert pooled["statistics"][name]["counts"] == single["statistics"][name]["counts"]
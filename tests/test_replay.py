@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+import fast_engine
+from conftest import ROOT
+from replay import replayGames
+from instrumentation import stats
+from game_statistics import run_stats
+
+
+def test_replay_gives_the_rows_of_the_recorded_run(tmp_path, monkeypatch):
+    subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), "-n", "60", "--engine", "fast", "--seed", "42", "--record"],
+                   cwd=tmp_path, stdout=subprocess.DEVNULL, check=True)
+    dataset = pd.read_parquet(tmp_path / "dataset" / "data.parquet")
+
+    # the replay runs next to a run that counts its games, the replayed games are not counted again
+    monkeypatch.setattr(fast_engine, "INSTRUMENTATION", True)
+    monkeypatch.setattr(fast_engine, "STATISTICS", True)
+    stats.clear()
+    run_stats.clear()
+    try:
+        game_ids = [3, 41, 17]
+        replayed = replayGames(game_ids, str(tmp_path / "dataset")).to_pandas()
+        assert stats.counters == {}
+        assert run_stats.games == 0
+    finally:
+        stats.clear()
+        run_stats.clear()
+
+    # top_card_id stays dictionary encoded in memory, the parquet reader decodes it
+    replayed = replayed.astype(dataset.dtypes.to_dict())
+    for game_id in game_ids:
+        recorded = dataset[dataset.game_id == game_id].reset_index(drop=True)
+        assert len(recorded) > 0
+        pd.testing.assert_frame_equal(replayed[replayed.game_id == game_id].reset_index(drop=True), recorded)
@@ -0,0 +1,99 @@
+import random
+
+import game_utility
+from fast_engine import newFastTable, resetTable, seedTable, deckTemplate, gameSteps, playOut, snapshotTable, restoreTable, playCard, changeColor
+
+
+def playUntil(table, requests):
+    # Plays a seeded game with the random policy of the seats, stops at the decision number `requests`
+    resetTable(table)
+    steps = gameSteps(table, deckTemplate(), None, True)
+    request = next(steps)
+    for _ in range(requests):
+        rng = table.seat_random[table.turn]
+        answer = changeColor(table.alive[table.turn].cards, rng) if request is None else playCard(request, rng)
+        request = steps.send(answer)
+    steps.close()
+    return table
+
+
+def continueGame(table, seed):
+    # the random streams are not part of a snapshot, both continuations get the same ones
+    random.seed(seed)
+    table.shuffler = game_utility.DeckShuffler(seed)
+    playOut(table)
+    return snapshotTable(table)
+
+
+def test_snapshot_keeps_the_turns_of_the_game():
+    table = newFastTable()
+    seedTable(table, 7)
+    playUntil(table, 60)
+    table.stalled_turns = 2
+
+    snapshot = snapshotTable(table)
+    restored = restoreTable(newFastTable(), snapshot)
+    assert restored.turns == table.turns > 0
+    assert restored.stalled_turns == 2
+    assert snapshotTable(restored) == snapshot
+
+
+def test_restored_game_continues_like_the_game():
+    table = newFastTable()
+    seedTable(table, 11)
+    playUntil(table, 40)
+    turns = table.turns
+
+    restored = restoreTable(newFastTable(), snapshotTable(table))
+    played = continueGame(table, 3)
+    assert continueGame(restored, 3) == played
+
+    # the turns of the whole game, not only the ones after the restore
+    players = list(restored.alive.values()) + list(restored.dead.values())
+    assert restored.turns == sum(player.turns for player in players) > turns
+
+
+def playObjectTurns(table, turns, game_data):
+    # The turns of uno.startGame, for at most `turns` turns or until the game is over
+    from uno import playTurn
+
+    for _ in range(turns):
+        if playTurn(table, game_data, None):
+            break
+
+
+def newObjectGame(seed):
+    from game_utility import Table, spawnPlayers, resetSeats, newDeck, dealCards, seedGame
+
+    seedGame(seed, 0)
+    table = spawnPlayers(Table([]))
+    resetSeats(table)
+    table.deck = newDeck()
+    table.cards.append(table.deck.pop())
+    table.cards[0].used = 1
+    return dealCards(table)
+
+
+def test_restored_object_game_continues_like_the_game():
+    from game_utility import Table, TurnLog, spawnPlayers, seedShuffler, snapshotTable as snapshotObjects, restoreTable as restoreObjects
+
+    table = newObjectGame(13)
+    playObjectTurns(table, 80, TurnLog())
+    snapshot = snapshotObjects(table)
+    assert table.turns == 80
+
+    # the game goes on, it changes the colors of the wild cards and the reverse cards in place
+    random.seed(5)
+    seedShuffler(5)
+    playObjectTurns(table, 5000, TurnLog())
+    played = snapshotObjects(table)
+    assert played != snapshot
+    assert len(table.finish_order) > 0
+
+    restored = restoreObjects(spawnPlayers(Table([])), snapshot)
+    assert snapshotObjects(restored) == snapshot
+    random.seed(5)
+    seedShuffler(5)
+    playObjectTurns(restored, 5000, TurnLog())
+    assert snapshotObjects(restored) == played
+    assert restored.turns == table.turns > 80
@@ -0,0 +1,66 @@
+import math
+
+from tournament import Matchup, checkZ, playMatchup
+from policies import newPolicy
+
+
+def test_check_z_spends_alpha_over_all_the_checks():
+    # two-sided chance of a wrong interval at every check, summed over an endless run
+    spent = sum(2 * (1 - 0.5 * (1 + math.erf(checkZ(0.05, check) / math.sqrt(2)))) for check in range(1, 10000))
+    assert spent < 0.05
+    assert checkZ(0.05, 1) < checkZ(0.05, 2) < checkZ(0.05, 10)
+
+
+def test_lineup_rotates():
+    matchup = Matchup("a", "b", 4)
+    assert matchup.lineupOf(0) == ["a", "b", "a", "b"]
+    assert matchup.lineupOf(1) == ["b", "a", "b", "a"]
+    assert matchup.seats == {"a": 2, "b": 2}
+
+
+def test_games_are_counted_in_game_id_order():
+    matchup = Matchup("a", "b", 2, check_every=2)
+    matchup.addGame(1, 0)
+    matchup.addGame(2, 0)
+    # game 0 is still being played
+    assert matchup.difference.count == 0
+    assert matchup.checks == 0
+
+    matchup.addGame(0, None)
+    assert matchup.difference.count == 3
+    assert matchup.checks == 1
+    assert matchup.wins == {"a": 1, "b": 1}
+    assert matchup.pending == {}
+
+
+def test_decided_matchup_stops_counting():
+    matchup = Matchup("a", "b", 2, check_every=100)
+    game_id = 0
+    while matchup.decision is None:
+        # a wins 3 games out of 4
+        matchup.addGame(game_id, 0 if game_id % 4 != 1 else 1)
+        game_id += 1
+    assert matchup.decision == "a"
+    assert matchup.interval[0] > 0
+    assert matchup.difference.count % 100 == 0
+
+    counted = matchup.difference.count
+    matchup.addGame(game_id, 1)
+    assert matchup.difference.count == counted
+
+
+def test_play_matchup_counts_the_first_games(monkeypatch):
+    # two linear seats can pass wild cards back and forth forever
+    import fast_engine
+    monkeypatch.setattr(fast_engine, "ENABLE_MAX_TURNS", True)
+    monkeypatch.setattr(fast_engine, "MAX_TURNS", 2000)
+
+    matchup = Matchup("linear", "random", 4, check_every=50)
+    policies = {"linear": newPolicy("linear"), "random": newPolicy("random")}
+    playMatchup(matchup, policies, 3, first_game_id=1000, max_games=300, concurrent_games=64)
+
+    games = matchup.difference.count
+    assert 0 < games <= 300
+    assert matchup.next_game_id == 1000 + games
+    if matchup.decision is not None:
+        assert games % 50 == 0
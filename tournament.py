@@ -0,0 +1,230 @@
+# Tournaments of policies (policies.py) on the policy engine
+# Every pair of policies plays a matchup: the seats of the table alternate between the two policies and the
+# lineup is rotated by one seat every game, so no policy keeps the seats that play first.
+#   python tournament.py linear random
+#   python tournament.py linear random keras --model model.keras --players 6 --seed 42
+#
+# Games stop after --max-turns turns, a game nobody finished counts for no policy.
+#
+# A game scores 1 / seats of the policy for the policy of the first player out of cards. The mean of
+# (score of A - score of B) is the difference of the win rates per seat of the two policies.
+# Every TOURNAMENT_CHECK_EVERY games its confidence interval is checked, the matchup stops as soon as the
+# interval excludes 0 (one policy is better) or is narrower than TOURNAMENT_MARGIN (a draw).
+# Games are counted in the order of their game ids, not in the order they finish: with many games in flight
+# the short games finish first, a check on the finished games would see too many of them.
+# The confidence of check j is alpha * 6 / (pi^2 j^2): the intervals of all the checks hold together with a
+# chance of 1 - alpha, looking at the result over and over doesn't make wrong decisions more likely.
+
+import math
+import argparse
+import statistics
+
+import config
+
+
+TOURNAMENT_ALPHA = config.TOURNAMENT_ALPHA
+TOURNAMENT_CHECK_EVERY = config.TOURNAMENT_CHECK_EVERY
+TOURNAMENT_MAX_GAMES = config.TOURNAMENT_MAX_GAMES
+TOURNAMENT_MARGIN = config.TOURNAMENT_MARGIN
+
+
+def checkZ(alpha, check):
+    # z of the two-sided interval of check 1, 2, 3, ...
+    spent = alpha * 6 / (math.pi * math.pi * check * check)
+    return statistics.NormalDist().inv_cdf(1 - spent / 2)
+
+
+class Matchup:
+    # Results of policy a against policy b
+    def __init__(self, a, b, players, alpha=TOURNAMENT_ALPHA, check_every=TOURNAMENT_CHECK_EVERY, margin=TOURNAMENT_MARGIN):
+        from game_statistics import Accumulator
+
+        self.a = a
+        self.b = b
+        self.lineup = [a if seat % 2 == 0 else b for seat in range(players)]
+        self.seats = {a: self.lineup.count(a), b: self.lineup.count(b)}
+        self.wins = {a: 0, b: 0}
+        self.difference = Accumulator()     # score of a - score of b, per game
+        self.alpha = alpha
+        self.check_every = check_every
+        self.margin = margin
+        self.checks = 0
+        self.interval = [-1.0, 1.0]
+        self.decision = None    # name of the better policy, "draw", or None while undecided
+        self.next_game_id = 0   # the next game to count, the games after it wait in pending
+        self.pending = {}       # game_id: winner_seat
+
+    def lineupOf(self, game_id):
+        # the lineup moves by one seat every game
+        rotation = game_id % len(self.lineup)
+        return self.lineup[rotation:] + self.lineup[:rotation]
+
+    def addGame(self, game_id, winner_seat):
+        # winner_seat = first player out of cards, None when nobody finished (MAX_TURNS, stalled game)
+        # The game is counted once every game before it was counted
+        self.pending[game_id] = winner_seat
+        while self.decision is None and self.next_game_id in self.pending:
+            self.countGame(self.next_game_id, self.pending.pop(self.next_game_id))
+            self.next_game_id += 1
+
+    def countGame(self, game_id, winner_seat):
+        score = 0.0
+        if winner_seat is not None:
+            winner = self.lineupOf(game_id)[winner_seat]
+            self.wins[winner] += 1
+            score = 1 / self.seats[self.a] if winner == self.a else -1 / self.seats[self.b]
+        self.difference.add(score)
+
+        if self.difference.count % self.check_every == 0:
+            self.check()
+
+    def check(self):
+        self.checks += 1
+        z = checkZ(self.alpha, self.checks)
+        margin = z * math.sqrt(self.difference.variance() / self.difference.count)
+        self.interval = [self.difference.mean - margin, self.difference.mean + margin]
+
+        if self.interval[0] > 0:
+            self.decision = self.a
+        elif self.interval[1] < 0:
+            self.decision = self.b
+        elif 2 * margin < self.margin:
+            self.decision = "draw"
+
+    def summary(self):
+        from game_statistics import wilsonInterval
+
+        games = self.difference.count
+        summary = {'a': self.a, 'b': self.b, 'games': games, 'checks': self.checks, 'decision': self.decision,
+                   'difference': self.difference.mean, 'difference_interval': self.interval, 'policies': {}}
+        for name in (self.a, self.b):
+            trials = games * self.seats[name]
+            summary['policies'][name] = {
+                'seats': self.seats[name],
+                'wins': self.wins[name],
+                # per seat, every game is a trial for each of the seats of the policy
+                'win_rate': self.wins[name] / trials if trials > 0 else 0.0,
+                'win_rate_interval': wilsonInterval(self.wins[name], trials),
+            }
+        return summary
+
+
+def playMatchup(matchup, policies, seed, first_game_id=0, max_games=TOURNAMENT_MAX_GAMES, concurrent_games=None):
+    # Plays games until the matchup is decided or max_games were played
+    from fast_engine import newFastTable, deckTemplate
+    from policy_engine import Game, playPolicyGames, CONCURRENT_GAMES
+    from ratings import RatingLog
+    from game_utility import Player
+
+    if concurrent_games is None:
+        concurrent_games = CONCURRENT_GAMES
+    concurrent_games = min(concurrent_games, max_games)
+
+    players = len(matchup.lineup)
+    rating_log = RatingLog({i: Player([], i, 1) for i in range(players)})
+
+    slots = []
+    for _ in range(concurrent_games):
+        table = newFastTable()
+        table.rating_log = rating_log
+        slots.append(Game(table, None))
+
+    matchup.next_game_id = first_game_id
+
+    def gameIds():
+        # no new games once the matchup is decided, the games in flight are finished but not counted
+        game_id = first_game_id
+        while matchup.decision is None and game_id < first_game_id + max_games:
+            yield game_id
+            game_id += 1
+
+    def seatsOf(game_id):
+        return [policies[name] for name in matchup.lineupOf(game_id)]
+
+    def endGame(game):
+        if matchup.decision is None:
+            finish_order = game.table.finish_order
+            matchup.addGame(game.game_id, finish_order[0] if len(finish_order) > 0 else None)
+
+    playPolicyGames(slots, deckTemplate(), seed, gameIds(), seatsOf, endGame)
+
+    # the last games since the previous check
+    if matchup.decision is None and matchup.difference.count % matchup.check_every != 0:
+        matchup.check()
+    return matchup
+
+
+def printMatchup(summary):
+    low, high = summary['difference_interval']
+    decision = summary['decision'] or "undecided"
+    print("%s vs %s: %s after %d games (%d checks)" % (summary['a'], summary['b'], decision, summary['games'], summary['checks']))
+    print("  win rate difference %+.4f [%+.4f, %+.4f]" % (summary['difference'], low, high))
+    for name, policy in summary['policies'].items():
+        low, high = policy['win_rate_interval']
+        print("  %-8s seats %d  wins %8d  win rate per seat %.4f [%.4f, %.4f]" % (name, policy['seats'], policy['wins'], policy['win_rate'], low, high))
+
+
+def runTournament(names, seed=None, max_games=TOURNAMENT_MAX_GAMES, alpha=TOURNAMENT_ALPHA, check_every=TOURNAMENT_CHECK_EVERY, margin=TOURNAMENT_MARGIN):
+    # Every pair of policies plays a matchup, returns the summaries of the matchups
+    from policies import newPolicy
+    from game_utility import newRunSeed
+
+    if seed is None:
+        seed = newRunSeed()
+    print("Tournament of", ", ".join(names), "on", config.NUMBER_OF_PLAYERS, "seats (seed:", seed, ")")
+
+    policies = {name: newPolicy(name) for name in names}
+
+    summaries = []
+    first_game_id = 0
+    try:
+        for i in range(len(names)):
+            for j in range(i + 1, len(names)):
+                matchup = Matchup(names[i], names[j], config.NUMBER_OF_PLAYERS, alpha, check_every, margin)
+                playMatchup(matchup, policies, seed, first_game_id, max_games)
+
+                # every matchup plays other games
+                first_game_id += max_games
+
+                summary = matchup.summary()
+                printMatchup(summary)
+                summaries.append(summary)
+    finally:
+        for policy in policies.values():
+            policy.close()
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tournament of the policies of policies.py")
+    parser.add_argument("policies", nargs="+", help="random, linear or keras")
+    parser.add_argument("--players", type=int, help="NUMBER_OF_PLAYERS")
+    parser.add_argument("--decks", type=int, help="NUMBER_OF_DECKS")
+    parser.add_argument("--one-winner", action=argparse.BooleanOptionalAction, help="ONLY_ONE_PLAYER_CAN_WIN")
+    parser.add_argument("--concurrent-games", type=int, help="CONCURRENT_GAMES")
+    parser.add_argument("--model", help="MODEL_FILE of the keras policy")
+    parser.add_argument("--seed", type=int, help="SIMULATION_SEED")
+    parser.add_argument("--max-turns", type=int, default=2000, help="MAX_TURNS, 0 = no limit (two deterministic policies can pass wild cards back and forth forever)")
+    parser.add_argument("--alpha", type=float, default=config.TOURNAMENT_ALPHA, help="TOURNAMENT_ALPHA")
+    parser.add_argument("--check-every", type=int, default=config.TOURNAMENT_CHECK_EVERY, help="TOURNAMENT_CHECK_EVERY")
+    parser.add_argument("--max-games", type=int, default=config.TOURNAMENT_MAX_GAMES, help="TOURNAMENT_MAX_GAMES per matchup")
+    parser.add_argument("--margin", type=float, default=config.TOURNAMENT_MARGIN, help="TOURNAMENT_MARGIN")
+    args = parser.parse_args(argv)
+
+    if len(set(args.policies)) != len(args.policies) or len(args.policies) < 2:
+        parser.error("a tournament needs at least two different policies")
+
+    # nothing is logged, the settings are applied before the game modules are imported
+    settings = {"ENABLE_LOGGING": False, "ENABLE_MAX_TURNS": args.max_turns > 0, "MAX_TURNS": args.max_turns}
+    for argument, name in {"players": "NUMBER_OF_PLAYERS", "decks": "NUMBER_OF_DECKS", "one_winner": "ONLY_ONE_PLAYER_CAN_WIN",
+                           "concurrent_games": "CONCURRENT_GAMES", "model": "MODEL_FILE", "seed": "SIMULATION_SEED"}.items():
+        value = getattr(args, argument)
+        if value is not None:
+            settings[name] = value
+    config.configure(**settings)
+
+    return runTournament(args.policies, config.SIMULATION_SEED, args.max_games, args.alpha, args.check_every, args.margin)
+
+
+if __name__ == "__main__":
+    main()